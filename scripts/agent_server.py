@@ -10,16 +10,57 @@ Usage:
     
 Endpoints:
     POST /sign - Generate signatures for a given request
+    POST /sign/batch - Generate signatures for a list of requests (in order)
+    POST /session - Register a cookie set, sign later by session_id
     GET /guest-cookies - Get guest cookies via Playwright
     GET /health - Health check
+    GET /metrics - Prometheus metrics (merged into the Rust server's /metrics)
+    GET /admin/profile - CPU / allocation profile of the live agent
+                         (disabled unless AGENT_ADMIN_TOKEN is set)
+
+Optional UDS transport (XHS_AGENT_TRANSPORT=uds, XHS_AGENT_SOCKET=path):
+    length-prefixed msgpack frames, see xhs_agent/uds.py
+
+Cookie endpoints use a warm Chromium pool started with the app
+(AGENT_BROWSER_POOL, AGENT_BROWSER_MAX_USES), see xhs_playwright/pool.py,
+and skip images/media/fonts (AGENT_BLOCK_PROFILE), see xhs_playwright/routing.py
+
+Startup readiness:
+    Once signing is warm the agent prints one line to stdout,
+        AGENT_READY {"pid": ..., "timings": {"import": ms, "xhshow_init": ms, "first_sign": ms}}
+    which the Rust AgentManager logs and then confirms with GET /health.
 """
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import asyncio
+import hmac
 import json
+import logging
+import os
+import sys
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
-from xhshow import Xhshow
+
+# Make sibling packages importable both as `python scripts/agent_server.py`
+# and as `uvicorn scripts.agent_server:app` (run from the project root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from xhs_agent import SignExecutor, ExecutorBusy
+from xhs_agent import metrics, profiling
+from xhs_agent.logs import setup_logging, stop_logging
+from xhs_agent.uds import UdsSignServer, uds_enabled
+from xhs_playwright.pool import BrowserPool
+from xhs_playwright.readiness import PhaseTimer, wait_for_cookies, wait_for_cookies_settled
+from xhs_playwright.routing import ResourceBlocker
+from xhs_playwright.config import GUEST_REQUIRED_COOKIES, SYNC_REQUIRED_COOKIES
+
+# Leveled, non-blocking logging (AGENT_LOG_LEVEL / AGENT_LOG_SAMPLE_EVERY)
+setup_logging()
 
 app = FastAPI(
     title="XHS Signature Agent",
@@ -27,17 +68,94 @@ app = FastAPI(
     version="1.1.0"
 )
 
-# Initialize Xhshow client (singleton)
-xhs_client = Xhshow()
+# Signing runs on a pool of worker processes, each with its own Xhshow
+# instance (AGENT_SIGN_WORKERS / AGENT_SIGN_QUEUE)
+sign_executor = SignExecutor()
+
+# Optional low-overhead transport for the Rust server (XHS_AGENT_TRANSPORT=uds)
+uds_server = UdsSignServer(sign_executor) if uds_enabled() else None
+
+# Long-lived headless browsers for the cookie endpoints; each call gets a
+# fresh BrowserContext (AGENT_BROWSER_POOL / AGENT_BROWSER_MAX_USES)
+browser_pool = BrowserPool(on_launch=metrics.BROWSER_LAUNCH.observe)
+
+# Abort images/media/fonts in cookie flows (AGENT_BLOCK_PROFILE / AGENT_BLOCK_URLS)
+resource_blocker = ResourceBlocker()
+
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
+
+READY_MARKER = "AGENT_READY"
+
+# Dummy cookies for the warm-up sign (signing is pure computation)
+_WARMUP_REQUEST = {
+    "method": "GET",
+    "uri": "/api/sns/web/v1/homefeed",
+    "cookies": {"a1": "0" * 52},
+}
+
+# Admin endpoints (/admin/*) answer 404 unless a token is configured
+ADMIN_TOKEN = os.environ.get("AGENT_ADMIN_TOKEN", "")
+
+# One profile at a time keeps the overhead bounded
+_profile_lock = asyncio.Lock()
+
+_import_ms = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+_browser_pool_task: Optional[asyncio.Task] = None
+
+
+async def start_browser_pool():
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # Playwright/Chromium missing: signing still works, cookie endpoints
+        # retry the launch on first use
+        logging.warning(f"[BrowserPool] Failed to start: {e}")
+
+
+@app.on_event("startup")
+async def start_sign_executor():
+    global _browser_pool_task
+    timings = {"import": _import_ms}
+
+    started = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, sign_executor.start)
+    timings["xhshow_init"] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    await sign_executor.sign(dict(_WARMUP_REQUEST))
+    timings["first_sign"] = round((time.perf_counter() - started) * 1000, 1)
+
+    if uds_server is not None:
+        await uds_server.start()
+
+    # Chromium prewarm can take seconds; it must not delay signing readiness
+    _browser_pool_task = asyncio.create_task(start_browser_pool())
+
+    logging.info(f"[Agent] Signing ready, startup timings(ms): {timings}")
+    print(f"{READY_MARKER} {json.dumps({'pid': os.getpid(), 'timings': timings})}", flush=True)
+
+
+@app.on_event("shutdown")
+async def stop_sign_executor():
+    if _browser_pool_task is not None:
+        await _browser_pool_task
+    if uds_server is not None:
+        await uds_server.stop()
+    await browser_pool.stop()
+    sign_executor.shutdown()
+    stop_logging()
 
 
 class SignRequest(BaseModel):
     """Request model for signature generation"""
     method: str  # GET or POST
     uri: str  # API path, e.g., /api/sns/web/v1/homefeed
-    cookies: Dict[str, str]  # Cookie dictionary
+    cookies: Dict[str, str] = {}  # Cookie dictionary (omit when session_id is given)
+    session_id: Optional[str] = None  # Handle from POST /session
     params: Optional[Dict[str, Any]] = None  # Query parameters (for GET)
     payload: Optional[Dict[str, Any]] = None  # Request body (for POST)
+    return_body: bool = False  # Also return the exact body string that was signed
+    request_id: Optional[str] = None  # Rust-side request ID, tagged on agent log lines
 
 
 class SignResponse(BaseModel):
@@ -49,6 +167,20 @@ class SignResponse(BaseModel):
     x_b3_traceid: Optional[str] = None
     x_xray_traceid: Optional[str] = None
     error: Optional[str] = None
+    error_code: Optional[str] = None  # e.g. "unknown_session" -> register again
+    body: Optional[str] = None  # Signed POST body, send as-is (when return_body)
+
+
+class SessionRequest(BaseModel):
+    """Request model for registering a cookie set"""
+    cookies: Dict[str, str]
+
+
+class SessionResponse(BaseModel):
+    """Response model containing the session handle"""
+    success: bool
+    session_id: Optional[str] = None
+    error: Optional[str] = None
 
 
 class GuestCookiesResponse(BaseModel):
@@ -56,6 +188,18 @@ class GuestCookiesResponse(BaseModel):
     success: bool
     cookies: Optional[Dict[str, str]] = None
     error: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None  # Phase breakdown in ms
+    resources: Optional[Dict[str, Any]] = None  # Blocked / loaded resource counters
+
+
+class BatchSignRequest(BaseModel):
+    """Request model for batch signature generation"""
+    requests: List[SignRequest]
+
+
+class BatchSignResponse(BaseModel):
+    """Response model for batch signature generation (same order as requests)"""
+    results: List[SignResponse]
 
 
 @app.post("/sign", response_model=SignResponse)
@@ -69,57 +213,60 @@ async def generate_signature(request: SignRequest):
     
     Note: If the URI contains query parameters (e.g., ?num=20&cursor=),
     they will be automatically extracted and merged with the params field.
+    
+    Signing runs on the worker pool, so it never blocks the event loop.
+    
+    With `return_body: true`, POST responses also carry `body`: the exact
+    JSON string that was signed. Send it as the request body unchanged so
+    the signed bytes and the sent bytes cannot drift.
     """
     try:
-        # Parse URI to extract path and query parameters
-        from urllib.parse import urlparse, parse_qs
-        parsed = urlparse(request.uri)
-        uri_path = parsed.path  # Pure path without query string
-        
-        # Merge query parameters from URI with explicit params
-        params = dict(request.params) if request.params else {}
-        if parsed.query:
-            query_params = parse_qs(parsed.query)
-            for key, values in query_params.items():
-                # parse_qs returns lists, take first value
-                params[key] = values[0] if values else ""
-        
-        # Debug log - write to stderr since stdout may be captured
-        import sys
-        import json
-        print(f"[Agent] URI: {request.uri} -> path: {uri_path}, params: {params}", file=sys.stderr)
-        if request.payload:
-            # 将 payload 序列化为字符串，确保与 Rust 发送的 body 一致
-            payload_str = json.dumps(request.payload, ensure_ascii=False, separators=(',', ':'))
-            print(f"[Agent] Payload for signing: {payload_str}", file=sys.stderr)
-        
-        # Generate signatures using xhshow
-        # 注意：xhshow 需要 dict，不是字符串。但如果 xhshow 内部序列化方式不同，签名会不匹配
-        result = xhs_client.sign_headers(
-            method=request.method.upper(),
-            uri=uri_path,  # Use pure path
-            cookies=request.cookies,
-            params=params if params else None,
-            payload=request.payload
-        )
-        
-        # DEBUG: 打印 xhshow 返回的所有键
-        print(f"[Agent] xhshow returned keys: {list(result.keys())}", file=sys.stderr)
-        print(f"[Agent] x-xray-traceid: {result.get('x-xray-traceid', 'MISSING')}", file=sys.stderr)
-        
-        return SignResponse(
-            success=True,
-            x_s=result.get("x-s"),
-            x_t=str(result.get("x-t", "")),
-            x_s_common=result.get("x-s-common"),
-            x_b3_traceid=result.get("x-b3-traceid"),
-            x_xray_traceid=result.get("x-xray-traceid")
-        )
+        result = await sign_executor.sign(request.model_dump())
+    except ExecutorBusy as e:
+        return SignResponse(success=False, error=str(e))
+    return SignResponse(**result)
+
+
+@app.post("/sign/batch", response_model=BatchSignResponse)
+async def generate_signature_batch(request: BatchSignRequest):
+    """
+    Generate signatures for several requests in one round-trip.
+    
+    Used by the Rust SignatureService micro-batcher: requests that arrive
+    within a short window are sent together. Results are returned in the
+    same order as the input, each with its own success/error.
+    """
+    results = await sign_executor.sign_many([r.model_dump() for r in request.requests])
+    return BatchSignResponse(results=[SignResponse(**r) for r in results])
+
+
+@app.post("/session", response_model=SessionResponse)
+async def register_session(request: SessionRequest):
+    """
+    Register a cookie set and get a session handle for signing.
+    
+    Cookie-derived signing state (a1, x-s-common) is computed once and
+    memoized per handle, so later /sign calls can send `session_id`
+    instead of the full cookie dictionary. Handles are evicted by LRU or
+    idle TTL; a sign call with an evicted handle returns
+    error_code="unknown_session".
+    """
+    try:
+        session_id = await sign_executor.register_session(request.cookies)
+        return SessionResponse(success=True, session_id=session_id)
     except Exception as e:
-        return SignResponse(
-            success=False,
-            error=str(e)
-        )
+        return SessionResponse(success=False, error=str(e))
+
+
+async def _release_lease(lease, route_stats) -> None:
+    """Collect the flow's resource stats (best effort), then always return the context."""
+    try:
+        if route_stats is not None:
+            await route_stats.finish()
+    except Exception as e:
+        logging.warning(f"[ResourceBlocker] Failed to finish flow stats: {e}")
+    finally:
+        await lease.close()
 
 
 @app.get("/guest-cookies", response_model=GuestCookiesResponse)
@@ -127,96 +274,85 @@ async def get_guest_cookies():
     """
     Get guest cookies from xiaohongshu.com using Playwright.
     
-    This endpoint launches a headless browser, visits the XHS homepage,
-    waits for JavaScript to generate cookies, and returns them.
+    This endpoint borrows a fresh context from the warm browser pool,
+    visits the XHS homepage and returns as soon as JavaScript / Set-Cookie
+    has produced the required cookies (bounded by a deadline).
     
     Includes retry mechanism for improved reliability.
     
     Returns the essential cookies needed for QR code login:
     - a1, webId, gid, web_session, websectiga, acw_tc, etc.
-    """
-    import logging
     
+    `timings` reports the phase breakdown (acquire / navigate / cookies) in ms.
+    """
     max_retries = 3
     
     for attempt in range(max_retries):
+        timer = PhaseTimer()
         try:
-            from playwright.async_api import async_playwright
-            
             logging.info(f"[Guest Cookies] Attempt {attempt + 1}/{max_retries}")
             
-            async with async_playwright() as p:
-                # Launch headless browser with longer timeout
-                browser = await p.chromium.launch(
-                    headless=True,
-                    timeout=60000  # 60 seconds for browser launch
-                )
-                
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36",
+            with timer.phase("acquire"):
+                lease = await browser_pool.acquire(
+                    user_agent=BROWSER_USER_AGENT,
                     viewport={"width": 1920, "height": 1080}
                 )
-                
+            route_stats = None
+            try:
+                context = lease.context
                 # Set default timeouts
                 context.set_default_timeout(30000)
                 context.set_default_navigation_timeout(60000)
+                route_stats = await resource_blocker.install(context)
                 
                 page = await context.new_page()
                 
-                try:
-                    # Visit homepage with timeout and multiple wait strategies
+                with timer.phase("navigate"):
                     await page.goto(
                         "https://www.xiaohongshu.com/", 
-                        wait_until="domcontentloaded",  # Faster than networkidle
+                        wait_until="domcontentloaded",
                         timeout=45000
                     )
-                    
-                    # Wait for cookies to be generated
-                    await asyncio.sleep(3)
-                    
-                    # Try to wait for network idle if possible
-                    try:
-                        await page.wait_for_load_state("networkidle", timeout=10000)
-                    except:
-                        pass  # Ignore if networkidle times out
-                    
-                    # Additional wait for JS execution
-                    await asyncio.sleep(2)
-                    
-                finally:
-                    # Always extract cookies and close browser
-                    cookies_list = await context.cookies()
-                    await browser.close()
-                
-                # Convert to dictionary
-                cookies_dict = {c['name']: c['value'] for c in cookies_list}
-                
-                logging.info(f"[Guest Cookies] Got {len(cookies_dict)} cookies")
-                
-                # Verify essential cookies exist
-                required = ['a1', 'webId', 'gid', 'web_session']
-                missing = [k for k in required if k not in cookies_dict]
-                
-                if missing:
-                    if attempt < max_retries - 1:
-                        logging.warning(f"[Guest Cookies] Missing cookies: {missing}, retrying...")
-                        await asyncio.sleep(2)
-                        continue
-                    return GuestCookiesResponse(
-                        success=False,
-                        error=f"Missing required cookies after {max_retries} attempts: {missing}"
-                    )
                 
+                # Done as soon as the required cookies exist
+                with timer.phase("cookies"):
+                    cookies_dict, missing = await wait_for_cookies(context, page, GUEST_REQUIRED_COOKIES)
+            finally:
+                await _release_lease(lease, route_stats)
+            
+            resource_blocker.record(route_stats)
+            timings = timer.as_dict()
+            resources = route_stats.as_dict()
+            metrics.record_phases("guest", timings)
+            logging.info(f"[Guest Cookies] Got {len(cookies_dict)} cookies, timings(ms): {timings}, resources: {resources}")
+            
+            if missing:
+                if attempt < max_retries - 1:
+                    logging.warning(f"[Guest Cookies] Missing cookies: {missing}, retrying...")
+                    await asyncio.sleep(2)
+                    continue
+                metrics.COOKIE_FETCHES.inc("guest", "missing")
                 return GuestCookiesResponse(
-                    success=True,
-                    cookies=cookies_dict
+                    success=False,
+                    error=f"Missing required cookies after {max_retries} attempts: {missing}",
+                    timings=timings,
+                    resources=resources
                 )
-                
+            
+            metrics.COOKIE_FETCHES.inc("guest", "success")
+            return GuestCookiesResponse(
+                success=True,
+                cookies=cookies_dict,
+                timings=timings,
+                resources=resources
+            )
+            
         except Exception as e:
             logging.error(f"[Guest Cookies] Attempt {attempt + 1} failed: {e}")
             if attempt < max_retries - 1:
                 await asyncio.sleep(3)  # Wait before retry
                 continue
+            metrics.COOKIE_FETCHES.inc("guest", "error")
             return GuestCookiesResponse(
                 success=False,
                 error=f"Failed after {max_retries} attempts: {str(e)}"
@@ -244,34 +380,24 @@ async def sync_login_cookies(request: SyncCookiesRequest):
     Returns:
         Full dictionary of browser cookies including risk control cookies (acw_tc, etc.)
     """
-    import logging
-    
     web_session = request.web_session
     if not web_session:
         return GuestCookiesResponse(success=False, error="Missing web_session")
         
     logging.info(f"[Cookie Sync] Starting sync for session: {web_session[:6]}...")
     
+    timer = PhaseTimer()
     try:
-        from playwright.async_api import async_playwright
-        
-        async with async_playwright() as p:
-            # 启动无头模式（Headless），验证是否触发风控
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-blink-features=AutomationControlled", 
-                    "--no-sandbox",
-                    "--disable-infobars"
-                ],
-                timeout=60000
-            )
-            
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36",
+        # 无头模式（Headless）浏览器来自预热池，每次调用使用全新的隔离 Context
+        with timer.phase("acquire"):
+            lease = await browser_pool.acquire(
+                user_agent=BROWSER_USER_AGENT,
                 viewport={"width": 1920, "height": 1080}
             )
-            
+        route_stats = None
+        try:
+            context = lease.context
+            route_stats = await resource_blocker.install(context)
             # 注入 stealth 脚本（简化版）以绕过简单检测
             await context.add_init_script("""
                 Object.defineProperty(navigator, 'webdriver', {
@@ -289,16 +415,22 @@ async def sync_login_cookies(request: SyncCookiesRequest):
             
             page = await context.new_page()
             
-            try:
-                # 1. Visit homepage
-                logging.info("[Cookie Sync] Visiting Home...")
+            # 1. Visit homepage
+            logging.info("[Cookie Sync] Visiting Home...")
+            with timer.phase("navigate"):
                 await page.goto(
                     "https://www.xiaohongshu.com/", 
                     wait_until="domcontentloaded",
                     timeout=45000
                 )
-                
-                # 2. Trigger Search (User Hypothesis)
+            
+            # 2. Wait for the risk control cookies set by background requests
+            with timer.phase("cookies"):
+                cookies_dict, missing = await wait_for_cookies(context, page, SYNC_REQUIRED_COOKIES, timeout=5)
+            
+            # 3. Always trigger search (User Hypothesis): it sets risk control cookies
+            #    that are not in SYNC_REQUIRED_COOKIES, so wait until the jar settles
+            with timer.phase("search"):
                 try:
                     logging.info("[Cookie Sync] Clicking search box...")
                     search_selector = "input.search-input"
@@ -307,35 +439,33 @@ async def sync_login_cookies(request: SyncCookiesRequest):
                     
                     if await page.query_selector(search_selector):
                         await page.click(search_selector, timeout=5000)
-                        await asyncio.sleep(2)
                 except Exception as e:
                     logging.warning(f"[Cookie Sync] Search interaction error: {e}")
-
-                # 3. Wait for network idle (Critical for background layout requests)
-                try:
-                    await page.wait_for_load_state("networkidle", timeout=5000)
-                except:
-                    pass
-
-            finally:
-                # Always capture cookies
-                cookies_list = await context.cookies()
-                # DEBUG: Print all found cookie names
-                names = [c['name'] for c in cookies_list]
-                logging.info(f"[Cookie Sync] FINAL Captured Cookies ({len(names)}): {names}")
-                
-                await browser.close()
-            
-            cookies_dict = {c['name']: c['value'] for c in cookies_list}
-            logging.info(f"[Cookie Sync] Successfully synced {len(cookies_dict)} cookies")
-            
-            return GuestCookiesResponse(
-                success=True,
-                cookies=cookies_dict
-            )
-            
+                cookies_dict = await wait_for_cookies_settled(context, page)
+                missing = [name for name in SYNC_REQUIRED_COOKIES if name not in cookies_dict]
+        finally:
+            await _release_lease(lease, route_stats)
+        
+        resource_blocker.record(route_stats)
+        timings = timer.as_dict()
+        metrics.record_phases("sync", timings)
+        metrics.COOKIE_FETCHES.inc("sync", "missing" if missing else "success")
+        # DEBUG: Print all found cookie names
+        logging.info(f"[Cookie Sync] FINAL Captured Cookies ({len(cookies_dict)}): {list(cookies_dict)}")
+        if missing:
+            logging.warning(f"[Cookie Sync] Still missing after deadline: {missing}")
+        logging.info(f"[Cookie Sync] Successfully synced {len(cookies_dict)} cookies, timings(ms): {timings}")
+        
+        return GuestCookiesResponse(
+            success=True,
+            cookies=cookies_dict,
+            timings=timings,
+            resources=route_stats.as_dict()
+        )
+        
     except Exception as e:
         logging.error(f"[Cookie Sync] Failed: {e}")
+        metrics.COOKIE_FETCHES.inc("sync", "error")
         return GuestCookiesResponse(
             success=False,
             error=str(e)
@@ -344,16 +474,92 @@ async def sync_login_cookies(request: SyncCookiesRequest):
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "xhs-signature-agent"}
+    """Health check endpoint (includes signing executor queue depth and browser pool)"""
+    return {
+        "status": "healthy",
+        "service": "xhs-signature-agent",
+        "executor": sign_executor.stats(),
+        "browser_pool": browser_pool.stats(),
+        "resource_blocking": resource_blocker.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics: sign latency, executor queue, Playwright timings, cookie fetches"""
+    return PlainTextResponse(
+        metrics.render(sign_executor.stats(), browser_pool.stats(), resource_blocker.stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+def require_admin(authorization: Optional[str], x_admin_token: Optional[str]) -> None:
+    """Check the admin token (Authorization: Bearer ... or X-Admin-Token)."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = x_admin_token or (authorization or "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(
+    mode: str = "cpu",
+    seconds: float = 10,
+    interval_ms: float = 10,
+    workers: bool = True,
+    authorization: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Profile the live agent for `seconds` (admin only, see xhs_agent/profiling.py).
+
+    - mode=cpu: collapsed stacks (`process;thread;frames... count`), pipe
+      into flamegraph.pl / inferno-flamegraph or load in speedscope
+    - mode=memory: allocation growth per source line (tracemalloc)
+
+    With `workers=true` the signing worker processes are profiled too.
+    Only one profile runs at a time (409 while busy).
+    """
+    require_admin(authorization, x_admin_token)
+    if mode not in profiling.MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {profiling.MODES}")
+    if not 0 < seconds <= profiling.MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {profiling.MAX_SECONDS:g}]")
+    interval = max(interval_ms, 1) / 1000
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        logging.info(f"[Profile] {mode} profile for {seconds:g}s (workers: {workers})")
+        label = f"agent-{os.getpid()}"
+        local = asyncio.get_running_loop().run_in_executor(
+            None, profiling.profile_process, mode, seconds, interval, label
+        )
+        pooled = sign_executor.profile_workers(mode, seconds, interval) if workers else asyncio.sleep(0, {})
+        report, worker_reports = await asyncio.gather(local, pooled)
+
+    processes = [label] + [f"worker-{pid}" for pid in sorted(worker_reports)]
+    return PlainTextResponse(
+        report + "".join(worker_reports[pid] for pid in sorted(worker_reports)),
+        headers={"X-Profile-Processes": ",".join(processes)},
+    )
 
 
 if __name__ == "__main__":
     print("Starting XHS Signature Agent Server...")
     print("Endpoints:")
     print("  POST /sign - Generate signatures")
+    print("  POST /sign/batch - Generate signatures in batch")
+    print("  POST /session - Register cookies for session-handle signing")
     print("  GET /guest-cookies - Get guest cookies via Playwright")
     print("  GET /health - Health check")
+    print("  GET /metrics - Prometheus metrics")
     print("  GET /docs - OpenAPI documentation")
-    uvicorn.run(app, host="127.0.0.1", port=8765)
+    # 作为远程签名节点运行时设置 AGENT_HOST=0.0.0.0（Rust 侧用 XHS_AGENT_URLS 指向它）
+    uvicorn.run(
+        app,
+        host=os.environ.get("AGENT_HOST", "127.0.0.1"),
+        port=int(os.environ.get("AGENT_PORT", 8765)),
+    )
 
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Signing benchmark suite
+
+Measures how fast the signing path is and whether a change made it slower.
+
+Modes:
+    compute  - pure-compute microbenchmark: Xhshow.sign_headers in a loop,
+               plus the session path (sign_xs with a memoized x-s-common)
+    asgi     - drives scripts/agent_server.py in-process over ASGI
+               (FastAPI routing + pydantic + the signing executor, no socket)
+    http     - a running agent over TCP (--url, default http://127.0.0.1:8765)
+    uds      - a running agent over its Unix socket (--socket), msgpack frames
+
+Workloads are the real endpoints from `endpoint_to_uri` in src/api/common.rs
+(homefeed, search/notes, you/mentions, ...) with the payloads the Rust server
+sends. Each request picks one of several realistic cookie sets.
+
+Every (mode, workload, concurrency) cell reports ops/sec and p50/p95/p99
+latency. Results are written as JSON (--output) and can be compared against
+a previous run (--baseline); the exit code is 1 when any cell regressed by
+more than --max-regression percent.
+
+The asgi and http modes use httpx (listed in scripts/requirements.txt).
+
+Usage:
+    python scripts/bench_sign.py --modes compute,asgi --output bench.json
+    python scripts/bench_sign.py --modes http --concurrency 1,16,64 --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import string
+import struct
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Make sibling packages importable (same as agent_server.py)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# ============================================================================
+# Workloads
+# ============================================================================
+
+HOMEFEED_PAYLOAD = {
+    "cursor_score": "",
+    "num": 43,
+    "refresh_type": 1,
+    "note_index": 35,
+    "unread_begin_note_id": "",
+    "unread_end_note_id": "",
+    "unread_note_count": 0,
+    "category": "homefeed_recommend",
+    "search_key": "",
+    "need_num": 18,
+    "image_formats": ["jpg", "webp", "avif"],
+    "need_filter_image": False,
+}
+
+# 字段顺序与 src/api/search.rs 一致（签名对顺序敏感）
+SEARCH_NOTES_PAYLOAD = {
+    "keyword": "咖啡探店",
+    "page": 1,
+    "page_size": 20,
+    "search_id": "2eh5ov3s6c0gkxbc5ihgl",
+    "sort": "general",
+    "note_type": 0,
+    "ext_flags": [],
+    "filters": [
+        {"tags": ["general"], "type": "sort_type"},
+        {"tags": ["不限"], "type": "filter_note_type"},
+        {"tags": ["不限"], "type": "filter_note_time"},
+        {"tags": ["不限"], "type": "filter_note_range"},
+        {"tags": ["不限"], "type": "filter_pos_distance"},
+    ],
+    "geo": "",
+    "image_formats": ["jpg", "webp", "avif"],
+}
+
+WORKLOADS: Dict[str, Dict[str, Any]] = {
+    "homefeed": {"method": "POST", "uri": "/api/sns/web/v1/homefeed", "payload": HOMEFEED_PAYLOAD},
+    "search_notes": {"method": "POST", "uri": "/api/sns/web/v1/search/notes", "payload": SEARCH_NOTES_PAYLOAD},
+    "notification_mentions": {"method": "GET", "uri": "/api/sns/web/v1/you/mentions?num=20&cursor="},
+    "notification_likes": {"method": "GET", "uri": "/api/sns/web/v1/you/likes?num=20&cursor="},
+    "search_trending": {"method": "GET", "uri": "/api/sns/web/v1/search/querytrending"},
+    "user_me": {"method": "GET", "uri": "/api/sns/web/v2/user/me"},
+}
+
+
+def make_cookie_sets(count: int, seed: int = 42) -> List[Dict[str, str]]:
+    """Synthetic cookie sets shaped like a logged-in browser's (deterministic)."""
+    rng = random.Random(seed)
+
+    def token(alphabet: str, length: int) -> str:
+        return "".join(rng.choice(alphabet) for _ in range(length))
+
+    hexdigits = "0123456789abcdef"
+    now_ms = 1_760_000_000_000
+    cookie_sets = []
+    for _ in range(count):
+        cookie_sets.append({
+            "a1": f"19{token(hexdigits, 11)}{token(string.ascii_lowercase + string.digits, 39)}",
+            "webId": token(hexdigits, 32),
+            "gid": token(string.ascii_letters + string.digits, 52),
+            "web_session": f"0400{token(hexdigits, 64)}",
+            "webBuild": "4.62.3",
+            "xsecappid": "xhs-pc-web",
+            "acw_tc": token(hexdigits, 64),
+            "websectiga": token(hexdigits, 64),
+            "sec_poison_id": f"{token(hexdigits, 8)}-{token(hexdigits, 4)}-{token(hexdigits, 4)}-{token(hexdigits, 4)}-{token(hexdigits, 12)}",
+            "loadts": str(now_ms + rng.randint(0, 10**6)),
+            "unread": json.dumps({"ub": token(hexdigits, 24), "ue": token(hexdigits, 24), "uc": rng.randint(0, 30)}),
+        })
+    return cookie_sets
+
+
+def build_request(workload: str, cookies: Dict[str, str]) -> Dict[str, Any]:
+    spec = WORKLOADS[workload]
+    request = {"method": spec["method"], "uri": spec["uri"], "cookies": cookies}
+    if "payload" in spec:
+        request["payload"] = spec["payload"]
+        request["return_body"] = True
+    return request
+
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(mode: str, workload: str, concurrency: int, latencies: List[float],
+              errors: int, elapsed: float, **extra: Any) -> Dict[str, Any]:
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "mode": mode,
+        "workload": workload,
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        **extra,
+    }
+
+
+async def run_closed_loop(call: Callable[[int], Awaitable[bool]], total: int,
+                          concurrency: int) -> Dict[str, Any]:
+    """`concurrency` workers issue `total` calls back to back."""
+    latencies: List[float] = []
+    errors = 0
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal issued, errors
+        while issued < total:
+            index = issued
+            issued += 1
+            started = time.perf_counter()
+            try:
+                ok = await call(index)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors, "elapsed": time.perf_counter() - started}
+
+
+# ============================================================================
+# Modes
+# ============================================================================
+
+def bench_compute(args, cookie_sets) -> List[Dict[str, Any]]:
+    """sign_headers and the memoized-session path, single thread, no I/O."""
+    from urllib.parse import parse_qs, urlparse
+    from xhshow import Xhshow
+
+    client = Xhshow()
+    results = []
+    for workload in args.workloads:
+        spec = WORKLOADS[workload]
+        parsed = urlparse(spec["uri"])
+        # 与 Agent 一致：parse_qs 丢弃空值参数
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()} or None
+        payload = spec.get("payload")
+        x_s_common = {id(c): client.sign_xs_common(c) for c in cookie_sets}
+
+        variants = {
+            "sign_headers": lambda cookies: client.sign_headers(
+                method=spec["method"], uri=parsed.path, cookies=cookies, params=params, payload=payload),
+            "sign_xs_session": lambda cookies: (
+                client.sign_xs(spec["method"], parsed.path, cookies["a1"],
+                               payload=payload if spec["method"] == "POST" else params),
+                x_s_common[id(cookies)],
+            ),
+        }
+        for variant, fn in variants.items():
+            for i in range(min(args.warmup, args.requests)):
+                fn(cookie_sets[i % len(cookie_sets)])
+            latencies = []
+            started = time.perf_counter()
+            for i in range(args.requests):
+                t0 = time.perf_counter()
+                fn(cookie_sets[i % len(cookie_sets)])
+                latencies.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - started
+            results.append(summarize("compute", workload, 1, latencies, 0, elapsed, variant=variant))
+            print_row(results[-1])
+    return results
+
+
+class SignClient:
+    """Common interface of the asgi/http/uds drivers."""
+
+    async def sign(self, request: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    async def register(self, cookies: Dict[str, str]) -> Optional[str]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpSignClient(SignClient):
+    """POST /sign through httpx (ASGI transport in-process, or TCP)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def sign(self, request: Dict[str, Any]) -> bool:
+        resp = await self.client.post("/sign", json=request)
+        return resp.status_code == 200 and resp.json().get("success", False)
+
+    async def register(self, cookies: Dict[str, str]) -> Optional[str]:
+        resp = await self.client.post("/session", json={"cookies": cookies})
+        return resp.json().get("session_id") if resp.status_code == 200 else None
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class UdsSignClient(SignClient):
+    """Length-prefixed msgpack frames, one connection per in-flight request."""
+
+    _HEADER = struct.Struct(">I")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._idle: List[Any] = []
+
+    async def _call(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        import msgpack
+
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_unix_connection(self.path)
+        data = msgpack.packb(frame, use_bin_type=True)
+        writer.write(self._HEADER.pack(len(data)) + data)
+        await writer.drain()
+        (length,) = self._HEADER.unpack(await reader.readexactly(self._HEADER.size))
+        reply = msgpack.unpackb(await reader.readexactly(length), raw=False)
+        self._idle.append((reader, writer))
+        return reply
+
+    async def sign(self, request: Dict[str, Any]) -> bool:
+        reply = await self._call({"op": "sign_batch", "requests": [request]})
+        return bool(reply.get("results") and reply["results"][0].get("success"))
+
+    async def register(self, cookies: Dict[str, str]) -> Optional[str]:
+        return (await self._call({"op": "register_session", "cookies": cookies})).get("session_id")
+
+    async def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+async def bench_transport(mode: str, client: SignClient, args, cookie_sets) -> List[Dict[str, Any]]:
+    """Closed-loop load at each concurrency level for every workload."""
+    handles: Dict[int, str] = {}
+    if args.sessions:
+        for i, cookies in enumerate(cookie_sets):
+            handle = await client.register(cookies)
+            if handle:
+                handles[i] = handle
+
+    def request_for(workload: str, index: int) -> Dict[str, Any]:
+        slot = index % len(cookie_sets)
+        request = build_request(workload, cookie_sets[slot])
+        if slot in handles:
+            request["session_id"] = handles[slot]
+            request["cookies"] = {}
+        return request
+
+    results = []
+    for workload in args.workloads:
+        for _ in range(args.warmup):
+            await client.sign(request_for(workload, _))
+        for concurrency in args.concurrency:
+            run = await run_closed_loop(
+                lambda index: client.sign(request_for(workload, index)), args.requests, concurrency)
+            results.append(summarize(mode, workload, concurrency, run["latencies"], run["errors"],
+                                     run["elapsed"], sessions=bool(handles)))
+            print_row(results[-1])
+    return results
+
+
+async def bench_asgi(args, cookie_sets) -> List[Dict[str, Any]]:
+    import httpx
+    import agent_server
+
+    app = agent_server.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        client = HttpSignClient(httpx.AsyncClient(transport=transport, base_url="http://agent"))
+        try:
+            return await bench_transport("asgi", client, args, cookie_sets)
+        finally:
+            await client.close()
+
+
+async def bench_http(args, cookie_sets) -> List[Dict[str, Any]]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    client = HttpSignClient(httpx.AsyncClient(base_url=args.url, limits=limits, timeout=10))
+    try:
+        return await bench_transport("http", client, args, cookie_sets)
+    finally:
+        await client.close()
+
+
+async def bench_uds(args, cookie_sets) -> List[Dict[str, Any]]:
+    client = UdsSignClient(args.socket)
+    try:
+        return await bench_transport("uds", client, args, cookie_sets)
+    finally:
+        await client.close()
+
+
+# ============================================================================
+# Reporting
+# ============================================================================
+
+def print_row(row: Dict[str, Any]) -> None:
+    label = row.get("variant") or ("session" if row.get("sessions") else "cookies")
+    print(f"  {row['mode']:<7} {row['workload']:<22} {label:<16} c={row['concurrency']:<4} "
+          f"{row['ops_per_sec']:>9.1f} ops/s  p50 {row['p50_ms']:>8.3f}  p95 {row['p95_ms']:>8.3f}  "
+          f"p99 {row['p99_ms']:>8.3f} ms  errors {row['errors']}")
+
+
+def row_key(row: Dict[str, Any]) -> tuple:
+    return (row["mode"], row["workload"], row.get("variant", ""), row.get("sessions", False), row["concurrency"])
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> bool:
+    """Print per-cell deltas against a baseline run; False if anything regressed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {row_key(row): row for row in json.load(f)["results"]}
+
+    ok = True
+    print(f"\nComparison against {baseline_path} (max regression {max_regression}%):")
+    for row in results:
+        base = baseline.get(row_key(row))
+        if base is None or not base["ops_per_sec"]:
+            continue
+        ops_delta = (row["ops_per_sec"] - base["ops_per_sec"]) / base["ops_per_sec"] * 100
+        p99_delta = ((row["p99_ms"] - base["p99_ms"]) / base["p99_ms"] * 100) if base["p99_ms"] else 0.0
+        regressed = ops_delta < -max_regression or p99_delta > max_regression
+        ok = ok and not regressed
+        print(f"  {'REGRESSED' if regressed else 'ok':<9} {row['mode']:<7} {row['workload']:<22} "
+              f"c={row['concurrency']:<4} ops/s {ops_delta:+6.1f}%  p99 {p99_delta:+6.1f}%")
+    return ok
+
+
+def metadata(args) -> Dict[str, Any]:
+    try:
+        from importlib.metadata import version
+        xhshow_version = version("xhshow")
+    except Exception:
+        xhshow_version = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "xhshow": xhshow_version,
+        "agent_sign_workers": os.environ.get("AGENT_SIGN_WORKERS"),
+        "requests": args.requests,
+        "cookie_sets": args.cookie_sets,
+        "sessions": args.sessions,
+    }
+
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="XHS signing benchmark")
+    parser.add_argument("--modes", default="compute,asgi",
+                        help="Comma separated: compute, asgi, http, uds")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS),
+                        help=f"Comma separated subset of: {', '.join(WORKLOADS)}")
+    parser.add_argument("--concurrency", default="1,4,16,64",
+                        help="Concurrency levels for asgi/http/uds")
+    parser.add_argument("--requests", type=int, default=500,
+                        help="Requests per (workload, concurrency) cell")
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="Unmeasured requests per workload")
+    parser.add_argument("--cookie-sets", type=int, default=8,
+                        help="Number of distinct cookie sets to rotate through")
+    parser.add_argument("--no-sessions", dest="sessions", action="store_false",
+                        help="Send full cookies instead of session handles")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Agent URL for http mode")
+    parser.add_argument("--socket", default=os.environ.get("XHS_AGENT_SOCKET", "/tmp/xhs-agent.sock"),
+                        help="Agent socket for uds mode")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="Allowed ops/s drop or p99 rise in percent before failing")
+
+    args = parser.parse_args()
+    # httpx 每个请求一行 INFO 日志，会淹没结果表
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args.workloads = [w for w in args.workloads.split(",") if w]
+    unknown = [w for w in args.workloads if w not in WORKLOADS]
+    if unknown:
+        parser.error(f"Unknown workloads: {', '.join(unknown)}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+
+    cookie_sets = make_cookie_sets(args.cookie_sets)
+    results: List[Dict[str, Any]] = []
+    for mode in [m for m in args.modes.split(",") if m]:
+        print(f"[{mode}]")
+        if mode == "compute":
+            results += bench_compute(args, cookie_sets)
+        elif mode == "asgi":
+            results += asyncio.run(bench_asgi(args, cookie_sets))
+        elif mode == "http":
+            results += asyncio.run(bench_http(args, cookie_sets))
+        elif mode == "uds":
+            results += asyncio.run(bench_uds(args, cookie_sets))
+        else:
+            parser.error(f"Unknown mode: {mode}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": metadata(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline and not compare(results, args.baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
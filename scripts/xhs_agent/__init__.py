@@ -0,0 +1,18 @@
+"""
+XHS Agent Package - internals of scripts/agent_server.py
+
+签名计算、进程池执行器与会话句柄，供 FastAPI Agent 使用。
+"""
+
+from .executor import SignExecutor, ExecutorBusy, UnknownSession
+from .sessions import SessionStore, SessionState
+
+__all__ = [
+    # Executor
+    "SignExecutor",
+    "ExecutorBusy",
+    "UnknownSession",
+    # Sessions
+    "SessionStore",
+    "SessionState",
+]
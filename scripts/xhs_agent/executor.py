@@ -0,0 +1,235 @@
+"""
+Signing executor backed by a pool of worker processes
+
+`Xhshow.sign_headers` is CPU-bound pure Python. Running it directly in an
+`async def` endpoint blocks the event loop, so one slow sign stalls every
+other request (including /health). SignExecutor moves signing into a
+ProcessPoolExecutor where each worker holds its own Xhshow instance, and
+bounds the number of requests waiting for a worker.
+
+Configuration (environment variables):
+    AGENT_SIGN_WORKERS - number of worker processes (default: CPU count,
+                         0 = sign inline on the event loop, for debugging)
+    AGENT_SIGN_QUEUE   - max requests waiting for a worker (default: 256)
+
+Requests may carry a session handle (see sessions.py) instead of cookies;
+the executor swaps in the memoized a1 / x-s-common before signing.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from . import profiling, signing
+from .metrics import SIGN_DURATION, SIGN_RESULTS
+from .sessions import SessionStore, SessionState, identity_for, session_id_for
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusy(Exception):
+    """Raised when the signing queue is full."""
+
+
+class UnknownSession(Exception):
+    """Raised when a sign request refers to an unknown or expired session handle."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class SignExecutor:
+    """
+    Run sign requests on a bounded process pool.
+
+    Usage:
+        executor = SignExecutor()
+        executor.start()
+        result = await executor.sign({"method": "GET", "uri": ..., "cookies": ...})
+        executor.shutdown()
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        sessions: Optional[SessionStore] = None,
+    ):
+        self.sessions = sessions if sessions is not None else SessionStore()
+        self.workers = workers if workers is not None else _env_int("AGENT_SIGN_WORKERS", os.cpu_count() or 1)
+        self.max_queue = max_queue if max_queue is not None else _env_int("AGENT_SIGN_QUEUE", 256)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0  # submitted but not finished
+        self._completed = 0
+        self._rejected = 0
+
+    def start(self) -> None:
+        """Create the worker pool and spawn every worker up front."""
+        if self.workers <= 0:
+            signing.get_client()
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=signing.init_worker,
+        )
+        # ProcessPoolExecutor spawns lazily; force all workers up now so the
+        # first real requests don't pay for interpreter startup.
+        for future in [self._pool.submit(signing.ping) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a free worker."""
+        return max(0, self._pending - max(self.workers, 1))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(self._pending, max(self.workers, 1)),
+            "queue_depth": self.queue_depth,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "sessions": self.sessions.stats(),
+        }
+
+    async def _run(self, fn: Callable[[Any], Any], arg: Any) -> Any:
+        """Run fn(arg) on the pool (or inline when workers == 0)."""
+        if self._pool is None:
+            return fn(arg)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, fn, arg)
+
+    async def profile_workers(self, mode: str, seconds: float, interval: float) -> Dict[int, str]:
+        """
+        Profile every worker process for `seconds` (see profiling.py).
+
+        Returns:
+            {pid: report} for the workers that were reached (empty when
+            signing runs inline)
+        """
+        if self._pool is None:
+            return {}
+        loop = asyncio.get_running_loop()
+        with tempfile.TemporaryDirectory(prefix="xhs-agent-profile-") as out_dir:
+            args = {"mode": mode, "seconds": seconds, "interval": interval, "out_dir": out_dir}
+            started = await asyncio.gather(*(
+                loop.run_in_executor(self._pool, profiling.start_in_worker, args)
+                for _ in range(self.workers)
+            ))
+            pids = {pid for pid in started if pid is not None}
+            await asyncio.sleep(seconds)
+
+            # Reports land shortly after the window; memory snapshots can take a moment
+            reports: Dict[int, str] = {}
+            deadline = time.monotonic() + 10
+            while len(reports) < len(pids) and time.monotonic() < deadline:
+                for pid in pids - reports.keys():
+                    path = os.path.join(out_dir, f"{pid}.txt")
+                    if os.path.exists(path):
+                        with open(path, encoding="utf-8") as f:
+                            reports[pid] = f.read()
+                await asyncio.sleep(0.1)
+            return reports
+
+    async def register_session(self, cookies: Dict[str, str]) -> str:
+        """
+        Register a cookie set and return its session handle.
+
+        The cookie-derived signing state is computed once here; registering
+        the same cookies again returns the existing handle.
+
+        Raises:
+            ValueError: if the cookies have no a1
+        """
+        session_id = session_id_for(cookies)
+        if self.sessions.get(session_id) is not None:
+            return session_id
+        derived = await self._run(signing.derive_session, cookies)
+        self.sessions.put(session_id, SessionState(
+            a1=derived["a1"],
+            x_s_common=derived["x_s_common"],
+            identity=identity_for(cookies),
+        ))
+        return session_id
+
+    def _resolve(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace a session handle with its memoized signing state."""
+        session_id = request.get("session_id")
+        if not session_id:
+            return request
+        state = self.sessions.get(session_id)
+        if state is None:
+            raise UnknownSession(f"Unknown or expired session: {session_id}")
+        resolved = {k: v for k, v in request.items() if k not in ("cookies", "session_id")}
+        resolved["a1"] = state.a1
+        resolved["x_s_common"] = state.x_s_common
+        return resolved
+
+    async def sign(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sign one request on the pool.
+
+        An unknown session handle is reported with error_code
+        "unknown_session" so the caller can register again.
+
+        Raises:
+            ExecutorBusy: if the queue is full
+        """
+        try:
+            request = self._resolve(request)
+        except UnknownSession as e:
+            SIGN_RESULTS.inc("unknown_session")
+            return {"success": False, "error": str(e), "error_code": "unknown_session"}
+
+        if self.queue_depth >= self.max_queue:
+            self._rejected += 1
+            SIGN_RESULTS.inc("busy")
+            raise ExecutorBusy(f"Signing queue full ({self.max_queue} waiting)")
+
+        started = time.perf_counter()
+        self._pending += 1
+        result: Dict[str, Any] = {}
+        try:
+            result = await self._run(signing.sign_request, request)
+            return result
+        finally:
+            self._pending -= 1
+            self._completed += 1
+            SIGN_DURATION.observe_since(started)
+            SIGN_RESULTS.inc("ok" if result.get("success") else "error")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"[Agent] [{request.get('request_id') or '-'}] Signed {request.get('uri')} "
+                    f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+                )
+
+    async def sign_many(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sign several requests concurrently, preserving order.
+
+        A full queue is reported per entry instead of failing the whole batch.
+        """
+        async def one(request: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                return await self.sign(request)
+            except ExecutorBusy as e:
+                return {"success": False, "error": str(e)}
+
+        return list(await asyncio.gather(*(one(r) for r in requests)))
@@ -0,0 +1,89 @@
+"""
+Agent logging setup
+
+All agent output goes through `logging` with a QueueHandler: callers (the
+event loop, signing workers) only enqueue records, and a background
+QueueListener thread does the actual write to stderr. A slow or full
+stderr pipe therefore never blocks signing.
+
+Each line starts with the level name so the Rust AgentManager can map it
+to a tracing level:
+
+    INFO xhs_agent.uds: [UDS] Listening on /tmp/xhs-agent.sock
+
+Per-sign debug output is off by default. With AGENT_LOG_LEVEL=DEBUG it is
+sampled: only one in AGENT_LOG_SAMPLE_EVERY records from hot-path loggers
+is kept.
+
+Configuration (environment variables):
+    AGENT_LOG_LEVEL        - root log level (default: INFO)
+    AGENT_LOG_SAMPLE_EVERY - keep 1 of N hot-path debug records (default: 100)
+"""
+
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from typing import Optional
+
+# Loggers that emit per-request records
+HOT_PATH_LOGGERS = ("xhs_agent.signing",)
+
+LOG_FORMAT = "%(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class SampleFilter(logging.Filter):
+    """Keep one of every `every` DEBUG records from hot-path loggers."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(every, 1)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or not record.name.startswith(HOT_PATH_LOGGERS):
+            return True
+        return next(self._counter) % self.every == 0
+
+
+def setup_logging() -> None:
+    """
+    Route this process's logging through a non-blocking queue (idempotent).
+
+    Called by the agent at import time and by every signing worker.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = os.environ.get("AGENT_LOG_LEVEL", "INFO").upper()
+    try:
+        sample_every = int(os.environ.get("AGENT_LOG_SAMPLE_EVERY", 100))
+    except ValueError:
+        sample_every = 100
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SampleFilter(sample_every))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(getattr(logging, level, logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
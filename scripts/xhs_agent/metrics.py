@@ -0,0 +1,213 @@
+"""
+Prometheus metrics for the agent
+
+GET /metrics renders these in the Prometheus text format. The Rust server
+scrapes every agent's /metrics and merges it into its own /metrics with an
+`agent` label, so one scrape target covers the whole signing stack.
+
+Hand-rolled instead of prometheus_client to keep the agent's dependency
+list unchanged. Everything runs on the event loop thread (signing workers
+only return results), so plain ints and floats are enough.
+
+Metrics:
+    xhs_agent_sign_duration_seconds   - sign latency (queue + worker)
+    xhs_agent_sign_total{result}      - ok / error / busy / unknown_session
+    xhs_agent_browser_launch_seconds  - Chromium launch duration
+    xhs_agent_flow_phase_seconds{flow,phase} - cookie flow phases (PhaseTimer)
+    xhs_agent_cookie_fetch_total{flow,outcome} - success / missing / error
+    xhs_agent_executor_rejected_total - sign requests rejected on a full queue
+plus gauges read from the executor, browser pool and resource blocker
+stats at scrape time.
+"""
+
+import bisect
+import time
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Same buckets as the Rust side (src/metrics.rs), in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Browser launches and page flows take seconds, not milliseconds
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> ([count per bucket + overflow], sum, count)
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        REGISTRY.append(self)
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+        series[2] += 1
+
+    def observe_since(self, started: float, *labels: str) -> None:
+        """Observe the time elapsed since a time.perf_counter() value."""
+        self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = _labels(self.label_names, labels, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+REGISTRY: List[Any] = []
+
+SIGN_DURATION = Histogram(
+    "xhs_agent_sign_duration_seconds",
+    "Sign latency in the agent, including time waiting for a worker",
+)
+SIGN_RESULTS = Counter(
+    "xhs_agent_sign_total",
+    "Sign requests by result",
+    ("result",),
+)
+BROWSER_LAUNCH = Histogram(
+    "xhs_agent_browser_launch_seconds",
+    "Chromium launch duration",
+    buckets=SLOW_BUCKETS,
+)
+FLOW_PHASES = Histogram(
+    "xhs_agent_flow_phase_seconds",
+    "Cookie flow phase durations (acquire / navigate / cookies / search / total)",
+    ("flow", "phase"),
+    buckets=SLOW_BUCKETS,
+)
+COOKIE_FETCHES = Counter(
+    "xhs_agent_cookie_fetch_total",
+    "Cookie fetch outcomes by flow",
+    ("flow", "outcome"),
+)
+
+
+def record_phases(flow: str, timings: Dict[str, float]) -> None:
+    """Observe a PhaseTimer.as_dict() result (milliseconds)."""
+    for phase, ms in timings.items():
+        FLOW_PHASES.observe(ms / 1000, flow, phase)
+
+
+def _samples(name: str, help: str, kind: str, samples: Iterable[Tuple[str, float]]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{labels} {value:g}" for labels, value in samples)
+    return lines
+
+
+def _gauges(name: str, help: str, samples: Iterable[Tuple[str, float]]) -> List[str]:
+    return _samples(name, help, "gauge", samples)
+
+
+def _counters(name: str, help: str, samples: Iterable[Tuple[str, float]]) -> List[str]:
+    """Monotonic totals kept elsewhere (stats dicts), read at scrape time."""
+    return _samples(name, help, "counter", samples)
+
+
+def render(executor: Dict[str, Any], browser_pool: Dict[str, Any], resources: Dict[str, Any]) -> str:
+    """
+    Render every registered metric plus point-in-time gauges.
+
+    Args:
+        executor: SignExecutor.stats()
+        browser_pool: BrowserPool.stats()
+        resources: ResourceBlocker.stats()
+    """
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    sessions = executor.get("sessions", {})
+    lines += _gauges("xhs_agent_executor_queue_depth", "Sign requests waiting for a worker",
+                     [("", executor.get("queue_depth", 0))])
+    lines += _gauges("xhs_agent_executor_in_flight", "Sign requests running on a worker",
+                     [("", executor.get("in_flight", 0))])
+    lines += _gauges("xhs_agent_executor_workers", "Signing worker processes (0 = inline)",
+                     [("", executor.get("workers", 0))])
+    lines += _counters("xhs_agent_executor_rejected_total", "Sign requests rejected because the queue was full",
+                       [("", executor.get("rejected", 0))])
+    lines += _gauges("xhs_agent_sessions", "Registered sign session handles",
+                     [("", sessions.get("sessions", 0))])
+    lines += _gauges("xhs_agent_session_lookups", "Sign session handle lookups",
+                     [('{result="hit"}', sessions.get("hits", 0)),
+                      ('{result="miss"}', sessions.get("misses", 0))])
+
+    lines += _gauges("xhs_agent_browser_pool_idle", "Idle browsers in the pool",
+                     [("", browser_pool.get("idle", 0))])
+    lines += _gauges("xhs_agent_browser_pool_events", "Browser pool lifecycle events",
+                     [(f'{{event="{event}"}}', browser_pool.get(event, 0))
+                      for event in ("leases", "launches", "recycled", "crashed")])
+
+    lines += _gauges("xhs_agent_resource_requests", "Cookie flow sub-resource requests",
+                     [('{result="allowed"}', resources.get("allowed", 0)),
+                      ('{result="blocked"}', resources.get("blocked", 0))])
+    lines += _gauges("xhs_agent_resource_blocked_by_type", "Cookie flow requests blocked, by resource type",
+                     [(f'{{type="{kind}"}}', count)
+                      for kind, count in sorted(resources.get("blocked_by_type", {}).items())])
+    lines += _gauges("xhs_agent_resource_bytes_loaded", "Bytes loaded by cookie flows",
+                     [("", resources.get("bytes_loaded", 0))])
+    baseline = resources.get("baseline", {})
+    lines += _gauges("xhs_agent_resource_flow_bytes", "Average bytes loaded per cookie flow",
+                     [('{mode="blocked"}', resources.get("bytes_per_flow", 0)),
+                      ('{mode="baseline"}', baseline.get("bytes_per_flow", 0))])
+    lines += _gauges("xhs_agent_resource_flow_ms", "Average cookie flow duration in milliseconds",
+                     [('{mode="blocked"}', resources.get("ms_per_flow", 0)),
+                      ('{mode="baseline"}', baseline.get("ms_per_flow", 0))])
+    saved = resources.get("saved") or {}
+    lines += _gauges("xhs_agent_resource_saved", "Per-flow savings of the block profile vs. the unblocked baseline",
+                     [('{unit="bytes"}', saved.get("bytes_per_flow", 0)),
+                      ('{unit="ms"}', saved.get("ms_per_flow", 0))])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,165 @@
+"""
+On-demand profiling for the live agent
+
+GET /admin/profile (see agent_server.py) runs one of two profilers for a
+bounded number of seconds, in the agent process and, when signing is
+pooled, in every signing worker:
+
+    cpu    - wall-clock stack sampling of every thread via
+             sys._current_frames(). Output is collapsed stacks, one
+             `process;thread;frame;...;frame count` line per unique stack,
+             ready for flamegraph.pl, inferno or speedscope.
+    memory - tracemalloc snapshots at start and end; reports the source
+             lines whose allocations grew the most during the window.
+
+Overhead is bounded: the sampler is a single thread that wakes every
+`interval` seconds (default 10 ms) and only walks frame objects, and both
+profilers stop on their own after at most AGENT_PROFILE_MAX_SECONDS.
+tracemalloc slows allocation-heavy code while it runs, so memory windows
+should be kept short under load.
+
+Worker processes are reached through the signing pool: a start task is
+submitted per worker, each worker profiles itself in a background thread
+and writes its report to a temporary directory that the agent collects.
+The pool hands tasks to whichever worker is free, so under heavy load a
+worker may be missed; the report lists the processes it covers.
+
+Configuration (environment variables):
+    AGENT_PROFILE_MAX_SECONDS - longest allowed profiling window (default: 60)
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+MODES = ("cpu", "memory")
+
+# Frames kept per tracemalloc traceback (1 = group by allocating line)
+_TRACE_DEPTH = 1
+
+# Lines reported per process in memory mode
+_MEMORY_TOP = 40
+
+# Guards against overlapping profiles inside one worker process
+_worker_active = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+MAX_SECONDS = _env_float("AGENT_PROFILE_MAX_SECONDS", 60)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> List[str]:
+    """Frames of one stack, outermost first."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def sample_stacks(seconds: float, interval: float, label: str) -> Dict[str, int]:
+    """
+    Sample every thread's stack (except the caller's) until the deadline.
+
+    Returns:
+        {"label;thread;frame;...": samples}
+    """
+    me = threading.get_ident()
+    thread_names: Dict[int, str] = {}
+    counts: Dict[str, int] = collections.Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if ident not in thread_names:
+                thread_names.update((t.ident, t.name) for t in threading.enumerate())
+            thread = thread_names.get(ident, f"thread-{ident}")
+            counts[";".join([label, thread, *_collapse(frame)])] += 1
+        time.sleep(interval)
+    return counts
+
+
+def allocation_growth(seconds: float, label: str) -> str:
+    """Compare tracemalloc snapshots taken `seconds` apart."""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(_TRACE_DEPTH)
+    try:
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    growth = sum(stat.size_diff for stat in stats)
+
+    lines = [
+        f"== {label}: traced {current / 1024:.1f} KiB (peak {peak / 1024:.1f} KiB), "
+        f"growth {growth / 1024:+.1f} KiB over {seconds:g}s"
+    ]
+    lines.extend(str(stat) for stat in stats[:_MEMORY_TOP] if stat.size_diff)
+    return "\n".join(lines)
+
+
+def render_stacks(counts: Dict[str, int]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+def profile_process(mode: str, seconds: float, interval: float, label: str) -> str:
+    """Profile the current process (blocking) and return its report."""
+    if mode == "cpu":
+        return render_stacks(sample_stacks(seconds, interval, label))
+    return allocation_growth(seconds, label) + "\n"
+
+
+def _profile_worker_to_file(mode: str, seconds: float, interval: float, out_dir: str) -> None:
+    try:
+        report = profile_process(mode, seconds, interval, f"worker-{os.getpid()}")
+        path = os.path.join(out_dir, f"{os.getpid()}.txt")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(report)
+        os.replace(path + ".tmp", path)
+    finally:
+        _worker_active.release()
+
+
+def start_in_worker(args: Dict[str, object]) -> Optional[int]:
+    """
+    Pool task: start profiling this worker in a background thread.
+
+    Returns the worker pid, or None if this worker is already profiling
+    (another start task of the same run landed on it). Sleeps briefly so
+    the remaining start tasks are picked up by other idle workers.
+    """
+    if not _worker_active.acquire(blocking=False):
+        return None
+    threading.Thread(
+        target=_profile_worker_to_file,
+        args=(args["mode"], args["seconds"], args["interval"], args["out_dir"]),
+        name="agent-profiler",
+        daemon=True,
+    ).start()
+    time.sleep(0.05)
+    return os.getpid()
@@ -0,0 +1,106 @@
+"""
+Session handles for signing
+
+Instead of sending the full cookie dictionary with every sign call, the
+Rust server registers a cookie set once and signs by handle. The agent
+keeps the cookie-derived part of the signature memoized per handle:
+
+    - a1           (the only cookie x-s depends on)
+    - x-s-common   (cookie fingerprint, ~90% of per-sign CPU in xhshow)
+
+A real browser keeps the same fingerprint for the lifetime of its
+cookies, so reusing x-s-common per cookie set matches browser behaviour.
+
+Handles are derived from the cookie content, so changed cookies always
+get a new handle. Registering a changed cookie set for the same user
+(same web_session / a1) drops the previous handle right away; everything
+else is evicted by LRU (AGENT_SESSION_MAX) or idle TTL (AGENT_SESSION_TTL).
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class SessionState:
+    """Memoized cookie-derived signing state for one cookie set."""
+    a1: str
+    x_s_common: str
+    identity: str
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def session_id_for(cookies: Dict[str, str]) -> str:
+    """Stable handle for a cookie set (content hash, order independent)."""
+    canonical = json.dumps(cookies, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def identity_for(cookies: Dict[str, str]) -> str:
+    """Which user a cookie set belongs to, used to drop stale handles."""
+    return cookies.get("web_session") or cookies.get("a1", "")
+
+
+class SessionStore:
+    """LRU + idle-TTL store of SessionState keyed by handle."""
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_size = max_size if max_size is not None else int(os.environ.get("AGENT_SESSION_MAX", 256))
+        self.ttl = ttl if ttl is not None else float(os.environ.get("AGENT_SESSION_TTL", 1800))
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._by_identity: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        """Store state for a handle, replacing any older handle of the same user."""
+        previous = self._by_identity.get(state.identity)
+        if previous and previous != session_id:
+            self._drop(previous)
+
+        self._sessions[session_id] = state
+        self._sessions.move_to_end(session_id)
+        if state.identity:
+            self._by_identity[state.identity] = session_id
+
+        while len(self._sessions) > self.max_size:
+            oldest = next(iter(self._sessions))
+            self._drop(oldest)
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        """Look up a handle, refreshing its LRU position; None if unknown/expired."""
+        state = self._sessions.get(session_id)
+        now = time.monotonic()
+        if state is None or now - state.last_used > self.ttl:
+            if state is not None:
+                self._drop(session_id)
+            self.misses += 1
+            return None
+        state.last_used = now
+        self._sessions.move_to_end(session_id)
+        self.hits += 1
+        return state
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _drop(self, session_id: str) -> None:
+        state = self._sessions.pop(session_id, None)
+        if state is not None and self._by_identity.get(state.identity) == session_id:
+            del self._by_identity[state.identity]
@@ -0,0 +1,162 @@
+"""
+Signature computation (runs inside signing worker processes)
+
+Everything here works on plain dicts so requests and results can be
+pickled cheaply between the agent process and its workers.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+from xhshow import Xhshow
+
+from .logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Per-process Xhshow instance, created by init_worker()
+_client: Optional[Xhshow] = None
+
+
+def init_worker() -> None:
+    """Process pool initializer: build this worker's Xhshow instance."""
+    global _client
+    setup_logging()
+    _client = Xhshow()
+
+
+def get_client() -> Xhshow:
+    """Return this process's Xhshow instance, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = Xhshow()
+    return _client
+
+
+def ping() -> bool:
+    """No-op task used to spawn and warm up worker processes."""
+    get_client()
+    return True
+
+
+def derive_session(cookies: Dict[str, str]) -> Dict[str, str]:
+    """
+    Compute the cookie-derived part of the signature once per cookie set.
+
+    Returns:
+        {"a1": ..., "x_s_common": ...}
+
+    Raises:
+        ValueError: if the cookies have no a1
+    """
+    a1 = cookies.get("a1")
+    if not a1:
+        raise ValueError("Missing 'a1' in cookies")
+    return {"a1": a1, "x_s_common": get_client().sign_xs_common(cookies)}
+
+
+def _sign_with_session(
+    method: str,
+    uri_path: str,
+    a1: str,
+    x_s_common: str,
+    request_data: Optional[Dict[str, Any]],
+) -> Dict[str, str]:
+    """
+    Same headers as Xhshow.sign_headers, reusing a memoized x-s-common.
+
+    Only x-s (request dependent) and the timestamp/trace ids are computed.
+    """
+    client = get_client()
+    timestamp = time.time()
+    return {
+        "x-s": client.sign_xs(method, uri_path, a1, payload=request_data, timestamp=timestamp),
+        "x-s-common": x_s_common,
+        "x-t": str(client.get_x_t(timestamp)),
+        "x-b3-traceid": client.get_b3_trace_id(),
+        "x-xray-traceid": client.get_xray_trace_id(timestamp=int(timestamp * 1000)),
+    }
+
+
+def sign_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate XHS API signatures for a single request.
+
+    Args:
+        request: SignRequest fields (method, uri, params, payload, return_body)
+            plus either cookies, or a1 + x_s_common memoized for a session handle
+
+    Returns:
+        SignResponse fields. Errors are reported in the result instead of
+        being raised, so one bad entry in a batch does not fail the batch.
+
+    Note: If the URI contains query parameters (e.g., ?num=20&cursor=),
+    they will be automatically extracted and merged with the params field.
+
+    Log lines carry the Rust server's request_id (when sent), so they can be
+    matched to the `request{id=...}` span on the Rust side.
+    """
+    tag = f"[Agent] [{request['request_id']}]" if request.get("request_id") else "[Agent]"
+    try:
+        # Parse URI to extract path and query parameters
+        parsed = urlparse(request["uri"])
+        uri_path = parsed.path  # Pure path without query string
+
+        # Merge query parameters from URI with explicit params
+        params = dict(request.get("params") or {})
+        if parsed.query:
+            query_params = parse_qs(parsed.query)
+            for key, values in query_params.items():
+                # parse_qs returns lists, take first value
+                params[key] = values[0] if values else ""
+
+        method = request["method"].upper()
+        payload = request.get("payload")
+
+        # Canonical POST body: exactly the string xhshow hashes into x-s
+        # (json.dumps with separators=(',', ':'), ensure_ascii=False)
+        body = get_client().build_json_body(payload) if payload is not None else None
+
+        # Hot-path debug log: off by default, sampled when enabled (see logs.py)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f"{tag} URI: {request['uri']} -> path: {uri_path}, params: {params}")
+            if body:
+                logger.debug(f"{tag} Payload for signing: {body}")
+
+        # Generate signatures using xhshow
+        # 注意：xhshow 需要 dict，不是字符串。但如果 xhshow 内部序列化方式不同，签名会不匹配
+        if request.get("x_s_common"):
+            request_data = (params or None) if method == "GET" else payload
+            result = _sign_with_session(method, uri_path, request["a1"], request["x_s_common"], request_data)
+        else:
+            result = get_client().sign_headers(
+                method=method,
+                uri=uri_path,  # Use pure path
+                cookies=request["cookies"],
+                params=params if params else None,
+                payload=payload
+            )
+
+        # DEBUG: 打印 xhshow 返回的所有键
+        if debug:
+            logger.debug(f"{tag} xhshow returned keys: {list(result.keys())}")
+            logger.debug(f"{tag} x-xray-traceid: {result.get('x-xray-traceid', 'MISSING')}")
+
+        response = {
+            "success": True,
+            "x_s": result.get("x-s"),
+            "x_t": str(result.get("x-t", "")),
+            "x_s_common": result.get("x-s-common"),
+            "x_b3_traceid": result.get("x-b3-traceid"),
+            "x_xray_traceid": result.get("x-xray-traceid"),
+        }
+        if request.get("return_body") and body is not None:
+            # 返回被签名的 body，调用方原样发送，保证签名内容与请求体一致
+            response["body"] = body
+        return response
+    except Exception as e:
+        logger.warning(f"{tag} Signing failed for {request.get('uri')}: {e}")
+        return {"success": False, "error": str(e)}
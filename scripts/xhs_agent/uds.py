@@ -0,0 +1,114 @@
+"""
+Unix domain socket listener for the signing hop
+
+A lean alternative to HTTP+JSON for the Rust server: no HTTP parsing and
+no pydantic validation, just length-prefixed msgpack frames.
+
+Framing:
+    [u32 big-endian length][msgpack body]
+
+Request body:
+    {"op": "sign_batch", "requests": [SignRequest, ...]}
+    {"op": "register_session", "cookies": {...}}
+    {"op": "ping"}
+
+Response body:
+    {"results": [SignResponse, ...]}   (sign_batch, same order)
+    {"session_id": "..."}              (register_session)
+    {"ok": true}                       (ping)
+    {"error": "..."}                   (malformed frame / unknown op)
+
+Each connection handles one frame at a time; the Rust side keeps a small
+pool of connections for concurrency.
+
+Configuration (environment variables):
+    XHS_AGENT_TRANSPORT - "uds" enables the listener (shared with the Rust side)
+    XHS_AGENT_SOCKET    - socket path (default: /tmp/xhs-agent.sock)
+"""
+
+import asyncio
+import logging
+import os
+import struct
+from typing import Any, Dict, Optional
+
+import msgpack
+
+from .executor import SignExecutor
+
+DEFAULT_SOCKET_PATH = "/tmp/xhs-agent.sock"
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+_HEADER = struct.Struct(">I")
+
+
+def uds_enabled() -> bool:
+    """UDS is enabled when the shared transport config asks for it."""
+    return os.environ.get("XHS_AGENT_TRANSPORT", "http").lower() == "uds"
+
+
+def socket_path() -> str:
+    return os.environ.get("XHS_AGENT_SOCKET", DEFAULT_SOCKET_PATH)
+
+
+class UdsSignServer:
+    """Serve sign requests from the executor over a Unix domain socket."""
+
+    def __init__(self, executor: SignExecutor, path: Optional[str] = None):
+        self.executor = executor
+        self.path = path or socket_path()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        # Remove a stale socket left by a previous (crashed) agent
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        logging.info(f"[UDS] Listening on {self.path}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break  # client closed the connection
+                (length,) = _HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    logging.warning(f"[UDS] Frame too large ({length} bytes), closing connection")
+                    break
+                body = await reader.readexactly(length)
+                response = await self._dispatch(body)
+                data = msgpack.packb(response, use_bin_type=True)
+                writer.write(_HEADER.pack(len(data)) + data)
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, body: bytes) -> Dict[str, Any]:
+        try:
+            frame = msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            return {"error": f"Malformed frame: {e}"}
+
+        op = frame.get("op") if isinstance(frame, dict) else None
+        if op == "sign_batch":
+            results = await self.executor.sign_many(frame.get("requests") or [])
+            return {"results": results}
+        if op == "register_session":
+            try:
+                return {"session_id": await self.executor.register_session(frame.get("cookies") or {})}
+            except Exception as e:
+                return {"error": str(e)}
+        if op == "ping":
+            return {"ok": True}
+        return {"error": f"Unknown op: {op}"}
@@ -8,6 +8,9 @@ Credentials 存储于本地 cookie.json 文件。
 from .config import COOKIE_FILE, XHS_EXPLORE_URL
 from .storage import save_credentials
 from .qr_code import base64_to_ascii, extract_from_page
+from .pool import BrowserPool, BrowserLease
+from .readiness import PhaseTimer, wait_for_cookies, wait_for_cookies_settled
+from .routing import ResourceBlocker, RouteStats
 from .browser import (
     create_browser_context,
     setup_anti_detection,
@@ -26,6 +29,13 @@ __all__ = [
     "base64_to_ascii",
     "extract_from_page",
     # Browser
+    "BrowserPool",
+    "BrowserLease",
+    "PhaseTimer",
+    "wait_for_cookies",
+    "wait_for_cookies_settled",
+    "ResourceBlocker",
+    "RouteStats",
     "create_browser_context",
     "setup_anti_detection",
     "navigate_to_login",
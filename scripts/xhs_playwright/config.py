@@ -25,6 +25,44 @@ BROWSER_ARGS = [
     '--disable-features=IsolateOrigins,site-per-process',
 ]
 
+# Cookie readiness (agent cookie endpoints): finish as soon as these exist
+GUEST_REQUIRED_COOKIES = ['a1', 'webId', 'gid', 'web_session']
+SYNC_REQUIRED_COOKIES = ['a1', 'webId', 'gid', 'web_session', 'acw_tc']
+COOKIE_WAIT_TIMEOUT_SECONDS = 15
+COOKIE_POLL_INTERVAL_MS = 250
+# After an interaction whose cookies are not known by name (cookie-sync search
+# click): done once the jar has not changed for this long, bounded by the timeout
+COOKIE_SETTLE_QUIET_MS = 1000
+COOKIE_SETTLE_TIMEOUT_SECONDS = 5
+
+# Resource blocking for headless cookie flows (page.route), overridable via
+#   AGENT_BLOCK_PROFILE - off | light | strict
+#   AGENT_BLOCK_URLS    - comma-separated URL substrings to abort as well
+#   AGENT_BLOCK_BASELINE_EVERY - run every Nth flow unblocked to measure savings (0 = never)
+# Documents, scripts and XHR/fetch are never blocked: they set the cookies.
+BLOCK_PROFILES = {
+    'off': frozenset(),
+    'light': frozenset({'image', 'media', 'font', 'texttrack', 'manifest'}),
+    'strict': frozenset({'image', 'media', 'font', 'texttrack', 'manifest',
+                         'stylesheet', 'websocket', 'eventsource'}),
+}
+DEFAULT_BLOCK_PROFILE = 'light'
+BLOCK_BASELINE_EVERY = 20
+
+# Headless browser arguments (agent cookie endpoints / warm browser pool)
+HEADLESS_BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-infobars',
+]
+
+# Warm browser pool (agent_server.py), overridable via environment:
+#   AGENT_BROWSER_POOL      - number of long-lived browsers (0 = launch per call)
+#   AGENT_BROWSER_MAX_USES  - recycle a browser after this many contexts
+BROWSER_POOL_SIZE = 2
+BROWSER_MAX_USES = 50
+BROWSER_LAUNCH_TIMEOUT_MS = 60000
+
 # Extra HTTP Headers
 EXTRA_HEADERS = {
     'Accept-Language': 'zh-CN,zh;q=0.9',
@@ -0,0 +1,248 @@
+"""
+Warm Chromium pool for the agent's cookie endpoints
+
+Launching Chromium takes seconds, and used to happen on every
+/guest-cookies and /sync-login-cookies call. BrowserPool keeps a small
+number of long-lived browsers and hands out a fresh, isolated
+BrowserContext per call, so cookie acquisition is dominated by navigation
+instead of browser startup.
+
+- Each browser serves one context at a time; callers wait for a free slot
+- Launches are serialized per slot, so a caller that gets a slot while
+  prewarm is still launching its browser waits for that launch instead
+  of starting a second Chromium
+- A browser is relaunched after AGENT_BROWSER_MAX_USES contexts, or as
+  soon as it is found disconnected (crash)
+- AGENT_BROWSER_POOL=0 keeps the old behaviour: launch a browser per call
+
+Usage:
+    pool = BrowserPool()
+    await pool.start()
+    async with pool.context(viewport={...}) as context:
+        page = await context.new_page()
+        ...
+    await pool.stop()
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+from .config import (
+    HEADLESS_BROWSER_ARGS,
+    BROWSER_POOL_SIZE,
+    BROWSER_MAX_USES,
+    BROWSER_LAUNCH_TIMEOUT_MS,
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class _Slot:
+    """One pooled browser and its usage count."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser: Optional[Browser] = None
+        self.uses = 0
+        # Held while (re)launching, so prewarm and an early acquire() share one launch
+        self.lock = asyncio.Lock()
+
+
+class BrowserLease:
+    """
+    A context borrowed from the pool.
+
+    `close()` closes the context and returns the browser to the pool, so a
+    lease can stand in for a Browser in `browser, context = ...` call sites.
+    """
+
+    def __init__(self, pool: "BrowserPool", slot: _Slot, context: BrowserContext):
+        self._pool = pool
+        self._slot = slot
+        self.context = context
+        self._closed = False
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        await self._pool._release(self._slot, self.context)
+
+
+class BrowserPool:
+    """Bounded pool of long-lived Chromium browsers."""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        headless: bool = True,
+        args: Optional[List[str]] = None,
+        on_launch: Optional[Callable[[float], None]] = None,
+    ):
+        self.size = size if size is not None else _env_int("AGENT_BROWSER_POOL", BROWSER_POOL_SIZE)
+        self.max_uses = max_uses if max_uses is not None else _env_int("AGENT_BROWSER_MAX_USES", BROWSER_MAX_USES)
+        self.headless = headless
+        self.args = args if args is not None else HEADLESS_BROWSER_ARGS
+        # Called with the launch duration in seconds (agent metrics)
+        self.on_launch = on_launch
+        self._playwright: Optional[Playwright] = None
+        self._owns_playwright = False
+        self._slots: List[_Slot] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+        self._leases = 0
+        self._launches = 0
+        self._recycled = 0
+        self._crashed = 0
+
+    async def start(self, playwright: Optional[Playwright] = None, prewarm: bool = True) -> None:
+        """
+        Start Playwright and (optionally) launch every browser up front.
+
+        A failed prewarm is logged, not raised: the slot is launched again
+        on first use.
+        """
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            if playwright is None:
+                playwright = await async_playwright().start()
+                self._owns_playwright = True
+            self._playwright = playwright
+
+            self._idle = asyncio.Queue()
+            self._slots = [_Slot(i) for i in range(max(self.size, 0))]
+            for slot in self._slots:
+                self._idle.put_nowait(slot)
+
+        if prewarm and self.size > 0:
+            results = await asyncio.gather(
+                *(self._ensure_browser(slot) for slot in self._slots),
+                return_exceptions=True,
+            )
+            failed = [r for r in results if isinstance(r, Exception)]
+            if failed:
+                logging.warning(f"[BrowserPool] {len(failed)}/{len(results)} browsers failed to prewarm: {failed[0]}")
+            else:
+                logging.info(f"[BrowserPool] {len(results)} browsers ready")
+
+    async def stop(self) -> None:
+        for slot in self._slots:
+            await self._close_browser(slot)
+        self._slots = []
+        self._idle = None
+        if self._owns_playwright and self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = None
+        self._owns_playwright = False
+
+    async def acquire(self, **context_options: Any) -> BrowserLease:
+        """
+        Wait for a free browser and open a fresh context on it.
+
+        Args:
+            **context_options: passed to Browser.new_context
+        """
+        if self._idle is None:
+            await self.start(prewarm=False)
+
+        # Pool disabled: a throwaway slot per call, no concurrency limit
+        slot = _Slot(-1) if self.size <= 0 else await self._idle.get()
+        try:
+            browser = await self._ensure_browser(slot)
+            context = await browser.new_context(**context_options)
+        except Exception:
+            await self._release(slot, None)
+            raise
+        slot.uses += 1
+        self._leases += 1
+        return BrowserLease(self, slot, context)
+
+    @asynccontextmanager
+    async def context(self, **context_options: Any) -> AsyncIterator[BrowserContext]:
+        """`async with pool.context(...) as context:` - closed and released on exit."""
+        lease = await self.acquire(**context_options)
+        try:
+            yield lease.context
+        finally:
+            await lease.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "max_uses": self.max_uses,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "browsers": [
+                {
+                    "connected": slot.browser is not None and slot.browser.is_connected(),
+                    "uses": slot.uses,
+                }
+                for slot in self._slots
+            ],
+            "leases": self._leases,
+            "launches": self._launches,
+            "recycled": self._recycled,
+            "crashed": self._crashed,
+        }
+
+    async def _ensure_browser(self, slot: _Slot) -> Browser:
+        """Return a healthy browser for the slot, relaunching if needed."""
+        async with slot.lock:
+            return await self._ensure_browser_locked(slot)
+
+    async def _ensure_browser_locked(self, slot: _Slot) -> Browser:
+        if slot.browser is not None:
+            if not slot.browser.is_connected():
+                logging.warning(f"[BrowserPool] Browser #{slot.index} disconnected, relaunching")
+                self._crashed += 1
+                await self._close_browser(slot)
+            elif slot.uses >= self.max_uses:
+                logging.info(f"[BrowserPool] Recycling browser #{slot.index} after {slot.uses} uses")
+                self._recycled += 1
+                await self._close_browser(slot)
+
+        if slot.browser is None:
+            started = time.perf_counter()
+            slot.browser = await self._playwright.chromium.launch(
+                headless=self.headless,
+                args=self.args,
+                timeout=BROWSER_LAUNCH_TIMEOUT_MS,
+            )
+            slot.uses = 0
+            self._launches += 1
+            if self.on_launch is not None:
+                self.on_launch(time.perf_counter() - started)
+        return slot.browser
+
+    async def _release(self, slot: _Slot, context: Optional[BrowserContext]) -> None:
+        if context is not None:
+            try:
+                await context.close()
+            except Exception as e:
+                logging.warning(f"[BrowserPool] Failed to close context on browser #{slot.index}: {e}")
+        # Pool disabled: one browser per call, as before
+        if self.size <= 0:
+            await self._close_browser(slot)
+        elif self._idle is not None:
+            self._idle.put_nowait(slot)
+
+    async def _close_browser(self, slot: _Slot) -> None:
+        browser, slot.browser = slot.browser, None
+        slot.uses = 0
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass  # already gone (crashed / disconnected)
@@ -0,0 +1,146 @@
+"""
+Event-driven cookie readiness for headless cookie flows
+
+Instead of fixed sleeps plus `networkidle`, wait until the required
+cookies are present. The cookie jar is re-checked on every response (the
+usual source of Set-Cookie) and on a short poll interval (cookies written
+by page JavaScript), bounded by a deadline.
+
+When the cookies an interaction produces are not known by name,
+`wait_for_cookies_settled` waits until the jar stops changing instead.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from playwright.async_api import BrowserContext, Page
+
+from .config import (
+    COOKIE_WAIT_TIMEOUT_SECONDS,
+    COOKIE_POLL_INTERVAL_MS,
+    COOKIE_SETTLE_QUIET_MS,
+    COOKIE_SETTLE_TIMEOUT_SECONDS,
+)
+
+
+class PhaseTimer:
+    """
+    Record how long each phase of a flow takes (milliseconds).
+
+    Usage:
+        timer = PhaseTimer()
+        with timer.phase("navigate"):
+            await page.goto(...)
+        timer.as_dict()  # {"navigate": 812.4, "total": 812.6}
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self._phases[name] = round(self._phases.get(name, 0.0) + elapsed, 1)
+
+    def as_dict(self) -> Dict[str, float]:
+        result = dict(self._phases)
+        result["total"] = round((time.perf_counter() - self._started) * 1000, 1)
+        return result
+
+
+async def wait_for_cookies(
+    context: BrowserContext,
+    page: Page,
+    required: List[str],
+    timeout: float = COOKIE_WAIT_TIMEOUT_SECONDS,
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Wait until every cookie in `required` is set, or the deadline passes.
+
+    Args:
+        context: Browser context whose cookie jar is checked
+        page: Page whose responses trigger a re-check
+        required: Cookie names that must be present
+        timeout: Deadline in seconds
+
+    Returns:
+        (cookies, missing) - missing is empty when all required cookies appeared
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    changed = asyncio.Event()
+
+    def on_response(_response) -> None:
+        changed.set()
+
+    page.on("response", on_response)
+    try:
+        while True:
+            cookies = {c['name']: c['value'] for c in await context.cookies()}
+            missing = [name for name in required if name not in cookies]
+            remaining = deadline - loop.time()
+            if not missing or remaining <= 0:
+                return cookies, missing
+
+            changed.clear()
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(COOKIE_POLL_INTERVAL_MS / 1000, remaining))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        page.remove_listener("response", on_response)
+
+
+async def wait_for_cookies_settled(
+    context: BrowserContext,
+    page: Page,
+    quiet: float = COOKIE_SETTLE_QUIET_MS / 1000,
+    timeout: float = COOKIE_SETTLE_TIMEOUT_SECONDS,
+) -> Dict[str, str]:
+    """
+    Wait until the cookie jar has not changed for `quiet` seconds.
+
+    Args:
+        context: Browser context whose cookie jar is checked
+        page: Page whose responses trigger a re-check
+        quiet: How long the jar must stay unchanged
+        timeout: Deadline in seconds
+
+    Returns:
+        The cookies at the time the jar settled (or at the deadline)
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    changed = asyncio.Event()
+
+    def on_response(_response) -> None:
+        changed.set()
+
+    page.on("response", on_response)
+    try:
+        cookies = {c['name']: c['value'] for c in await context.cookies()}
+        last_change = loop.time()
+        while True:
+            now = loop.time()
+            if now - last_change >= quiet or now >= deadline:
+                return cookies
+
+            changed.clear()
+            wait = min(COOKIE_POLL_INTERVAL_MS / 1000, quiet - (now - last_change), deadline - now)
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            current = {c['name']: c['value'] for c in await context.cookies()}
+            if current != cookies:
+                cookies = current
+                last_change = loop.time()
+    finally:
+        page.remove_listener("response", on_response)
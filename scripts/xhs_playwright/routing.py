@@ -0,0 +1,201 @@
+"""
+Resource blocking for headless cookie-acquisition pages
+
+The guest-cookie and cookie-sync flows only need the documents, scripts
+and API calls that set cookies. ResourceBlocker installs a `context.route`
+handler that aborts images, media, fonts and other unneeded resource
+types, and counts what was blocked, by type.
+
+Savings are measured, not estimated:
+- Loaded bytes come from `Request.sizes()` (bytes actually transferred,
+  headers + body), so chunked and compressed responses without a
+  Content-Length are counted too
+- Every AGENT_BLOCK_BASELINE_EVERY-th flow (default 20, 0 disables) runs
+  unblocked as a baseline; `saved` in stats() is the baseline average
+  minus the blocked average, in bytes and milliseconds per flow
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from playwright.async_api import BrowserContext, Request, Route
+
+from .config import BLOCK_PROFILES, DEFAULT_BLOCK_PROFILE, BLOCK_BASELINE_EVERY
+
+# How long finish() waits for outstanding size lookups
+_SIZES_TIMEOUT_SECONDS = 1.0
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class RouteStats:
+    """Per-context counters for one flow."""
+
+    def __init__(self, profile: str, baseline: bool = False):
+        self.profile = profile
+        # Unblocked flow used to measure what the profile saves
+        self.baseline = baseline
+        self.allowed = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.bytes_loaded = 0
+        self.duration_ms = 0.0
+        self._started = time.perf_counter()
+        self._pending: Set[asyncio.Task] = set()
+
+    @property
+    def blocked(self) -> int:
+        return sum(self.blocked_by_type.values())
+
+    def on_request_finished(self, request: Request) -> None:
+        task = asyncio.ensure_future(self._measure(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _measure(self, request: Request) -> None:
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return  # page or context already gone
+        self.bytes_loaded += sizes.get("responseHeadersSize", 0) + sizes.get("responseBodySize", 0)
+
+    async def finish(self) -> None:
+        """Stop the flow clock and collect outstanding sizes (call before closing the context)."""
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if self._pending:
+            await asyncio.wait(set(self._pending), timeout=_SIZES_TIMEOUT_SECONDS)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile,
+            "baseline": self.baseline,
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "bytes_loaded": self.bytes_loaded,
+            "duration_ms": round(self.duration_ms, 1),
+        }
+
+
+class _Totals:
+    """Accumulated flows of one kind (blocked or baseline)."""
+
+    def __init__(self):
+        self.flows = 0
+        self.allowed = 0
+        self.bytes_loaded = 0
+        self.duration_ms = 0.0
+
+    def add(self, stats: RouteStats) -> None:
+        self.flows += 1
+        self.allowed += stats.allowed
+        self.bytes_loaded += stats.bytes_loaded
+        self.duration_ms += stats.duration_ms
+
+    def averages(self) -> Dict[str, float]:
+        flows = max(self.flows, 1)
+        return {
+            "bytes_per_flow": round(self.bytes_loaded / flows),
+            "ms_per_flow": round(self.duration_ms / flows, 1),
+        }
+
+
+class ResourceBlocker:
+    """Abort unneeded requests in a context according to a named profile."""
+
+    def __init__(
+        self,
+        profile: Optional[str] = None,
+        url_keywords: Optional[List[str]] = None,
+        baseline_every: Optional[int] = None,
+    ):
+        profile = (profile or os.environ.get("AGENT_BLOCK_PROFILE", DEFAULT_BLOCK_PROFILE)).lower()
+        if profile not in BLOCK_PROFILES:
+            logging.warning(f"[ResourceBlocker] Unknown profile '{profile}', using '{DEFAULT_BLOCK_PROFILE}'")
+            profile = DEFAULT_BLOCK_PROFILE
+        self.profile = profile
+        self.blocked_types = BLOCK_PROFILES[profile]
+        if url_keywords is None:
+            url_keywords = [k.strip() for k in os.environ.get("AGENT_BLOCK_URLS", "").split(",") if k.strip()]
+        self.url_keywords = url_keywords
+        if baseline_every is None:
+            baseline_every = _env_int("AGENT_BLOCK_BASELINE_EVERY", BLOCK_BASELINE_EVERY)
+        self.baseline_every = max(baseline_every, 0)
+        self._installs = 0
+        self._blocked_flows = _Totals()
+        self._baseline_flows = _Totals()
+        self._blocked_by_type: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.blocked_types or self.url_keywords)
+
+    def should_block(self, request: Request) -> bool:
+        if request.resource_type in self.blocked_types:
+            return True
+        return any(keyword in request.url for keyword in self.url_keywords)
+
+    async def install(self, context: BrowserContext) -> RouteStats:
+        """Route every request of the context through the profile; returns its counters."""
+        self._installs += 1
+        baseline = self.enabled and self.baseline_every > 0 and self._installs % self.baseline_every == 0
+        stats = RouteStats("off" if baseline else self.profile, baseline=baseline)
+
+        async def handle(route: Route) -> None:
+            request = route.request
+            if self.should_block(request):
+                kind = request.resource_type
+                stats.blocked_by_type[kind] = stats.blocked_by_type.get(kind, 0) + 1
+                await route.abort()
+            else:
+                stats.allowed += 1
+                await route.continue_()
+
+        if self.enabled and not baseline:
+            await context.route("**/*", handle)
+        context.on("requestfinished", stats.on_request_finished)
+        return stats
+
+    def record(self, stats: RouteStats) -> None:
+        """Add one finished flow to the totals reported by /health."""
+        if stats.baseline:
+            self._baseline_flows.add(stats)
+            return
+        self._blocked_flows.add(stats)
+        for kind, count in stats.blocked_by_type.items():
+            self._blocked_by_type[kind] = self._blocked_by_type.get(kind, 0) + count
+
+    def saved(self) -> Optional[Dict[str, float]]:
+        """Baseline average minus blocked average, once both kinds of flow have run."""
+        if not self._blocked_flows.flows or not self._baseline_flows.flows:
+            return None
+        blocked = self._blocked_flows.averages()
+        baseline = self._baseline_flows.averages()
+        return {key: round(baseline[key] - blocked[key], 1) for key in blocked}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile,
+            "blocked_types": sorted(self.blocked_types),
+            "url_keywords": self.url_keywords,
+            "baseline_every": self.baseline_every,
+            "flows": self._blocked_flows.flows,
+            "allowed": self._blocked_flows.allowed,
+            "blocked": sum(self._blocked_by_type.values()),
+            "blocked_by_type": dict(self._blocked_by_type),
+            "bytes_loaded": self._blocked_flows.bytes_loaded,
+            **self._blocked_flows.averages(),
+            "baseline": {
+                "flows": self._baseline_flows.flows,
+                "bytes_loaded": self._baseline_flows.bytes_loaded,
+                **self._baseline_flows.averages(),
+            },
+            "saved": self.saved(),
+        }
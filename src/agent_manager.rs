@@ -2,80 +2,436 @@
 //!
 //! 自动管理 Python Signature Agent 的生命周期：
 //! - Rust 服务启动时启动 Agent
+//! - 后台线程持续读取 Agent 的 stdout/stderr 并转发到 tracing（带 PID），
+//!   避免管道写满后 Agent 阻塞在 write 上导致签名停顿
+//! - 就绪握手：不阻塞启动，Agent 输出 `AGENT_READY` 行后立即以 `/health`
+//!   确认（另有退避轮询兜底）；启动中的签名请求在 [`wait_until_ready`] 上短暂排队
+//!   （默认 1.5 s），重启退避期间（`Down`）不排队
+//! - 监督任务：进程退出或 `/health` 连续失败时按退避重启 Agent
+//! - 熔断器：签名池中没有任何可用端点（本地 Agent 均未就绪，且远程 Agent 均被摘除）
+//!   时签名请求快速失败（见 [`ensure_agent_available`]），不再每个请求都等满 5 s 超时；
+//!   还有可用的远程 Agent 时，本地 Agent 宕机不影响签名
+//! - 状态变化以 [`AgentEvent`] 广播，并计入 [`supervisor_stats`]
+//! - 可同时托管多个本地 Agent（`XHS_LOCAL_AGENTS`，端口自 `XHS_AGENT_BASE_PORT`
+//!   起递增，UDS 模式下各用独立 socket），由签名池（[`crate::signature::pool`]）
+//!   在它们之间做负载均衡；任一 Agent 就绪即视为整体就绪
 //! - Rust 服务退出时清理 Agent
 
+use once_cell::sync::Lazy;
+use serde::Serialize;
+use std::io::{BufRead, BufReader, Read};
 use std::process::{Child, Command, Stdio};
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
 use std::sync::Mutex;
 use std::path::PathBuf;
-use tracing::{info, warn};
+use std::time::{Duration, Instant};
+use tokio::sync::{broadcast, watch, Notify};
+use tracing::{debug, error, info, warn, Level};
+
+/// 第一个本地 Agent 的默认端口（`XHS_AGENT_BASE_PORT`）
+const DEFAULT_BASE_PORT: u16 = 8765;
+
+/// Agent 就绪后输出到 stdout 的标记行前缀
+const READY_MARKER: &str = "AGENT_READY";
+
+/// 默认就绪期限（`XHS_AGENT_READY_TIMEOUT`，秒）
+const READY_TIMEOUT_SECS: u64 = 60;
+
+/// 健康检查退避上限
+const MAX_PROBE_BACKOFF: Duration = Duration::from_secs(1);
+
+/// 默认排队等待上限（`XHS_AGENT_QUEUE_WAIT_MS`），只在启动中时等待
+const QUEUE_WAIT_MS: u64 = 1_500;
+
+/// 监督任务检查进程状态的间隔
+const SUPERVISE_INTERVAL: Duration = Duration::from_secs(1);
+/// 就绪后 `/health` 探测间隔
+const HEALTH_INTERVAL: Duration = Duration::from_secs(5);
+/// `/health` 连续失败多少次视为失去响应
+const UNHEALTHY_THRESHOLD: u32 = 3;
+/// 重启退避上限
+const MAX_RESTART_BACKOFF: Duration = Duration::from_secs(30);
+
+/// 连续多少次调用失败后熔断
+const BREAKER_THRESHOLD: u32 = 3;
+/// 熔断打开后多久放行试探请求
+const BREAKER_COOLDOWN: Duration = Duration::from_secs(5);
+
+/// Agent 就绪状态
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize)]
+#[serde(rename_all = "snake_case")]
+pub enum AgentReadiness {
+    /// 未由本进程启动（外部运行的 Agent），签名请求不等待
+    Unmanaged,
+    /// 已启动，等待就绪
+    Starting,
+    /// `/health` 已确认可用
+    Ready,
+    /// 超过就绪期限仍不可用
+    Failed,
+    /// 进程已退出或失去响应，等待重启
+    Down,
+}
+
+impl AgentReadiness {
+    /// 启动中：请求短暂排队（`Down` 时重启退避可达 30 秒，不排队）
+    fn is_pending(self) -> bool {
+        matches!(self, AgentReadiness::Starting)
+    }
+}
+
+/// Agent 生命周期事件
+#[derive(Debug, Clone, Serialize)]
+#[serde(tag = "event", rename_all = "snake_case")]
+pub enum AgentEvent {
+    Started { agent: usize, pid: u32 },
+    Ready { agent: usize, pid: u32, startup_ms: u64 },
+    Exited { agent: usize, pid: u32, code: Option<i32> },
+    Unhealthy { agent: usize, pid: u32, failures: u32 },
+    Restarting { agent: usize, attempt: u32, backoff_ms: u64 },
+    BreakerOpened,
+    BreakerClosed,
+}
+
+static EVENTS: Lazy<broadcast::Sender<AgentEvent>> = Lazy::new(|| broadcast::channel(64).0);
+
+/// 监督与熔断计数器
+#[derive(Default)]
+struct SupervisorCounters {
+    restarts: AtomicU64,
+    exits: AtomicU64,
+    health_failures: AtomicU64,
+    breaker_opens: AtomicU64,
+    fast_failures: AtomicU64,
+}
+
+static COUNTERS: Lazy<SupervisorCounters> = Lazy::new(SupervisorCounters::default);
+
+/// 单个本地 Agent 的状态
+#[derive(Debug, Clone, Serialize)]
+pub struct LocalAgentStats {
+    pub index: usize,
+    pub endpoint: String,
+    pub pid: Option<u32>,
+    pub readiness: AgentReadiness,
+}
+
+/// 监督状态快照（供日志与指标导出）
+#[derive(Debug, Clone, Serialize)]
+pub struct SupervisorStats {
+    pub readiness: AgentReadiness,
+    pub agents: Vec<LocalAgentStats>,
+    pub breaker_open: bool,
+    pub restarts: u64,
+    pub exits: u64,
+    pub health_failures: u64,
+    pub breaker_opens: u64,
+    pub fast_failures: u64,
+}
+
+fn emit(event: AgentEvent) {
+    match &event {
+        AgentEvent::Exited { .. } | AgentEvent::Unhealthy { .. } | AgentEvent::BreakerOpened => {
+            warn!(target: "agent_supervisor", "[AgentSupervisor] {:?}", event)
+        }
+        _ => info!(target: "agent_supervisor", "[AgentSupervisor] {:?}", event),
+    }
+    // 没有订阅者时发送失败，忽略即可
+    let _ = EVENTS.send(event);
+}
+
+/// 熔断器：连续失败达到阈值后打开，冷却期内调用直接失败；
+/// 冷却结束后放行请求，成功即关闭，再失败则重新打开
+struct CircuitBreaker {
+    state: Mutex<BreakerState>,
+}
+
+#[derive(Default)]
+struct BreakerState {
+    consecutive_failures: u32,
+    open_until: Option<Instant>,
+}
+
+static BREAKER: Lazy<CircuitBreaker> = Lazy::new(|| CircuitBreaker {
+    state: Mutex::new(BreakerState::default()),
+});
+
+impl CircuitBreaker {
+    fn allow(&self) -> bool {
+        match self.state.lock().unwrap().open_until {
+            Some(until) => Instant::now() >= until,
+            None => true,
+        }
+    }
+
+    fn is_open(&self) -> bool {
+        !self.allow()
+    }
+
+    fn record_success(&self) {
+        let mut state = self.state.lock().unwrap();
+        state.consecutive_failures = 0;
+        if state.open_until.take().is_some() {
+            drop(state);
+            emit(AgentEvent::BreakerClosed);
+        }
+    }
+
+    fn record_failure(&self) {
+        let mut state = self.state.lock().unwrap();
+        state.consecutive_failures += 1;
+        if state.consecutive_failures >= BREAKER_THRESHOLD {
+            self.open(state);
+        }
+    }
+
+    /// 进程已确认不可用：立即打开
+    fn trip(&self) {
+        let mut state = self.state.lock().unwrap();
+        state.consecutive_failures = BREAKER_THRESHOLD;
+        self.open(state);
+    }
+
+    fn open(&self, mut state: std::sync::MutexGuard<'_, BreakerState>) {
+        let was_open = state.open_until.is_some();
+        state.open_until = Some(Instant::now() + BREAKER_COOLDOWN);
+        drop(state);
+        if !was_open {
+            COUNTERS.breaker_opens.fetch_add(1, Ordering::Relaxed);
+            emit(AgentEvent::BreakerOpened);
+        }
+    }
+}
+
+/// 整体就绪状态（各本地 Agent 状态的汇总）
+static READINESS: Lazy<watch::Sender<AgentReadiness>> =
+    Lazy::new(|| watch::channel(AgentReadiness::Unmanaged).0);
+
+/// 一个本地 Agent 槽位：端口与 socket 固定，重启后不变
+struct AgentSlot {
+    index: usize,
+    port: u16,
+    /// UDS 模式下该 Agent 监听的 socket
+    socket: Option<String>,
+    process: Mutex<Option<Child>>,
+    readiness: Mutex<AgentReadiness>,
+    /// 收到 `AGENT_READY` 行时唤醒健康检查，立即确认
+    ready_line: Notify,
+}
+
+impl AgentSlot {
+    fn new(index: usize, port: u16, socket: Option<String>) -> Self {
+        Self {
+            index,
+            port,
+            socket,
+            process: Mutex::new(None),
+            readiness: Mutex::new(AgentReadiness::Unmanaged),
+            ready_line: Notify::new(),
+        }
+    }
+
+    fn base_url(&self) -> String {
+        format!("http://127.0.0.1:{}", self.port)
+    }
+
+    fn health_url(&self) -> String {
+        format!("{}/health", self.base_url())
+    }
+
+    /// 签名请求使用的端点（`http://...` 或 `unix:/path`）
+    fn endpoint(&self) -> String {
+        match &self.socket {
+            Some(path) => format!("unix:{}", path),
+            None => self.base_url(),
+        }
+    }
+
+    fn pid(&self) -> Option<u32> {
+        self.process.lock().unwrap().as_ref().map(|child| child.id())
+    }
+
+    fn readiness(&self) -> AgentReadiness {
+        *self.readiness.lock().unwrap()
+    }
+
+    /// 结束当前 Agent 进程
+    fn kill(&self) {
+        let mut guard = self.process.lock().unwrap();
+        if let Some(mut child) = guard.take() {
+            info!("[AgentManager] Stopping Agent #{} (PID: {})...", self.index, child.id());
+            match child.kill() {
+                Ok(_) => {
+                    // 回收子进程，输出线程随管道关闭自然退出
+                    let _ = child.wait();
+                    info!("[AgentManager] Agent #{} stopped", self.index)
+                }
+                Err(e) => warn!("[AgentManager] Failed to kill Agent #{}: {}", self.index, e),
+            }
+        }
+    }
+
+    /// 若 Agent 已退出，取出并返回 (PID, 退出码)
+    fn take_exited(&self) -> Option<(u32, Option<i32>)> {
+        let mut guard = self.process.lock().unwrap();
+        let exited = match guard.as_mut() {
+            Some(child) => match child.try_wait() {
+                Ok(Some(status)) => Some((child.id(), status.code())),
+                Ok(None) => None,
+                Err(_) => Some((child.id(), None)),
+            },
+            None => None,
+        };
+        if exited.is_some() {
+            *guard = None;
+        }
+        exited
+    }
+
+    fn is_running(&self) -> bool {
+        let mut guard = self.process.lock().unwrap();
+        if let Some(ref mut child) = *guard {
+            match child.try_wait() {
+                Ok(None) => true,  // 仍在运行
+                Ok(Some(_)) => false,  // 已退出
+                Err(_) => false,
+            }
+        } else {
+            false
+        }
+    }
+}
 
 /// Agent 进程管理器
 pub struct AgentManager {
-    process: Mutex<Option<Child>>,
+    slots: Vec<AgentSlot>,
+    /// 主动停止后监督任务不再重启
+    stopping: AtomicBool,
 }
 
 impl AgentManager {
     /// 创建新的 Agent 管理器
+    ///
+    /// - `XHS_LOCAL_AGENTS`: 本地 Agent 数量（默认 1）
+    /// - `XHS_AGENT_BASE_PORT`: 第一个 Agent 的端口（默认 8765），其余依次递增
     pub fn new() -> Self {
+        let count = std::env::var("XHS_LOCAL_AGENTS")
+            .ok()
+            .and_then(|v| v.parse::<usize>().ok())
+            .unwrap_or(1)
+            .max(1);
+        let base_port = std::env::var("XHS_AGENT_BASE_PORT")
+            .ok()
+            .and_then(|v| v.parse::<u16>().ok())
+            .unwrap_or(DEFAULT_BASE_PORT);
+        let uds = std::env::var("XHS_AGENT_TRANSPORT")
+            .map(|v| v.eq_ignore_ascii_case("uds"))
+            .unwrap_or(false);
+        let base_socket = std::env::var("XHS_AGENT_SOCKET")
+            .unwrap_or_else(|_| crate::signature::transport::DEFAULT_SOCKET_PATH.to_string());
+
+        let slots = (0..count)
+            .map(|index| {
+                let socket = uds.then(|| slot_socket_path(&base_socket, index));
+                AgentSlot::new(index, base_port + index as u16, socket)
+            })
+            .collect();
         Self {
-            process: Mutex::new(None),
+            slots,
+            stopping: AtomicBool::new(false),
         }
     }
 
-    /// 启动 Python Agent Server
+    /// 启动全部本地 Agent
     pub fn start(&self) -> anyhow::Result<()> {
+        for slot in &self.slots {
+            self.start_slot(slot)?;
+        }
+        Ok(())
+    }
+
+    /// 启动一个 Python Agent Server
+    fn start_slot(&self, slot: &AgentSlot) -> anyhow::Result<()> {
         let script_path = self.get_agent_script_path()?;
         
-        info!("[AgentManager] Starting Python Agent: {:?}", script_path);
+        info!("[AgentManager] Starting Python Agent #{} on port {}: {:?}", slot.index, slot.port, script_path);
         
-        let child = Command::new("python")
+        let spawn_started = Instant::now();
+        let mut command = Command::new("python");
+        command
             .arg("-m")
             .arg("uvicorn")
             .arg("scripts.agent_server:app")
             .arg("--host")
             .arg("127.0.0.1")
             .arg("--port")
-            .arg("8765")
+            .arg(slot.port.to_string())
+            // 每次签名一行 access log 属于热路径输出，Agent 自身日志已足够
+            .arg("--no-access-log")
             .current_dir(self.get_project_root()?)
             .stdout(Stdio::piped())
-            .stderr(Stdio::piped())
-            .spawn()?;
+            .stderr(Stdio::piped());
+        if let Some(socket) = &slot.socket {
+            command.env("XHS_AGENT_SOCKET", socket);
+        }
+        let mut child = command.spawn()?;
         
         let pid = child.id();
-        info!("[AgentManager] Agent started with PID: {}", pid);
+        info!("[AgentManager] Agent #{} started with PID: {} (spawn {:?})", slot.index, pid, spawn_started.elapsed());
         
-        *self.process.lock().unwrap() = Some(child);
+        if let Some(stdout) = child.stdout.take() {
+            drain_output(stdout, slot.index, pid, "stdout");
+        }
+        if let Some(stderr) = child.stderr.take() {
+            drain_output(stderr, slot.index, pid, "stderr");
+        }
         
-        // 等待 Agent 启动
-        std::thread::sleep(std::time::Duration::from_millis(1500));
+        *slot.process.lock().unwrap() = Some(child);
+        emit(AgentEvent::Started { agent: slot.index, pid });
+        
+        // 不阻塞启动：后台确认就绪，期间的签名请求在 wait_until_ready 上排队
+        match tokio::runtime::Handle::try_current() {
+            Ok(handle) => {
+                self.set_readiness(slot, AgentReadiness::Starting);
+                handle.spawn(probe_readiness(slot.index, pid, spawn_started));
+            }
+            Err(_) => warn!("[AgentManager] No tokio runtime, skipping readiness probe"),
+        }
         
         Ok(())
     }
 
-    /// 停止 Agent 进程
+    /// 停止全部 Agent 进程（监督任务随之停止）
     pub fn stop(&self) {
-        let mut guard = self.process.lock().unwrap();
-        if let Some(mut child) = guard.take() {
-            info!("[AgentManager] Stopping Agent (PID: {})...", child.id());
-            match child.kill() {
-                Ok(_) => info!("[AgentManager] Agent stopped"),
-                Err(e) => warn!("[AgentManager] Failed to kill Agent: {}", e),
-            }
+        self.stopping.store(true, Ordering::SeqCst);
+        for slot in &self.slots {
+            slot.kill();
+            *slot.readiness.lock().unwrap() = AgentReadiness::Unmanaged;
         }
+        READINESS.send_replace(AgentReadiness::Unmanaged);
+    }
+
+    /// 更新单个 Agent 的状态并发布汇总状态：
+    /// 任一就绪即就绪，否则依次取 启动中 > 已宕机 > 失败
+    fn set_readiness(&self, slot: &AgentSlot, state: AgentReadiness) {
+        *slot.readiness.lock().unwrap() = state;
+
+        let states: Vec<AgentReadiness> = self.slots.iter().map(AgentSlot::readiness).collect();
+        let overall = [
+            AgentReadiness::Ready,
+            AgentReadiness::Starting,
+            AgentReadiness::Down,
+            AgentReadiness::Failed,
+        ]
+        .into_iter()
+        .find(|candidate| states.contains(candidate))
+        .unwrap_or(AgentReadiness::Unmanaged);
+        READINESS.send_replace(overall);
     }
 
-    /// 检查 Agent 是否正在运行
+    /// 检查是否有 Agent 正在运行
     pub fn is_running(&self) -> bool {
-        let mut guard = self.process.lock().unwrap();
-        if let Some(ref mut child) = *guard {
-            match child.try_wait() {
-                Ok(None) => true,  // 仍在运行
-                Ok(Some(_)) => false,  // 已退出
-                Err(_) => false,
-            }
-        } else {
-            false
-        }
+        self.slots.iter().any(AgentSlot::is_running)
     }
 
     /// 获取 Agent 脚本路径
@@ -123,13 +479,254 @@ impl Drop for AgentManager {
     }
 }
 
+/// 轮询 `/health`（指数退避，`AGENT_READY` 行到达时立即重试）直到就绪或超时
+async fn probe_readiness(index: usize, pid: u32, started: Instant) {
+    let slot = &AGENT.slots[index];
+    let health_url = slot.health_url();
+    let timeout = std::env::var("XHS_AGENT_READY_TIMEOUT")
+        .ok()
+        .and_then(|v| v.parse::<u64>().ok())
+        .unwrap_or(READY_TIMEOUT_SECS);
+    let deadline = started + Duration::from_secs(timeout);
+    let client = reqwest::Client::new();
+    let mut backoff = Duration::from_millis(50);
+
+    loop {
+        if health_ok(&client, &health_url).await {
+            info!("[AgentManager] Agent #{} (PID: {}) ready after {:?}", index, pid, started.elapsed());
+            AGENT.set_readiness(slot, AgentReadiness::Ready);
+            BREAKER.record_success();
+            emit(AgentEvent::Ready {
+                agent: index,
+                pid,
+                startup_ms: started.elapsed().as_millis() as u64,
+            });
+            return;
+        }
+        // 被重启或停止取代的探测任务直接退出
+        if slot.pid() != Some(pid) {
+            return;
+        }
+
+        let now = Instant::now();
+        if now >= deadline {
+            warn!("[AgentManager] Agent #{} (PID: {}) not ready after {:?}, giving up waiting", index, pid, started.elapsed());
+            AGENT.set_readiness(slot, AgentReadiness::Failed);
+            return;
+        }
+
+        tokio::select! {
+            _ = tokio::time::sleep(backoff.min(deadline - now)) => {
+                backoff = (backoff * 2).min(MAX_PROBE_BACKOFF);
+            }
+            _ = slot.ready_line.notified() => {
+                backoff = Duration::from_millis(50);
+            }
+        }
+    }
+}
+
+async fn health_ok(client: &reqwest::Client, url: &str) -> bool {
+    client
+        .get(url)
+        .timeout(Duration::from_secs(2))
+        .send()
+        .await
+        .map(|resp| resp.status().is_success())
+        .unwrap_or(false)
+}
+
+/// 监督任务（每个本地 Agent 一个）：进程退出、就绪超时或 `/health` 连续失败时按退避重启；
+/// 本地与远程 Agent 都不可用时打开熔断
+async fn supervise(index: usize) {
+    let slot = &AGENT.slots[index];
+    let health_url = slot.health_url();
+    let client = reqwest::Client::new();
+    let mut restart_attempt: u32 = 0;
+    let mut health_failures: u32 = 0;
+    let mut last_probe = Instant::now();
+
+    loop {
+        tokio::time::sleep(SUPERVISE_INTERVAL).await;
+        if AGENT.stopping.load(Ordering::SeqCst) {
+            return;
+        }
+
+        let down = if let Some((pid, code)) = slot.take_exited() {
+            COUNTERS.exits.fetch_add(1, Ordering::Relaxed);
+            emit(AgentEvent::Exited { agent: index, pid, code });
+            true
+        } else if let Some(pid) = slot.pid() {
+            match slot.readiness() {
+                AgentReadiness::Ready if last_probe.elapsed() >= HEALTH_INTERVAL => {
+                    last_probe = Instant::now();
+                    if health_ok(&client, &health_url).await {
+                        health_failures = 0;
+                        restart_attempt = 0;
+                        false
+                    } else {
+                        health_failures += 1;
+                        COUNTERS.health_failures.fetch_add(1, Ordering::Relaxed);
+                        emit(AgentEvent::Unhealthy { agent: index, pid, failures: health_failures });
+                        health_failures >= UNHEALTHY_THRESHOLD
+                    }
+                }
+                AgentReadiness::Failed => {
+                    emit(AgentEvent::Unhealthy { agent: index, pid, failures: health_failures });
+                    true
+                }
+                _ => false,
+            }
+        } else {
+            // 上一次重启未能拉起进程
+            true
+        };
+
+        if !down {
+            continue;
+        }
+
+        health_failures = 0;
+        slot.kill();
+        AGENT.set_readiness(slot, AgentReadiness::Down);
+        if agent_readiness() != AgentReadiness::Ready && !crate::signature::pool::remote_available() {
+            // 其他本地 Agent 与远程 Agent 也不可用：请求快速失败
+            BREAKER.trip();
+        }
+
+        let backoff = restart_backoff(restart_attempt);
+        restart_attempt += 1;
+        emit(AgentEvent::Restarting {
+            agent: index,
+            attempt: restart_attempt,
+            backoff_ms: backoff.as_millis() as u64,
+        });
+        tokio::time::sleep(backoff).await;
+        if AGENT.stopping.load(Ordering::SeqCst) {
+            return;
+        }
+
+        COUNTERS.restarts.fetch_add(1, Ordering::Relaxed);
+        if let Err(e) = AGENT.start_slot(slot) {
+            warn!("[AgentSupervisor] Restart of agent #{} failed: {}", index, e);
+        }
+        last_probe = Instant::now();
+    }
+}
+
+/// 1s, 2s, 4s ... 最长 30s
+fn restart_backoff(attempt: u32) -> Duration {
+    Duration::from_secs(1u64 << attempt.min(5)).min(MAX_RESTART_BACKOFF)
+}
+
+/// `XHS_AGENT_SOCKET` 供第一个 Agent 使用，其余在文件名后加序号
+fn slot_socket_path(base: &str, index: usize) -> String {
+    if index == 0 {
+        return base.to_string();
+    }
+    match base.strip_suffix(".sock") {
+        Some(stem) => format!("{}-{}.sock", stem, index),
+        None => format!("{}-{}", base, index),
+    }
+}
+
+/// 记录 Agent 上报的启动阶段耗时，并唤醒健康检查
+fn handle_ready_line(index: usize, pid: u32, payload: &str) {
+    match serde_json::from_str::<serde_json::Value>(payload) {
+        Ok(ready) => info!("[AgentManager] Agent #{} (PID: {}) startup timings (ms): {}", index, pid, ready["timings"]),
+        Err(_) => info!("[AgentManager] Agent #{} (PID: {}) reported ready", index, pid),
+    }
+    AGENT.slots[index].ready_line.notify_one();
+}
+
+/// 在后台线程中按行读取 Agent 输出并转发到 tracing
+fn drain_output<R: Read + Send + 'static>(stream: R, index: usize, pid: u32, name: &'static str) {
+    let spawned = std::thread::Builder::new()
+        .name(format!("agent{}-{}", index, name))
+        .spawn(move || {
+            for line in BufReader::new(stream).lines() {
+                match line {
+                    Ok(line) => log_agent_line(index, pid, name, &line),
+                    Err(_) => break,
+                }
+            }
+            debug!(pid, stream = name, "[AgentManager] Agent {} closed", name);
+        });
+    if let Err(e) = spawned {
+        warn!("[AgentManager] Failed to start {} drain thread: {}", name, e);
+    }
+}
+
+/// 按 Agent 日志行首的级别名（`INFO xhs_agent.uds: ...` / uvicorn 的 `INFO:     ...`）映射 tracing 级别
+fn log_agent_line(index: usize, pid: u32, stream: &str, line: &str) {
+    let line = line.trim_end();
+    if line.is_empty() {
+        return;
+    }
+    if stream == "stdout" {
+        if let Some(payload) = line.strip_prefix(READY_MARKER) {
+            handle_ready_line(index, pid, payload.trim());
+            return;
+        }
+    }
+
+    let (level, message) = match line.split_once(char::is_whitespace) {
+        Some((head, rest)) => match parse_level(head.trim_end_matches(':')) {
+            Some(level) => (level, rest.trim_start()),
+            None => (unleveled(stream), line),
+        },
+        None => (unleveled(stream), line),
+    };
+
+    match level {
+        Level::ERROR => error!(target: "agent", agent = index, pid, stream, "{}", message),
+        Level::WARN => warn!(target: "agent", agent = index, pid, stream, "{}", message),
+        Level::INFO => info!(target: "agent", agent = index, pid, stream, "{}", message),
+        _ => debug!(target: "agent", agent = index, pid, stream, "{}", message),
+    }
+}
+
+fn parse_level(name: &str) -> Option<Level> {
+    match name {
+        "CRITICAL" | "ERROR" => Some(Level::ERROR),
+        "WARNING" => Some(Level::WARN),
+        "INFO" => Some(Level::INFO),
+        "DEBUG" => Some(Level::DEBUG),
+        _ => None,
+    }
+}
+
+/// 无级别前缀的行（print、traceback 续行）：stderr 视为 warn
+fn unleveled(stream: &str) -> Level {
+    if stream == "stderr" { Level::WARN } else { Level::INFO }
+}
+
 /// 全局 Agent 管理器实例
 static AGENT: once_cell::sync::Lazy<AgentManager> = 
     once_cell::sync::Lazy::new(AgentManager::new);
 
-/// 启动 Agent（供外部调用）
+/// 启动 Agent 及其监督任务（供外部调用）
+///
+/// 设置 `XHS_AGENT_SUPERVISE=0` 可关闭自动重启。
 pub fn start_agent() -> anyhow::Result<()> {
-    AGENT.start()
+    AGENT.stopping.store(false, Ordering::SeqCst);
+    AGENT.start()?;
+
+    static SUPERVISOR_STARTED: AtomicBool = AtomicBool::new(false);
+    let enabled = std::env::var("XHS_AGENT_SUPERVISE")
+        .map(|v| !matches!(v.to_lowercase().as_str(), "0" | "false" | "off"))
+        .unwrap_or(true);
+    if enabled && !SUPERVISOR_STARTED.swap(true, Ordering::SeqCst) {
+        match tokio::runtime::Handle::try_current() {
+            Ok(handle) => {
+                for index in 0..AGENT.slots.len() {
+                    handle.spawn(supervise(index));
+                }
+            }
+            Err(_) => warn!("[AgentManager] No tokio runtime, agent will not be supervised"),
+        }
+    }
+    Ok(())
 }
 
 /// 停止 Agent（供外部调用）
@@ -141,3 +738,124 @@ pub fn stop_agent() {
 pub fn is_agent_running() -> bool {
     AGENT.is_running()
 }
+
+/// 本地 Agent 的签名端点（`http://127.0.0.1:<port>` 或 `unix:<socket>`）
+pub fn local_agent_endpoints() -> Vec<String> {
+    AGENT.slots.iter().map(AgentSlot::endpoint).collect()
+}
+
+/// 本地 Agent 的 HTTP 地址（Playwright 接口与健康检查始终走 HTTP）
+pub fn local_agent_urls() -> Vec<String> {
+    AGENT.slots.iter().map(AgentSlot::base_url).collect()
+}
+
+/// 本地 Agent 是否可用（按签名端点或 HTTP 地址匹配）；不是本地 Agent 时返回 None
+///
+/// 未由本进程启动（`Unmanaged`）的视为可用，由签名池的被动健康检查判断。
+pub fn local_agent_ready(endpoint: &str) -> Option<bool> {
+    AGENT
+        .slots
+        .iter()
+        .find(|slot| slot.endpoint() == endpoint || slot.base_url() == endpoint)
+        .map(|slot| matches!(slot.readiness(), AgentReadiness::Ready | AgentReadiness::Unmanaged))
+}
+
+/// 项目根目录（包含 `scripts/agent_server.py`）
+pub fn project_root() -> anyhow::Result<PathBuf> {
+    AGENT.get_project_root()
+}
+
+/// 当前就绪状态
+pub fn agent_readiness() -> AgentReadiness {
+    *READINESS.borrow()
+}
+
+/// 等待 Agent 就绪（仅在启动中时等待，最长 `XHS_AGENT_QUEUE_WAIT_MS`）
+pub async fn wait_until_ready() -> AgentReadiness {
+    let wait = std::env::var("XHS_AGENT_QUEUE_WAIT_MS")
+        .ok()
+        .and_then(|v| v.parse::<u64>().ok())
+        .unwrap_or(QUEUE_WAIT_MS);
+    let mut rx = READINESS.subscribe();
+    match tokio::time::timeout(Duration::from_millis(wait), rx.wait_for(|state| !state.is_pending())).await {
+        Ok(Ok(state)) => *state,
+        _ => agent_readiness(),
+    }
+}
+
+/// 签名调用前检查 Agent 可用性
+///
+/// - 签名池中还有未被摘除的远程 Agent：直接放行，由池避开不可用的本地 Agent
+/// - 熔断打开或 Agent 已退出（`Down`）：立即失败，不排队
+/// - 本地 Agent 启动中：短暂排队等待就绪，仍未就绪则失败
+pub async fn ensure_agent_available() -> anyhow::Result<()> {
+    if crate::signature::pool::remote_available() {
+        return Ok(());
+    }
+    let mut state = agent_readiness();
+    if state.is_pending() && !BREAKER.is_open() {
+        state = wait_until_ready().await;
+    }
+    if state.is_pending() || state == AgentReadiness::Down || BREAKER.is_open() {
+        COUNTERS.fast_failures.fetch_add(1, Ordering::Relaxed);
+        return Err(anyhow::anyhow!(
+            "Agent unavailable ({:?}, circuit open), failing fast",
+            state
+        ));
+    }
+    Ok(())
+}
+
+/// 记录一次 Agent 调用结果（传输层成功/失败），驱动熔断器
+pub fn record_agent_call(success: bool) {
+    if success {
+        BREAKER.record_success();
+    } else {
+        BREAKER.record_failure();
+    }
+}
+
+/// 订阅 Agent 生命周期事件
+pub fn subscribe_events() -> broadcast::Receiver<AgentEvent> {
+    EVENTS.subscribe()
+}
+
+/// 监督与熔断状态快照
+pub fn supervisor_stats() -> SupervisorStats {
+    SupervisorStats {
+        readiness: agent_readiness(),
+        agents: AGENT
+            .slots
+            .iter()
+            .map(|slot| LocalAgentStats {
+                index: slot.index,
+                endpoint: slot.endpoint(),
+                pid: slot.pid(),
+                readiness: slot.readiness(),
+            })
+            .collect(),
+        breaker_open: BREAKER.is_open(),
+        restarts: COUNTERS.restarts.load(Ordering::Relaxed),
+        exits: COUNTERS.exits.load(Ordering::Relaxed),
+        health_failures: COUNTERS.health_failures.load(Ordering::Relaxed),
+        breaker_opens: COUNTERS.breaker_opens.load(Ordering::Relaxed),
+        fast_failures: COUNTERS.fast_failures.load(Ordering::Relaxed),
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[tokio::test]
+    async fn fails_fast_while_down() {
+        READINESS.send_replace(AgentReadiness::Down);
+        let started = Instant::now();
+        let result = tokio::time::timeout(Duration::from_millis(200), ensure_agent_available())
+            .await
+            .expect("a call while Down must not queue");
+        assert!(result.is_err());
+        assert!(started.elapsed() < Duration::from_millis(200));
+        READINESS.send_replace(AgentReadiness::Unmanaged);
+    }
+}
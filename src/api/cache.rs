@@ -0,0 +1,304 @@
+//! 响应缓存 (Response Cache)
+//!
+//! 读多写少的元数据接口（猜你想搜、搜索联想、筛选器、OneBox）按端点策略缓存
+//! 上游响应文本，重复访问不再签名、不再请求 XHS：
+//!
+//! - 内存层：每个端点一个 [`TtlCache`]，并发未命中合并为一次上游请求
+//! - 磁盘层（可选）：`XHS_RESPONSE_CACHE_DIR` 下每条一个 JSON 文件，重启后仍可用，
+//!   命中时回填内存层
+//! - 只缓存 `success = true` 的响应；缓存键包含当前登录用户
+//! - 请求头 `Cache-Control: no-cache` 或 `X-Cache-Bypass` 跳过读取（结果仍写回）
+//! - [`conditional`] 中间件：响应附加 `X-Cache`（hit / disk / miss / bypass）；
+//!   GET 响应附加 `ETag`，`If-None-Match` 匹配时返回 304
+//!
+//! 环境变量：
+//! - `XHS_RESPONSE_CACHE`: `0` / `false` / `off` 关闭
+//! - `XHS_RESPONSE_CACHE_SIZE`: 每个端点最多缓存的条目数（默认 1024）
+//! - `XHS_RESPONSE_CACHE_TTL`: 覆盖默认 TTL，如 `search_trending=60,search_onebox=0`（秒，0 关闭该端点）
+//! - `XHS_RESPONSE_CACHE_DIR`: 磁盘层目录（不设置则只用内存）
+
+use anyhow::Result;
+use axum::body::Body;
+use axum::http::{header, HeaderValue, Method, StatusCode};
+use axum::response::IntoResponse;
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::future::Future;
+use std::path::PathBuf;
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, SystemTime, UNIX_EPOCH};
+
+use crate::utils::TtlCache;
+
+/// 默认缓存策略：端点 → TTL（秒）
+const DEFAULT_POLICIES: &[(&str, u64)] = &[
+    ("search_trending", 300),
+    ("search_recommend", 600),
+    ("search_filter", 600),
+    ("search_onebox", 120),
+];
+
+const DEFAULT_CAPACITY: usize = 1024;
+
+/// 跳过缓存读取的请求头
+pub const BYPASS_HEADER: &str = "x-cache-bypass";
+
+/// 缓存状态响应头
+pub const CACHE_STATUS_HEADER: &str = "x-cache";
+
+/// 一条缓存的上游响应
+#[derive(Serialize, Deserialize)]
+struct CachedResponse {
+    /// 写入时间（Unix 秒）：磁盘层与回填的条目据此判断过期
+    stored_at: u64,
+    text: String,
+}
+
+impl CachedResponse {
+    fn new(text: String) -> Self {
+        Self { stored_at: unix_now(), text }
+    }
+
+    fn age(&self) -> Duration {
+        Duration::from_secs(unix_now().saturating_sub(self.stored_at))
+    }
+
+    /// 只判断 `success` 字段，其余字段跳过
+    fn is_success(&self) -> bool {
+        #[derive(Deserialize)]
+        struct Envelope {
+            #[serde(default)]
+            success: bool,
+        }
+        serde_json::from_str::<Envelope>(&self.text).is_ok_and(|e| e.success)
+    }
+}
+
+fn unix_now() -> u64 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .map(|d| d.as_secs())
+        .unwrap_or_default()
+}
+
+/// 单个端点的缓存层
+struct EndpointCache {
+    ttl: Duration,
+    memory: TtlCache<String, Arc<CachedResponse>>,
+}
+
+/// 按端点策略缓存上游响应
+pub struct ResponseCache {
+    endpoints: HashMap<&'static str, EndpointCache>,
+    disk: Option<PathBuf>,
+}
+
+impl ResponseCache {
+    pub fn from_env() -> Self {
+        let enabled = !std::env::var("XHS_RESPONSE_CACHE")
+            .map(|v| matches!(v.to_ascii_lowercase().as_str(), "0" | "false" | "off"))
+            .unwrap_or(false);
+        let capacity = std::env::var("XHS_RESPONSE_CACHE_SIZE")
+            .ok()
+            .and_then(|v| v.parse::<usize>().ok())
+            .unwrap_or(DEFAULT_CAPACITY);
+        let overrides: HashMap<String, u64> = std::env::var("XHS_RESPONSE_CACHE_TTL")
+            .unwrap_or_default()
+            .split(',')
+            .filter_map(|pair| {
+                let (name, secs) = pair.split_once('=')?;
+                Some((name.trim().to_string(), secs.trim().parse().ok()?))
+            })
+            .collect();
+
+        let endpoints: HashMap<&'static str, EndpointCache> = DEFAULT_POLICIES
+            .iter()
+            .filter(|_| enabled && capacity > 0)
+            .filter_map(|&(endpoint, secs)| {
+                let ttl = Duration::from_secs(overrides.get(endpoint).copied().unwrap_or(secs));
+                (!ttl.is_zero()).then(|| (endpoint, EndpointCache { ttl, memory: TtlCache::new(capacity, ttl) }))
+            })
+            .collect();
+        let disk = std::env::var("XHS_RESPONSE_CACHE_DIR")
+            .ok()
+            .filter(|dir| !dir.is_empty() && !endpoints.is_empty())
+            .map(PathBuf::from);
+
+        if !endpoints.is_empty() {
+            let mut policies: Vec<_> = endpoints.iter().map(|(name, c)| (*name, c.ttl.as_secs())).collect();
+            policies.sort();
+            tracing::info!("[ResponseCache] TTL policies (s): {:?}, disk tier: {:?}", policies, disk);
+        }
+        Self { endpoints, disk }
+    }
+
+    /// 该端点是否有缓存策略
+    pub fn covers(&self, endpoint: &str) -> bool {
+        self.endpoints.contains_key(endpoint)
+    }
+
+    /// 按端点策略读取缓存，未命中时执行 `fetch`（同 key 并发只执行一次）
+    pub async fn get_or_fetch<F, Fut>(&self, endpoint: &'static str, key: &str, fetch: F) -> Result<String>
+    where
+        F: FnOnce() -> Fut,
+        Fut: Future<Output = Result<String>>,
+    {
+        let Some(cache) = self.endpoints.get(endpoint) else {
+            return fetch().await;
+        };
+
+        if bypass_requested() {
+            set_status("bypass");
+            let fresh = Arc::new(CachedResponse::new(fetch().await?));
+            if fresh.is_success() {
+                cache.memory.insert(key.to_string(), fresh.clone());
+                self.write_disk(endpoint, key, &fresh).await;
+            }
+            return Ok(fresh.text.clone());
+        }
+
+        // 磁盘回填的条目在内存中重新计时，按写入时间再校验一次
+        if cache.memory.get(&key.to_string()).is_some_and(|c| c.age() >= cache.ttl) {
+            cache.memory.invalidate(&key.to_string());
+        }
+
+        let (cached, hit) = cache
+            .memory
+            .get_or_try_insert_with(key.to_string(), move || async move {
+                if let Some(stored) = self.read_disk(endpoint, key, cache.ttl).await {
+                    set_status("disk");
+                    return Ok(Arc::new(stored));
+                }
+                set_status("miss");
+                let fresh = Arc::new(CachedResponse::new(fetch().await?));
+                if fresh.is_success() {
+                    self.write_disk(endpoint, key, &fresh).await;
+                }
+                Ok(fresh)
+            })
+            .await?;
+
+        if hit {
+            set_status("hit");
+        } else if !cached.is_success() {
+            cache.memory.invalidate(&key.to_string());
+        }
+        crate::metrics::record_cache(endpoint, hit);
+        Ok(cached.text.clone())
+    }
+
+    fn disk_path(&self, endpoint: &str, key: &str) -> Option<PathBuf> {
+        let dir = self.disk.as_ref()?;
+        Some(dir.join(endpoint).join(format!("{:x}.json", md5::compute(key))))
+    }
+
+    async fn read_disk(&self, endpoint: &str, key: &str, ttl: Duration) -> Option<CachedResponse> {
+        let path = self.disk_path(endpoint, key)?;
+        let bytes = tokio::fs::read(&path).await.ok()?;
+        let stored: CachedResponse = serde_json::from_slice(&bytes).ok()?;
+        (stored.age() < ttl).then_some(stored)
+    }
+
+    async fn write_disk(&self, endpoint: &str, key: &str, response: &CachedResponse) {
+        let Some(path) = self.disk_path(endpoint, key) else { return };
+        let result: Result<()> = async {
+            if let Some(dir) = path.parent() {
+                tokio::fs::create_dir_all(dir).await?;
+            }
+            // 先写临时文件再改名，读者不会看到写了一半的文件
+            let tmp = path.with_extension("json.tmp");
+            tokio::fs::write(&tmp, serde_json::to_vec(response)?).await?;
+            tokio::fs::rename(&tmp, &path).await?;
+            Ok(())
+        }
+        .await;
+        if let Err(e) = result {
+            tracing::warn!("[ResponseCache] Failed to write {:?}: {}", path, e);
+        }
+    }
+}
+
+// ============================================================================
+// HTTP 层：绕过请求头、X-Cache 与 ETag
+// ============================================================================
+
+/// 单个 HTTP 请求的缓存上下文
+struct CacheContext {
+    bypass: bool,
+    status: Mutex<Option<&'static str>>,
+}
+
+tokio::task_local! {
+    static CONTEXT: Arc<CacheContext>;
+}
+
+fn bypass_requested() -> bool {
+    CONTEXT.try_with(|c| c.bypass).unwrap_or(false)
+}
+
+fn set_status(status: &'static str) {
+    let _ = CONTEXT.try_with(|c| *c.status.lock().unwrap() = Some(status));
+}
+
+fn wants_bypass(headers: &axum::http::HeaderMap) -> bool {
+    headers.contains_key(BYPASS_HEADER)
+        || headers
+            .get(header::CACHE_CONTROL)
+            .and_then(|v| v.to_str().ok())
+            .is_some_and(|v| v.contains("no-cache") || v.contains("no-store"))
+}
+
+/// `If-None-Match` 是否匹配（支持列表与 `*`，忽略弱校验前缀）
+fn etag_matches(if_none_match: &str, etag: &str) -> bool {
+    if_none_match
+        .split(',')
+        .map(|tag| tag.trim().trim_start_matches("W/"))
+        .any(|tag| tag == "*" || tag == etag)
+}
+
+/// 路由中间件：注入缓存上下文，附加 `X-Cache`；GET 成功响应附加 `ETag` 并处理 `If-None-Match`
+pub async fn conditional(request: axum::extract::Request, next: axum::middleware::Next) -> axum::response::Response {
+    let context = Arc::new(CacheContext {
+        bypass: wants_bypass(request.headers()),
+        status: Mutex::new(None),
+    });
+    let if_none_match = request
+        .headers()
+        .get(header::IF_NONE_MATCH)
+        .and_then(|v| v.to_str().ok())
+        .map(str::to_owned);
+    let is_get = request.method() == Method::GET;
+
+    let mut response = CONTEXT.scope(context.clone(), next.run(request)).await;
+
+    if let Some(status) = *context.status.lock().unwrap() {
+        response.headers_mut().insert(CACHE_STATUS_HEADER, HeaderValue::from_static(status));
+    }
+    if !is_get || response.status() != StatusCode::OK {
+        return response;
+    }
+
+    // JSON 响应体很小，缓冲后按内容计算 ETag
+    let (mut parts, body) = response.into_parts();
+    let bytes = match axum::body::to_bytes(body, usize::MAX).await {
+        Ok(bytes) => bytes,
+        Err(e) => {
+            tracing::warn!("[ResponseCache] Failed to buffer response body: {}", e);
+            return (StatusCode::INTERNAL_SERVER_ERROR, "Failed to read response body").into_response();
+        }
+    };
+    let etag = format!("\"{:x}\"", md5::compute(&bytes));
+    if let Ok(value) = HeaderValue::from_str(&etag) {
+        parts.headers.insert(header::ETAG, value);
+    }
+    // 客户端可缓存，但每次需用 ETag 重新验证
+    parts.headers.insert(header::CACHE_CONTROL, HeaderValue::from_static("private, no-cache"));
+
+    if if_none_match.is_some_and(|v| etag_matches(&v, &etag)) {
+        parts.status = StatusCode::NOT_MODIFIED;
+        parts.headers.remove(header::CONTENT_LENGTH);
+        parts.headers.remove(header::CONTENT_TYPE);
+        return axum::response::Response::from_parts(parts, Body::empty());
+    }
+    axum::response::Response::from_parts(parts, Body::from(bytes))
+}
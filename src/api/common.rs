@@ -10,10 +10,12 @@
 //! 1. **纯算法优先**: 调用 Python Agent 生成签名 (xhshow)
 //! 2. **浏览器兜底**: 若 Agent 不可用，回退到存储的签名
 
-use crate::auth::AuthService;
+use crate::api::cache::ResponseCache;
+use crate::auth::{AuthService, UserCredentials};
 use crate::auth::credentials::ApiSignature;
 use crate::client::XhsClient;
 use crate::signature::{SignatureService, Signature, parse_cookie_string};
+use crate::timing;
 use anyhow::{Result, anyhow};
 use std::sync::Arc;
 
@@ -80,6 +82,7 @@ pub struct XhsApiClient {
     http_client: XhsClient,
     auth: Arc<AuthService>,
     signature_service: SignatureService,
+    response_cache: ResponseCache,
 }
 
 impl XhsApiClient {
@@ -89,6 +92,7 @@ impl XhsApiClient {
             http_client, 
             auth,
             signature_service: SignatureService::new(),
+            response_cache: ResponseCache::from_env(),
         }
     }
 
@@ -97,6 +101,31 @@ impl XhsApiClient {
         &self.auth
     }
 
+    /// 当前登录用户 ID（进程内缓存按用户隔离时作为键前缀）
+    pub async fn user_id(&self) -> Result<String> {
+        Ok(self.credentials().await?.user_id)
+    }
+
+    /// 按端点缓存策略返回响应文本（见 [`crate::api::cache`]）
+    ///
+    /// # Arguments
+    /// * `endpoint` - 缓存策略名（如 "search_trending"），无策略时直接执行 `fetch`
+    /// * `key` - 端点内的缓存键（如关键词），会加上当前用户 ID
+    /// * `fetch` - 未命中时的上游请求
+    pub async fn cached<F, Fut>(&self, endpoint: &'static str, key: &str, fetch: F) -> Result<String>
+    where
+        F: FnOnce() -> Fut,
+        Fut: std::future::Future<Output = Result<String>>,
+    {
+        if !self.response_cache.covers(endpoint) {
+            return fetch().await;
+        }
+        let user_id = self.user_id().await?;
+        self.response_cache
+            .get_or_fetch(endpoint, &format!("{}|{}", user_id, key), fetch)
+            .await
+    }
+
     /// 执行 GET 请求（纯算法优先 + 存储回退）
     /// 
     /// 优先使用 Python Agent 生成签名，失败时回退到存储的签名
@@ -107,8 +136,7 @@ impl XhsApiClient {
     /// # Returns
     /// 响应文本内容
     pub async fn get(&self, endpoint_key: &str) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         
         let cookie_str = credentials.cookie_string();
         
@@ -122,11 +150,9 @@ impl XhsApiClient {
                 Ok(signature) => {
                     tracing::info!("[XhsApiClient] GET {} using ALGO (path: {}, params: {:?})", endpoint_key, path, params);
                     // 使用 .query() 传递参数，而不是直接拼在 URL 中
-                    let response = self.build_get_request_algo(&base_url, &signature, &cookie_str)
-                        .query(&params)
-                        .send()
-                        .await?;
-                    return self.handle_response(response, endpoint_key).await;
+                    let request = self.build_get_request_algo(&base_url, &signature, &cookie_str)
+                        .query(&params);
+                    return self.execute(request, endpoint_key).await;
                 }
                 Err(algo_err) => {
                     tracing::warn!("[XhsApiClient] Algo failed for {}: {}, trying stored signature", endpoint_key, algo_err);
@@ -141,11 +167,9 @@ impl XhsApiClient {
         
         tracing::info!("[XhsApiClient] GET {} using STORED signature", endpoint_key);
         
-        let response = self.build_get_request(&url, &signature, &cookie_str)
-            .send()
-            .await?;
+        let request = self.build_get_request(&url, &signature, &cookie_str);
         
-        self.handle_response(response, endpoint_key).await
+        self.execute(request, endpoint_key).await
     }
 
     /// 执行 GET 请求（纯算法签名优先）
@@ -158,8 +182,7 @@ impl XhsApiClient {
     /// # Returns
     /// 响应文本内容
     pub async fn get_algo(&self, uri: &str) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         
         let cookie_str = credentials.cookie_string();
         let url = format!("https://edith.xiaohongshu.com{}", uri);
@@ -168,10 +191,8 @@ impl XhsApiClient {
         match self.get_algo_signature("GET", uri, &cookie_str, None).await {
             Ok(signature) => {
                 tracing::info!("[XhsApiClient] GET {} using ALGO signature", uri);
-                let response = self.build_get_request_algo(&url, &signature, &cookie_str)
-                    .send()
-                    .await?;
-                self.handle_response(response, uri).await
+                let request = self.build_get_request_algo(&url, &signature, &cookie_str);
+                self.execute(request, uri).await
             }
             Err(algo_err) => {
                 // 算法失败，记录警告并回退
@@ -194,8 +215,7 @@ impl XhsApiClient {
     /// # Returns
     /// 响应文本内容
     pub async fn get_with_query(&self, uri: &str) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         
         let cookie_str = credentials.cookie_string();
         
@@ -208,11 +228,9 @@ impl XhsApiClient {
             Ok(signature) => {
                 tracing::info!("[XhsApiClient] GET {} using ALGO (path: {}, params: {:?})", uri, path, params);
                 // 使用 .query() 传递参数，保持与 get 方法一致
-                let response = self.build_get_request_algo(&base_url, &signature, &cookie_str)
-                    .query(&params)
-                    .send()
-                    .await?;
-                self.handle_response(response, uri).await
+                let request = self.build_get_request_algo(&base_url, &signature, &cookie_str)
+                    .query(&params);
+                self.execute(request, uri).await
             }
             Err(algo_err) => {
                 tracing::warn!("[XhsApiClient] Algo failed for {}: {}", uri, algo_err);
@@ -230,8 +248,7 @@ impl XhsApiClient {
     /// * `endpoint_key` - 端点标识（用于日志和回退）
     /// * `url` - 完整的请求 URL（含查询参数）
     pub async fn get_with_url(&self, endpoint_key: &str, url: &str) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         
         let cookie_str = credentials.cookie_string();
         
@@ -248,10 +265,8 @@ impl XhsApiClient {
                 Ok(signature) => {
                     // Use URL directly to avoid double encoding of query params by reqwest
                     tracing::info!("[XhsApiClient] GET {} using ALGO (url: {})", endpoint_key, url);
-                    let response = self.build_get_request_algo(url, &signature, &cookie_str)
-                        .send()
-                        .await?;
-                    return self.handle_response(response, endpoint_key).await;
+                    let request = self.build_get_request_algo(url, &signature, &cookie_str);
+                    return self.execute(request, endpoint_key).await;
                 }
                 Err(algo_err) => {
                     tracing::warn!("[XhsApiClient] Algo failed for {}: {}, trying stored signature", endpoint_key, algo_err);
@@ -264,11 +279,9 @@ impl XhsApiClient {
         
         tracing::info!("[XhsApiClient] GET {} with custom URL using STORED signature", endpoint_key);
         
-        let response = self.build_get_request(url, &signature, &cookie_str)
-            .send()
-            .await?;
+        let request = self.build_get_request(url, &signature, &cookie_str);
         
-        self.handle_response(response, endpoint_key).await
+        self.execute(request, endpoint_key).await
     }
 
     /// 执行 POST 请求（纯算法优先 + 存储回退）
@@ -278,8 +291,7 @@ impl XhsApiClient {
     /// # Arguments
     /// * `endpoint_key` - 签名存储的 key（如 "home_feed_recommend"）
     pub async fn post(&self, endpoint_key: &str) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         
         let cookie_str = credentials.cookie_string();
         
@@ -289,15 +301,13 @@ impl XhsApiClient {
             
             // 构建 Home Feed 的默认 payload
             let payload = self.build_default_payload(endpoint_key);
-            let body = serde_json::to_string(&payload)?;
             
             match self.get_algo_signature("POST", uri, &cookie_str, Some(payload)).await {
-                Ok(signature) => {
+                Ok(mut signature) => {
                     tracing::info!("[XhsApiClient] POST {} using ALGO", endpoint_key);
-                    let response = self.build_post_request_algo(&url, &signature, &cookie_str, body)
-                        .send()
-                        .await?;
-                    return self.handle_response(response, endpoint_key).await;
+                    let body = signature.body.take().unwrap_or_default();
+                    let request = self.build_post_request_algo(&url, &signature, &cookie_str, body);
+                    return self.execute(request, endpoint_key).await;
                 }
                 Err(algo_err) => {
                     tracing::warn!("[XhsApiClient] Algo failed for {}: {}, trying stored signature", endpoint_key, algo_err);
@@ -313,11 +323,9 @@ impl XhsApiClient {
         
         tracing::info!("[XhsApiClient] POST {} using STORED signature", endpoint_key);
         
-        let response = self.build_post_request(&url, &signature, &cookie_str, body)
-            .send()
-            .await?;
+        let request = self.build_post_request(&url, &signature, &cookie_str, body);
         
-        self.handle_response(response, endpoint_key).await
+        self.execute(request, endpoint_key).await
     }
 
     /// 构建 Home Feed 请求的默认 Payload
@@ -356,26 +364,23 @@ impl XhsApiClient {
     /// * `endpoint_key` - 签名存储的 key（如 "home_feed_fashion"）
     /// * `payload` - 用户提供的完整请求体
     pub async fn post_with_payload(&self, endpoint_key: &str, payload: serde_json::Value) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         
         let cookie_str = credentials.cookie_string();
         
         // 优先尝试纯算法签名
         if let Some(uri) = endpoint_to_uri(endpoint_key) {
             let url = format!("https://edith.xiaohongshu.com{}", uri);
-            let body = serde_json::to_string(&payload)?;
-            
-            // DEBUG: 输出实际发送的 body
-            tracing::info!("[XhsApiClient] POST {} body: {}", endpoint_key, body);
             
             match self.get_algo_signature("POST", uri, &cookie_str, Some(payload)).await {
-                Ok(signature) => {
+                Ok(mut signature) => {
+                    // 使用 Agent 返回的已签名 body，原样发送
+                    let body = signature.body.take().unwrap_or_default();
+                    // DEBUG: 输出实际发送的 body
+                    tracing::info!("[XhsApiClient] POST {} body: {}", endpoint_key, body);
                     tracing::info!("[XhsApiClient] POST {} with custom payload using ALGO", endpoint_key);
-                    let response = self.build_post_request_algo(&url, &signature, &cookie_str, body)
-                        .send()
-                        .await?;
-                    return self.handle_response(response, endpoint_key).await;
+                    let request = self.build_post_request_algo(&url, &signature, &cookie_str, body);
+                    return self.execute(request, endpoint_key).await;
                 }
                 Err(algo_err) => {
                     tracing::warn!("[XhsApiClient] Algo failed for {}: {}", endpoint_key, algo_err);
@@ -398,24 +403,21 @@ impl XhsApiClient {
     /// # Returns
     /// 响应文本内容
     pub async fn post_algo(&self, uri: &str, payload: serde_json::Value) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         
         let cookie_str = credentials.cookie_string();
         let url = format!("https://edith.xiaohongshu.com{}", uri);
-        let body = serde_json::to_string(&payload)?;
-        
-        // DEBUG: 输出实际发送的 payload
-        tracing::info!("[XhsApiClient] POST {} payload: {}", uri, body);
         
         // 尝试纯算法签名
         match self.get_algo_signature("POST", uri, &cookie_str, Some(payload)).await {
-            Ok(signature) => {
+            Ok(mut signature) => {
+                // 使用 Agent 返回的已签名 body，原样发送
+                let body = signature.body.take().unwrap_or_default();
+                // DEBUG: 输出实际发送的 payload
+                tracing::info!("[XhsApiClient] POST {} payload: {}", uri, body);
                 tracing::info!("[XhsApiClient] POST {} using ALGO signature", uri);
-                let response = self.build_post_request_algo(&url, &signature, &cookie_str, body)
-                    .send()
-                    .await?;
-                self.handle_response(response, uri).await
+                let request = self.build_post_request_algo(&url, &signature, &cookie_str, body);
+                self.execute(request, uri).await
             }
             Err(algo_err) => {
                 tracing::warn!("[XhsApiClient] Algo failed for {}: {}", uri, algo_err);
@@ -428,25 +430,28 @@ impl XhsApiClient {
     /// 
     /// 用于需要动态构造请求体的接口
     pub async fn post_with_body(&self, endpoint_key: &str, url: &str, body: String) -> Result<String> {
-        let credentials = self.auth.try_get_credentials().await?
-            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))?;
+        let credentials = self.credentials().await?;
         let signature = self.get_signature(endpoint_key).await?;
         
         tracing::info!("[XhsApiClient] POST {} with custom body_len: {}", endpoint_key, body.len());
         
-        let response = self.build_post_request(url, &signature, &credentials.cookie_string(), body)
-            .send()
-            .await?;
+        let request = self.build_post_request(url, &signature, &credentials.cookie_string(), body);
         
-        self.handle_response(response, endpoint_key).await
+        self.execute(request, endpoint_key).await
     }
 
     // ==================== 私有辅助方法 ====================
 
+    /// 读取登录凭证（`credentials` 阶段）
+    async fn credentials(&self) -> Result<UserCredentials> {
+        timing::phase("credentials", self.auth.try_get_credentials()).await?
+            .ok_or_else(|| anyhow!("Not logged in. Please call /api/auth/login-session first."))
+    }
+
     /// 获取指定接口的签名（从存储）
     /// 兜底方法，当纯算法失败时使用
     async fn get_signature(&self, endpoint_key: &str) -> Result<ApiSignature> {
-        self.auth.get_endpoint_signature(endpoint_key).await?
+        timing::phase("stored_signature", self.auth.get_endpoint_signature(endpoint_key)).await?
             .ok_or_else(|| anyhow!(
                 "No signature found for endpoint: {}. Please login again to capture signatures.", 
                 endpoint_key
@@ -463,9 +468,16 @@ impl XhsApiClient {
         payload: Option<serde_json::Value>,
     ) -> Result<Signature> {
         let cookies = parse_cookie_string(cookie_str);
-        self.signature_service
-            .get_signature_from_agent(method, uri, cookies, payload)
-            .await
+        timing::phase("sign", self.signature_service.get_signature_from_agent(method, uri, cookies, payload)).await
+    }
+
+    /// 发送请求并读取响应（`upstream` 阶段，含响应体下载）
+    async fn execute(&self, request: reqwest::RequestBuilder, endpoint_key: &str) -> Result<String> {
+        timing::phase("upstream", async {
+            let response = request.send().await?;
+            self.handle_response(response, endpoint_key).await
+        })
+        .await
     }
 
     /// 构建 GET 请求（使用纯算法签名）
@@ -584,6 +596,10 @@ impl XhsApiClient {
     /// 处理响应（日志 + 错误状态码处理）
     async fn handle_response(&self, response: reqwest::Response, endpoint_key: &str) -> Result<String> {
         let status = response.status();
+        crate::metrics::UPSTREAM_RESPONSES.inc(&[
+            endpoint_key.split('?').next().unwrap_or(endpoint_key),
+            status.as_str(),
+        ]);
         let text = response.text().await?;
         
         tracing::info!("[XhsApiClient] {} Response [{}]: {} chars", endpoint_key, status, text.len());
@@ -75,6 +75,6 @@ async fn get_feed_internal(
     
     // Use post_with_payload to sign and send with user-provided payload
     let text = api.post_with_payload(&signature_key, payload).await?;
-    let feed_resp: HomefeedResponse = serde_json::from_str(&text)?;
+    let feed_resp: HomefeedResponse = crate::timing::parse_json(&text)?;
     Ok(feed_resp)
 }
@@ -7,6 +7,6 @@ use anyhow::Result;
 /// 获取小红书主页推荐内容流
 pub async fn get_homefeed_recommend(api: &XhsApiClient) -> Result<HomefeedResponse> {
     let text = api.post("home_feed_recommend").await?;
-    let result = serde_json::from_str::<HomefeedResponse>(&text)?;
+    let result = crate::timing::parse_json::<HomefeedResponse>(&text)?;
     Ok(result)
 }
@@ -1,7 +1,8 @@
 //! Login API - QR Code Login Flow
 //!
 //! This module handles the XHS QR code login process:
-//! 1. Fetch guest cookies from Python Agent (Playwright)
+//! 1. Fetch guest cookies from Python Agent (Playwright), served from a
+//!    prewarmed cache (TTL + background refill + single-flight)
 //! 2. Create QR code using official API
 //! 3. Poll QR code status until login success
 //! 4. Store user credentials in MongoDB
@@ -12,8 +13,14 @@
 
 use anyhow::{anyhow, Result};
 use reqwest::header::{HeaderMap, HeaderValue, ACCEPT, CONTENT_TYPE, ORIGIN, REFERER, USER_AGENT};
+use once_cell::sync::Lazy;
 use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
+use std::sync::RwLock;
+use std::time::{Duration, Instant};
+use tokio::sync::{Mutex, Notify};
+
+use crate::signature::pool::agent_http_url;
 
 // ============================================================================
 // Constants
@@ -23,10 +30,16 @@ const XHS_ORIGIN: &str = "https://www.xiaohongshu.com";
 const XHS_REFERER: &str = "https://www.xiaohongshu.com/";
 const XHS_USER_AGENT: &str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36";
 
-const AGENT_URL: &str = "http://127.0.0.1:8765";
 const QRCODE_CREATE_URL: &str = "https://edith.xiaohongshu.com/api/sns/web/v1/login/qrcode/create";
 const QRCODE_STATUS_URL: &str = "https://edith.xiaohongshu.com/api/sns/web/v1/login/qrcode/status";
 
+/// Default guest cookie freshness (`XHS_GUEST_COOKIE_TTL`, seconds; 0 disables the cache)
+const GUEST_COOKIE_TTL_SECS: u64 = 600;
+/// Delay before retrying a failed background refill
+const GUEST_COOKIE_RETRY: Duration = Duration::from_secs(30);
+/// Shortest interval between background refills, however small the TTL
+const GUEST_COOKIE_MIN_REFRESH: Duration = Duration::from_secs(30);
+
 // ============================================================================
 // Agent Request/Response Models
 // ============================================================================
@@ -59,6 +72,9 @@ struct AgentGuestCookiesResponse {
     success: bool,
     cookies: Option<HashMap<String, String>>,
     error: Option<String>,
+    /// Phase breakdown in ms (acquire / navigate / cookies / total)
+    #[serde(default)]
+    timings: Option<HashMap<String, f64>>,
 }
 
 // ============================================================================
@@ -142,8 +158,9 @@ pub struct PollStatusResponse {
 ///
 /// Returns a HashMap of cookies needed for QR code login
 pub async fn fetch_guest_cookies() -> Result<HashMap<String, String>> {
+    crate::agent_manager::ensure_agent_available().await?;
     let client = reqwest::Client::new();
-    let url = format!("{}/guest-cookies", AGENT_URL);
+    let url = format!("{}/guest-cookies", agent_http_url());
     
     tracing::info!("Fetching guest cookies from Agent...");
     
@@ -159,6 +176,10 @@ pub async fn fetch_guest_cookies() -> Result<HashMap<String, String>> {
         .await
         .map_err(|e| anyhow!("Failed to parse Agent response: {}", e))?;
     
+    if let Some(timings) = &result.timings {
+        tracing::info!("Guest cookies timings (ms): {:?}", timings);
+    }
+    
     if !result.success {
         return Err(anyhow!("Agent error: {}", result.error.unwrap_or_default()));
     }
@@ -166,6 +187,173 @@ pub async fn fetch_guest_cookies() -> Result<HashMap<String, String>> {
     result.cookies.ok_or_else(|| anyhow!("No cookies returned"))
 }
 
+// ============================================================================
+// Guest Cookie Cache
+// ============================================================================
+
+/// A fetched guest cookie set
+struct GuestCookieEntry {
+    cookies: HashMap<String, String>,
+    fetched_at: Instant,
+}
+
+/// Prewarmed guest cookies shared by concurrent guest-init callers
+///
+/// - Fresh for `ttl`; refilled in the background `ttl / 5` before expiry,
+///   at most once per `GUEST_COOKIE_MIN_REFRESH`
+/// - Concurrent misses share one in-flight Agent fetch (single-flight)
+/// - Invalidated after a login consumes the guest session
+/// - `ttl` of 0 disables caching: every call fetches and no refiller runs
+struct GuestCookieCache {
+    entry: RwLock<Option<GuestCookieEntry>>,
+    /// Held while fetching from the Agent
+    refill: Mutex<()>,
+    /// Wakes the background refiller early (invalidate)
+    wake: Notify,
+    ttl: Duration,
+}
+
+static GUEST_COOKIES: Lazy<GuestCookieCache> = Lazy::new(GuestCookieCache::from_env);
+static GUEST_COOKIE_METRICS: Lazy<crate::metrics::CacheCounters> =
+    Lazy::new(|| crate::metrics::CacheCounters::new("guest_cookies"));
+
+impl GuestCookieCache {
+    fn from_env() -> Self {
+        let ttl = std::env::var("XHS_GUEST_COOKIE_TTL")
+            .ok()
+            .and_then(|v| v.parse::<u64>().ok())
+            .unwrap_or(GUEST_COOKIE_TTL_SECS);
+        Self {
+            entry: RwLock::new(None),
+            refill: Mutex::new(()),
+            wake: Notify::new(),
+            ttl: Duration::from_secs(ttl),
+        }
+    }
+
+    fn enabled(&self) -> bool {
+        !self.ttl.is_zero()
+    }
+
+    /// Refill this long before expiry so callers never see a stale set
+    fn refresh_ahead(&self) -> Duration {
+        self.ttl / 5
+    }
+
+    /// Cached cookies if still fresh
+    fn fresh(&self) -> Option<HashMap<String, String>> {
+        let entry = self.entry.read().unwrap();
+        entry
+            .as_ref()
+            .filter(|e| e.fetched_at.elapsed() < self.ttl)
+            .map(|e| e.cookies.clone())
+    }
+
+    /// Time until the background refiller should run again
+    fn until_refresh(&self) -> Duration {
+        let entry = self.entry.read().unwrap();
+        match entry.as_ref() {
+            Some(e) => self
+                .ttl
+                .saturating_sub(self.refresh_ahead())
+                .max(GUEST_COOKIE_MIN_REFRESH)
+                .saturating_sub(e.fetched_at.elapsed()),
+            None => Duration::ZERO,
+        }
+    }
+
+    async fn get(&self) -> Result<HashMap<String, String>> {
+        if !self.enabled() {
+            return fetch_guest_cookies().await;
+        }
+        if let Some(cookies) = self.fresh() {
+            tracing::debug!("[GuestCookieCache] Hit");
+            GUEST_COOKIE_METRICS.record(true);
+            return Ok(cookies);
+        }
+
+        // Single-flight: whoever gets the lock first fetches, the rest reuse it
+        let _guard = self.refill.lock().await;
+        if let Some(cookies) = self.fresh() {
+            GUEST_COOKIE_METRICS.record(true);
+            return Ok(cookies);
+        }
+        GUEST_COOKIE_METRICS.record(false);
+        self.fill().await
+    }
+
+    /// Fetch from the Agent and store (caller holds `refill`)
+    async fn fill(&self) -> Result<HashMap<String, String>> {
+        let started = Instant::now();
+        let cookies = fetch_guest_cookies().await?;
+        tracing::info!("[GuestCookieCache] Refilled in {:?}", started.elapsed());
+        *self.entry.write().unwrap() = Some(GuestCookieEntry {
+            cookies: cookies.clone(),
+            fetched_at: Instant::now(),
+        });
+        Ok(cookies)
+    }
+
+    fn invalidate(&self) {
+        *self.entry.write().unwrap() = None;
+        self.wake.notify_one();
+    }
+
+    /// Background loop: keep a fresh set ready
+    async fn run_refiller(&self) {
+        loop {
+            let wait = self.until_refresh();
+            if !wait.is_zero() {
+                tokio::select! {
+                    _ = tokio::time::sleep(wait) => {}
+                    _ = self.wake.notified() => {}
+                }
+                continue;
+            }
+
+            let result = {
+                let _guard = self.refill.lock().await;
+                if self.until_refresh().is_zero() {
+                    self.fill().await.map(|_| ())
+                } else {
+                    Ok(()) // a caller refilled it meanwhile
+                }
+            };
+            if let Err(e) = result {
+                tracing::warn!("[GuestCookieCache] Background refill failed: {}", e);
+                tokio::time::sleep(GUEST_COOKIE_RETRY).await;
+            }
+        }
+    }
+}
+
+/// Get guest cookies, served from the prewarmed cache when fresh
+pub async fn get_guest_cookies() -> Result<HashMap<String, String>> {
+    GUEST_COOKIES.get().await
+}
+
+/// Drop the cached guest cookies (e.g. after a login used them)
+pub fn invalidate_guest_cookies() {
+    GUEST_COOKIES.invalidate();
+}
+
+/// Start the background guest cookie refiller
+///
+/// Disabled with `XHS_GUEST_COOKIE_PREWARM=0`; the cache then fills on demand.
+/// Not started when the cache itself is disabled (`XHS_GUEST_COOKIE_TTL=0`).
+pub fn spawn_guest_cookie_prewarm() {
+    let enabled = std::env::var("XHS_GUEST_COOKIE_PREWARM")
+        .map(|v| !matches!(v.to_lowercase().as_str(), "0" | "false" | "off"))
+        .unwrap_or(true);
+    if !GUEST_COOKIES.enabled() {
+        tracing::info!("[GuestCookieCache] Disabled (XHS_GUEST_COOKIE_TTL=0), no prewarm");
+        return;
+    }
+    if enabled {
+        tokio::spawn(GUEST_COOKIES.run_refiller());
+    }
+}
+
 /// Get signature from Python Agent
 async fn sign_request(
     cookies: &HashMap<String, String>,
@@ -173,8 +361,9 @@ async fn sign_request(
     uri: &str,
     payload: Option<serde_json::Value>,
 ) -> Result<(String, String, String, String)> {
+    crate::agent_manager::ensure_agent_available().await?;
     let client = reqwest::Client::new();
-    let url = format!("{}/sign", AGENT_URL);
+    let url = format!("{}/sign", agent_http_url());
     
     let request = AgentSignRequest {
         method: method.to_string(),
@@ -359,7 +548,7 @@ pub async fn check_qrcode_status(
 /// Sync full login cookies from Python Agent (Headless Browser)
 pub async fn sync_login_cookies(web_session: &str) -> Result<HashMap<String, String>> {
     let client = reqwest::Client::new();
-    let url = format!("{}/sync-login-cookies", AGENT_URL);
+    let url = format!("{}/sync-login-cookies", agent_http_url());
     
     let mut payload = HashMap::new();
     payload.insert("web_session", web_session);
@@ -388,6 +577,10 @@ pub async fn sync_login_cookies(web_session: &str) -> Result<HashMap<String, Str
     let result: AgentGuestCookiesResponse = serde_json::from_str(&text)
         .map_err(|e| anyhow!("Failed to parse Agent sync response: {} - Body: {}", e, text))?;
         
+    if let Some(timings) = &result.timings {
+        tracing::info!("Cookie sync timings (ms): {:?}", timings);
+    }
+        
     if !result.success {
         return Err(anyhow!("Agent sync error: {}", result.error.unwrap_or_default()));
     }
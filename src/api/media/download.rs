@@ -1,13 +1,14 @@
 //! Media Download API
 //!
-//! Downloads media files (video/image) to local storage
+//! Downloads media files (video/image) to local storage (streaming, resumable)
 
-use anyhow::{Result, anyhow};
+use anyhow::Result;
 use serde::{Deserialize, Serialize};
 use utoipa::ToSchema;
 use std::path::Path;
-use tokio::fs;
-use tokio::io::AsyncWriteExt;
+
+use super::engine::DownloadOptions;
+use super::hedge::download_hedged;
 
 /// 媒体下载请求参数
 #[derive(Debug, Clone, Deserialize, Serialize, ToSchema)]
@@ -18,6 +19,18 @@ pub struct DownloadRequest {
     /// 保存路径 (必填)
     /// 例如: "./downloads/video.mp4"
     pub save_path: String,
+    /// 期望的文件大小 (可选，bytes)
+    /// 通常取自 `VideoItem.size`，与实际大小不一致时下载失败
+    #[serde(default)]
+    pub expected_size: Option<u64>,
+    /// 最大并发连接数 (可选)
+    /// 大文件按字节区间分段并发下载；1 表示单连接，默认见 `XHS_DOWNLOAD_CONNECTIONS`
+    #[serde(default)]
+    pub connections: Option<usize>,
+    /// 备用 URL 列表 (可选)
+    /// 同一文件的其他 CDN 地址（如 `VideoItem.backup_url`）；主地址响应慢或失败时对冲 / 转移到备用地址
+    #[serde(default)]
+    pub backup_urls: Vec<String>,
 }
 
 /// 媒体下载响应
@@ -39,6 +52,9 @@ pub struct DownloadData {
     pub file_size: u64,
     /// 内容类型 (如 video/mp4, image/jpeg)
     pub content_type: String,
+    /// 续传起点 (bytes，0 表示从头下载)
+    #[serde(default)]
+    pub resumed_from: u64,
 }
 
 /// 允许的 CDN 域名白名单
@@ -49,94 +65,47 @@ const ALLOWED_DOMAINS: &[&str] = &[
 
 /// 下载媒体文件到本地
 ///
-/// 支持视频和图片的下载
+/// 支持视频和图片的下载。响应体流式写入 `<save_path>.part`，中断后再次请求同一路径
+/// 会从已下载的位置续传，完成并校验大小后原子改名为 `save_path`（见 [`super::engine`]）。
+/// 提供备用 URL 时按 CDN 主机历史表现选择主地址，并对慢响应做对冲（见 [`super::hedge`]）。
 pub async fn download_media(req: DownloadRequest) -> Result<DownloadResponse> {
     // 验证 URL 域名白名单
-    if !is_url_allowed(&req.url) {
+    if !is_url_allowed(&req.url) || !req.backup_urls.iter().all(|url| is_url_allowed(url)) {
         return Ok(DownloadResponse {
             success: false,
             msg: Some("URL domain not in whitelist. Only xhscdn.com and xiaohongshu.com are allowed.".to_string()),
             data: None,
         });
     }
-    
-    // 确保保存目录存在
-    let save_path = Path::new(&req.save_path);
-    if let Some(parent) = save_path.parent() {
-        if !parent.exists() {
-            fs::create_dir_all(parent).await
-                .map_err(|e| anyhow!("Failed to create directory: {}", e))?;
-        }
-    }
-    
-    // 创建 HTTP 客户端
-    let client = reqwest::Client::builder()
-        .timeout(std::time::Duration::from_secs(300)) // 5分钟超时
-        .build()?;
-    
-    // 发送下载请求
-    let response = client
-        .get(&req.url)
-        .header("Accept", "*/*")
-        .header("Accept-Language", "zh-CN,zh;q=0.9")
-        .header("Origin", "https://www.xiaohongshu.com")
-        .header("Referer", "https://www.xiaohongshu.com/")
-        .header("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36")
-        .send()
-        .await
-        .map_err(|e| anyhow!("Failed to download: {}", e))?;
-    
-    // 检查响应状态
-    if !response.status().is_success() {
-        return Ok(DownloadResponse {
-            success: false,
-            msg: Some(format!("Download failed with status: {}", response.status())),
-            data: None,
-        });
-    }
-    
-    // 获取内容类型
-    let content_type = response
-        .headers()
-        .get("content-type")
-        .and_then(|v| v.to_str().ok())
-        .unwrap_or("application/octet-stream")
-        .to_string();
-    
-    // 获取文件内容
-    let bytes = response.bytes().await
-        .map_err(|e| anyhow!("Failed to read response body: {}", e))?;
-    
-    let file_size = bytes.len() as u64;
-    
-    // 写入文件
-    let mut file = fs::File::create(&req.save_path).await
-        .map_err(|e| anyhow!("Failed to create file: {}", e))?;
-    
-    file.write_all(&bytes).await
-        .map_err(|e| anyhow!("Failed to write file: {}", e))?;
-    
-    file.flush().await
-        .map_err(|e| anyhow!("Failed to flush file: {}", e))?;
-    
+
+    let options = DownloadOptions {
+        expected_size: req.expected_size.filter(|&size| size > 0),
+        connections: req.connections,
+        ..Default::default()
+    };
+    let mut urls = vec![req.url.clone()];
+    urls.extend(req.backup_urls.iter().cloned());
+    let outcome = download_hedged(&urls, Path::new(&req.save_path), &options).await?;
+
     tracing::info!(
-        "[MediaDownload] Downloaded {} -> {} ({} bytes)", 
-        req.url, req.save_path, file_size
+        "[MediaDownload] Downloaded {} -> {} ({} bytes, resumed from {})",
+        req.url, req.save_path, outcome.size, outcome.resumed_from
     );
-    
+
     Ok(DownloadResponse {
         success: true,
         msg: None,
         data: Some(DownloadData {
             saved_path: req.save_path,
-            file_size,
-            content_type,
+            file_size: outcome.size,
+            content_type: outcome.content_type,
+            resumed_from: outcome.resumed_from,
         }),
     })
 }
 
 /// 检查 URL 是否在白名单中
-fn is_url_allowed(url: &str) -> bool {
+pub(crate) fn is_url_allowed(url: &str) -> bool {
     for domain in ALLOWED_DOMAINS {
         if url.contains(domain) {
             return true;
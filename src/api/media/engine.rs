@@ -0,0 +1,552 @@
+//! 媒体下载引擎 (Download Engine)
+//!
+//! - 所有下载共享一个带连接池的 reqwest Client
+//! - 响应按块流式写入 `<目标>.part`，每个下载的内存占用恒定（写缓冲 256 KiB）
+//! - 断点续传：`.part` 已有内容时用 `Range: bytes=N-` 继续；连接中断或读取超时后
+//!   自动重试，并从已写入的位置续传
+//! - 续传校验：`<目标>.part.meta` 记录 `.part` 的来源 URL 与校验值（强 ETag 或
+//!   Last-Modified），续传时以 `If-Range` 发送；URL 不同或没有校验值时从头下载，
+//!   服务端返回 200（对象已变化）时清空 `.part` 重新写入，不会拼接两个版本
+//! - 大小校验：`Content-Length` / `Content-Range` 给出的总长，以及调用方提供的期望
+//!   大小（如 `VideoItem.size`）
+//! - 完成后 fsync 并原子改名为目标文件，目标路径上不会出现写了一半的文件
+//! - 支持区间请求的大文件按分段并发下载（见 [`super::segmented`]）
+//! - 每个 CDN 主机的并发连接数有上限，所有下载共享
+//! - 每次请求记录 CDN 主机的首字节延迟、吞吐与失败（见 [`super::hedge`]）
+//!
+//! 环境变量：
+//! - `XHS_DOWNLOAD_RETRIES`: 中断后的重试次数（默认 3）
+//! - `XHS_DOWNLOAD_CHUNK_TIMEOUT`: 单次读取的超时秒数（默认 30）
+//! - `XHS_DOWNLOAD_CONNECTIONS`: 单个下载的最大连接数（默认 4，1 关闭分段下载）
+//! - `XHS_DOWNLOAD_HOST_LIMIT`: 每个主机的最大并发连接数（默认 8）
+//! - `XHS_DOWNLOAD_HOST_LIMITS`: 按主机覆盖，如 `sns-video-bd.xhscdn.com=16,xhscdn.com=12`
+//!   （后缀匹配，取第一个匹配项）
+
+use anyhow::{Result, anyhow};
+use once_cell::sync::Lazy;
+use reqwest::header::{
+    HeaderMap, HeaderName, CONTENT_LENGTH, CONTENT_RANGE, CONTENT_TYPE, ETAG, IF_RANGE, LAST_MODIFIED, RANGE,
+};
+use reqwest::StatusCode;
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex, OnceLock};
+use std::time::{Duration, Instant};
+use tokio::fs;
+use tokio::io::{AsyncWriteExt, BufWriter};
+use tokio::sync::{OwnedSemaphorePermit, Semaphore};
+
+use super::{hedge, segmented};
+use super::segmented::RangeInfo;
+use crate::utils::RateLimiter;
+
+const USER_AGENT: &str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36";
+
+/// 写缓冲大小：每条连接最多在内存中攒这么多数据再落盘
+pub(crate) const WRITE_BUFFER: usize = 256 * 1024;
+
+const DEFAULT_RETRIES: u32 = 3;
+const DEFAULT_CHUNK_TIMEOUT_SECS: u64 = 30;
+const DEFAULT_CONNECTIONS: usize = 4;
+const DEFAULT_HOST_LIMIT: usize = 8;
+
+/// 下载共享的 HTTP 客户端（连接复用）
+static CLIENT: Lazy<reqwest::Client> = Lazy::new(|| {
+    reqwest::Client::builder()
+        .connect_timeout(Duration::from_secs(10))
+        .pool_idle_timeout(Duration::from_secs(90))
+        .build()
+        .unwrap_or_else(|_| reqwest::Client::new())
+});
+
+/// 按主机覆盖的连接上限（`XHS_DOWNLOAD_HOST_LIMITS`）
+static HOST_LIMITS: Lazy<Vec<(String, usize)>> = Lazy::new(|| {
+    std::env::var("XHS_DOWNLOAD_HOST_LIMITS")
+        .unwrap_or_default()
+        .split(',')
+        .filter_map(|pair| {
+            let (host, limit) = pair.split_once('=')?;
+            Some((host.trim().to_ascii_lowercase(), limit.trim().parse().ok()?))
+        })
+        .filter(|(_, limit)| *limit > 0)
+        .collect()
+});
+
+/// 每个主机一个信号量，限制所有下载对该主机的并发连接数
+static HOST_SEMAPHORES: Lazy<Mutex<HashMap<String, Arc<Semaphore>>>> = Lazy::new(|| Mutex::new(HashMap::new()));
+
+pub(crate) fn env_u64(name: &str, default: u64) -> u64 {
+    std::env::var(name)
+        .ok()
+        .and_then(|v| v.parse().ok())
+        .unwrap_or(default)
+}
+
+pub(crate) fn retries() -> u32 {
+    env_u64("XHS_DOWNLOAD_RETRIES", DEFAULT_RETRIES as u64) as u32
+}
+
+pub(crate) fn chunk_timeout() -> Duration {
+    Duration::from_secs(env_u64("XHS_DOWNLOAD_CHUNK_TIMEOUT", DEFAULT_CHUNK_TIMEOUT_SECS))
+}
+
+/// 第 `attempt` 次重试前的退避时间（指数增长）
+pub(crate) fn backoff(attempt: u32) -> Duration {
+    Duration::from_millis(500 * 2u64.pow(attempt.saturating_sub(1).min(6)))
+}
+
+/// URL 的主机名（小写）
+pub fn host_of(url: &str) -> String {
+    reqwest::Url::parse(url)
+        .ok()
+        .and_then(|u| u.host_str().map(str::to_ascii_lowercase))
+        .unwrap_or_default()
+}
+
+/// 主机的并发连接上限
+pub fn host_limit(host: &str) -> usize {
+    HOST_LIMITS
+        .iter()
+        .find(|(pattern, _)| host == pattern || host.ends_with(&format!(".{}", pattern)))
+        .map(|(_, limit)| *limit)
+        .unwrap_or_else(|| env_u64("XHS_DOWNLOAD_HOST_LIMIT", DEFAULT_HOST_LIMIT as u64).max(1) as usize)
+}
+
+/// 占用目标主机的一个连接名额（释放 permit 即归还）
+pub async fn host_permit(url: &str) -> OwnedSemaphorePermit {
+    let host = host_of(url);
+    let semaphore = HOST_SEMAPHORES
+        .lock()
+        .unwrap()
+        .entry(host.clone())
+        .or_insert_with(|| Arc::new(Semaphore::new(host_limit(&host))))
+        .clone();
+    semaphore.acquire_owned().await.expect("host semaphore closed")
+}
+
+/// 带 CDN 所需请求头的 GET 请求
+pub fn cdn_get(url: &str) -> reqwest::RequestBuilder {
+    CLIENT
+        .get(url)
+        .header("Accept", "*/*")
+        .header("Accept-Language", "zh-CN,zh;q=0.9")
+        .header("Origin", "https://www.xiaohongshu.com")
+        .header("Referer", "https://www.xiaohongshu.com/")
+        .header("User-Agent", USER_AGENT)
+}
+
+/// 下载选项
+#[derive(Debug, Clone, Default)]
+pub struct DownloadOptions {
+    /// 期望的文件大小（如 `VideoItem.size`），与服务端给出的大小不一致时报错
+    pub expected_size: Option<u64>,
+    /// 最大连接数（默认 `XHS_DOWNLOAD_CONNECTIONS`，不超过主机上限；1 表示单连接）
+    pub connections: Option<usize>,
+    /// 共享的带宽上限（如批量任务的总带宽）
+    pub bandwidth: Option<Arc<RateLimiter>>,
+    /// 进度观察（对冲下载据此判断是否需要对冲）
+    pub progress: Option<Arc<Progress>>,
+}
+
+impl DownloadOptions {
+    /// 收到响应头
+    pub(crate) fn on_response(&self) {
+        if let Some(progress) = &self.progress {
+            let _ = progress.first_response.set(Instant::now());
+        }
+    }
+
+    /// 收到一块数据（限速 + 计数）
+    pub(crate) async fn on_chunk(&self, len: usize) {
+        if let Some(bandwidth) = &self.bandwidth {
+            bandwidth.acquire(len as u64).await;
+        }
+        if let Some(progress) = &self.progress {
+            progress.bytes.fetch_add(len as u64, Ordering::Relaxed);
+        }
+    }
+}
+
+/// 下载进度（所有连接累计）
+#[derive(Debug, Default)]
+pub struct Progress {
+    bytes: AtomicU64,
+    first_response: OnceLock<Instant>,
+}
+
+impl Progress {
+    /// 本次下载已收到的字节数
+    pub fn bytes(&self) -> u64 {
+        self.bytes.load(Ordering::Relaxed)
+    }
+
+    /// 首个成功响应的时间（尚未响应时为 None）
+    pub fn responded_at(&self) -> Option<Instant> {
+        self.first_response.get().copied()
+    }
+}
+
+/// 下载结果
+#[derive(Debug, Clone)]
+pub struct DownloadOutcome {
+    pub path: PathBuf,
+    pub size: u64,
+    pub content_type: String,
+    /// 续传起点（0 表示从头下载）
+    pub resumed_from: u64,
+}
+
+/// 未完成下载的临时文件路径
+pub fn part_path(dest: &Path) -> PathBuf {
+    let mut name = dest.as_os_str().to_owned();
+    name.push(".part");
+    PathBuf::from(name)
+}
+
+/// `.part` 来源记录路径
+pub fn meta_path(dest: &Path) -> PathBuf {
+    let mut name = part_path(dest).into_os_string();
+    name.push(".meta");
+    PathBuf::from(name)
+}
+
+/// `.part` 的来源（`<目标>.part.meta`）：续传前确认仍是同一 URL 的同一版本
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub(crate) struct PartMeta {
+    pub url: String,
+    /// 续传时作为 `If-Range` 发送的校验值
+    pub validator: Option<String>,
+}
+
+pub(crate) async fn load_meta(path: &Path) -> Option<PartMeta> {
+    serde_json::from_slice(&fs::read(path).await.ok()?).ok()
+}
+
+async fn save_meta(path: &Path, meta: &PartMeta) -> Result<()> {
+    fs::write(path, serde_json::to_vec(meta)?)
+        .await
+        .map_err(|e| anyhow!("Failed to write {:?}: {}", path, e))
+}
+
+/// 响应的校验值：强 ETag 优先（弱 ETag 不能用于 `If-Range`），否则 Last-Modified
+pub(crate) fn validator(headers: &HeaderMap) -> Option<String> {
+    let header = |name: HeaderName| headers.get(name).and_then(|v| v.to_str().ok());
+    header(ETAG)
+        .filter(|etag| !etag.starts_with("W/"))
+        .or_else(|| header(LAST_MODIFIED))
+        .map(str::to_owned)
+}
+
+/// `Content-Range: bytes 100-199/2000` → (起点, 总长)；`bytes */2000` → (None, 总长)
+pub(crate) fn parse_content_range(value: &str) -> (Option<u64>, Option<u64>) {
+    let Some(spec) = value.trim().strip_prefix("bytes ") else {
+        return (None, None);
+    };
+    let (range, total) = spec.split_once('/').unwrap_or((spec, "*"));
+    let start = range.split_once('-').and_then(|(start, _)| start.parse().ok());
+    (start, total.parse().ok())
+}
+
+/// 一次请求的结果
+pub(crate) enum Attempt {
+    /// 响应体已完整读完
+    Complete,
+    /// 连接中断 / 读取超时 / 5xx：可从当前位置续传
+    Interrupted(anyhow::Error),
+}
+
+/// 单个文件的传输状态
+struct Transfer<'a> {
+    url: &'a str,
+    options: &'a DownloadOptions,
+    part: PathBuf,
+    /// `.part` 的来源记录
+    meta: PathBuf,
+    /// 已写入部分的校验值（续传时作为 `If-Range`）
+    validator: Option<String>,
+    /// `.part` 中已写入的字节数
+    offset: u64,
+    /// 文件总长（服务端或调用方给出）
+    total: Option<u64>,
+    expected: Option<u64>,
+    content_type: Option<String>,
+    /// 首个请求带 `Range: bytes=0-`，206 给出的总长不小于该值时改为分段下载
+    split_threshold: Option<u64>,
+    /// 决定改为分段下载时的区间信息（此时 `fetch` 不写文件直接返回）
+    split: Option<RangeInfo>,
+}
+
+impl Transfer<'_> {
+    /// 记录服务端给出的总长，与期望大小 / 之前的总长比对
+    fn set_total(&mut self, total: u64) -> Result<()> {
+        if let Some(expected) = self.expected.filter(|&e| e != total) {
+            return Err(anyhow!("Size mismatch: server reports {} bytes, expected {}", total, expected));
+        }
+        if let Some(previous) = self.total.filter(|&t| t != total) {
+            return Err(anyhow!("Remote file changed size ({} -> {} bytes)", previous, total));
+        }
+        self.total = Some(total);
+        Ok(())
+    }
+
+    async fn fetch(&mut self, chunk_timeout: Duration) -> Result<Attempt> {
+        let _permit = host_permit(self.url).await;
+        let mut request = cdn_get(self.url);
+        if self.offset > 0 {
+            request = request.header(RANGE, format!("bytes={}-", self.offset));
+            if let Some(validator) = &self.validator {
+                request = request.header(IF_RANGE, validator);
+            }
+        } else if self.split_threshold.is_some() {
+            // 从第一个响应判断是否值得分段，不单独发探测请求
+            request = request.header(RANGE, "bytes=0-");
+        }
+        let started = Instant::now();
+        let mut response = match request.send().await {
+            Ok(response) => response,
+            Err(e) => {
+                hedge::record_failure(self.url);
+                return Ok(Attempt::Interrupted(e.into()));
+            }
+        };
+        let status = response.status();
+        let header = |name: HeaderName| {
+            response
+                .headers()
+                .get(name)
+                .and_then(|v| v.to_str().ok())
+                .map(str::to_owned)
+        };
+        let content_range = header(CONTENT_RANGE);
+
+        if status == StatusCode::RANGE_NOT_SATISFIABLE && self.offset > 0 {
+            // `.part` 已经是完整文件（上次在改名前中断），否则重新下载
+            let (_, total) = content_range.as_deref().map(parse_content_range).unwrap_or_default();
+            if total.or(self.total) == Some(self.offset) {
+                self.total = Some(self.offset);
+                return Ok(Attempt::Complete);
+            }
+            self.offset = 0;
+            return Ok(Attempt::Interrupted(anyhow!("Stale partial file, restarting")));
+        }
+        if status.is_server_error() {
+            hedge::record_failure(self.url);
+            return Ok(Attempt::Interrupted(anyhow!("Download failed with status: {}", status)));
+        }
+        if !status.is_success() {
+            return Err(anyhow!("Download failed with status: {}", status));
+        }
+        hedge::record_response(self.url, started.elapsed());
+        self.options.on_response();
+
+        if let Some(content_type) = header(CONTENT_TYPE) {
+            self.content_type = Some(content_type);
+        }
+        if status == StatusCode::PARTIAL_CONTENT {
+            let (start, total) = content_range.as_deref().map(parse_content_range).unwrap_or_default();
+            if start != Some(self.offset) {
+                return Err(anyhow!("Unexpected Content-Range {:?} for offset {}", content_range, self.offset));
+            }
+            if let Some(total) = total {
+                self.set_total(total)?;
+                if self.split_threshold.take().is_some_and(|threshold| total >= threshold) {
+                    // 大文件：放弃这个响应，交给分段下载
+                    self.split = Some(RangeInfo {
+                        total,
+                        content_type: self.content_type.clone(),
+                        validator: validator(response.headers()),
+                    });
+                    return Ok(Attempt::Complete);
+                }
+            }
+        } else {
+            // 服务端忽略了 Range 或 If-Range 不匹配（对象已变化）：从头写
+            self.offset = 0;
+            self.total = self.expected;
+            if let Some(length) = header(CONTENT_LENGTH).and_then(|v| v.parse().ok()) {
+                self.set_total(length)?;
+            }
+        }
+        self.split_threshold = None;
+
+        // 从头写入：记录来源与校验值，供之后续传
+        let fresh = self.offset == 0;
+        if fresh {
+            self.validator = validator(response.headers());
+            let meta = PartMeta { url: self.url.to_string(), validator: self.validator.clone() };
+            save_meta(&self.meta, &meta).await?;
+        }
+
+        let file = fs::OpenOptions::new()
+            .create(true)
+            .write(true)
+            .append(!fresh)
+            .truncate(fresh)
+            .open(&self.part)
+            .await
+            .map_err(|e| anyhow!("Failed to create file: {}", e))?;
+        let mut writer = BufWriter::with_capacity(WRITE_BUFFER, file);
+
+        let outcome = loop {
+            match tokio::time::timeout(chunk_timeout, response.chunk()).await {
+                Ok(Ok(Some(bytes))) => {
+                    self.options.on_chunk(bytes.len()).await;
+                    writer
+                        .write_all(&bytes)
+                        .await
+                        .map_err(|e| anyhow!("Failed to write file: {}", e))?;
+                    self.offset += bytes.len() as u64;
+                    if self.total.is_some_and(|total| self.offset > total) {
+                        return Err(anyhow!("Received more data than the expected {:?} bytes", self.total));
+                    }
+                }
+                Ok(Ok(None)) => break Attempt::Complete,
+                Ok(Err(e)) => break Attempt::Interrupted(e.into()),
+                Err(_) => break Attempt::Interrupted(anyhow!("No data for {:?}", chunk_timeout)),
+            }
+        };
+        writer.flush().await.map_err(|e| anyhow!("Failed to flush file: {}", e))?;
+
+        // 连接提前结束但未报错：当作中断，续传剩余部分
+        match (&outcome, self.total) {
+            (Attempt::Complete, Some(total)) if self.offset < total => Ok(Attempt::Interrupted(anyhow!(
+                "Connection closed at {} of {} bytes",
+                self.offset,
+                total
+            ))),
+            _ => Ok(outcome),
+        }
+    }
+}
+
+/// 流式下载到 `dest`（断点续传 + 原子改名）
+pub async fn download_to(url: &str, dest: &Path, options: &DownloadOptions) -> Result<DownloadOutcome> {
+    if let Some(parent) = dest.parent().filter(|p| !p.as_os_str().is_empty()) {
+        fs::create_dir_all(parent)
+            .await
+            .map_err(|e| anyhow!("Failed to create directory: {}", e))?;
+    }
+
+    let part = part_path(dest);
+    let meta = meta_path(dest);
+    let mut offset = fs::metadata(&part).await.map(|m| m.len()).unwrap_or(0);
+
+    // 分段下载：有未完成的分段进度时继续分段；单连接留下的 `.part` 仍按单连接续传
+    let connections = options
+        .connections
+        .unwrap_or_else(|| env_u64("XHS_DOWNLOAD_CONNECTIONS", DEFAULT_CONNECTIONS as u64) as usize)
+        .min(host_limit(&host_of(url)))
+        .max(1);
+    let segment_state = segmented::state_path(dest);
+    let resuming_segments = fs::try_exists(&segment_state).await.unwrap_or(false);
+    let large_enough = options
+        .expected_size
+        .map_or(true, |size| size >= 2 * segmented::segment_size());
+    if resuming_segments {
+        if let Some(info) = segmented::probe(url).await {
+            return segmented::download(url, dest, info, connections, options).await;
+        }
+        tracing::warn!("[MediaDownload] {} no longer supports ranges, restarting", url);
+        let _ = fs::remove_file(&segment_state).await;
+        let _ = fs::remove_file(&part).await;
+        offset = 0;
+    }
+    // 只续传确认来自同一 URL、且有校验值可供 If-Range 的 `.part`
+    let mut validator = None;
+    if offset > 0 {
+        match load_meta(&meta).await {
+            Some(previous) if previous.url == url && previous.validator.is_some() => {
+                validator = previous.validator;
+            }
+            _ => {
+                tracing::warn!("[MediaDownload] {:?} cannot be verified against {}, restarting", part, url);
+                let _ = fs::remove_file(&part).await;
+                offset = 0;
+            }
+        }
+    }
+    let resumed_from = offset;
+    if offset > 0 {
+        tracing::info!("[MediaDownload] Resuming {} from byte {}", url, offset);
+    }
+    // 新下载是否值得分段由第一个响应决定（见 `Transfer::fetch`）
+    let split_threshold = (connections > 1 && offset == 0 && large_enough).then(|| 2 * segmented::segment_size());
+
+    let started = Instant::now();
+    let mut transfer = Transfer {
+        url,
+        options,
+        part,
+        meta,
+        validator,
+        offset,
+        total: options.expected_size,
+        expected: options.expected_size,
+        content_type: None,
+        split_threshold,
+        split: None,
+    };
+    let retries = retries();
+    let chunk_timeout = chunk_timeout();
+
+    let mut attempt = 0;
+    loop {
+        match transfer.fetch(chunk_timeout).await? {
+            Attempt::Complete => break,
+            Attempt::Interrupted(e) if attempt < retries => {
+                attempt += 1;
+                let backoff = backoff(attempt);
+                tracing::warn!(
+                    "[MediaDownload] {} interrupted at byte {} ({}), retry {}/{} in {:?}",
+                    url, transfer.offset, e, attempt, retries, backoff
+                );
+                tokio::time::sleep(backoff).await;
+            }
+            Attempt::Interrupted(e) => {
+                return Err(anyhow!("Download interrupted after {} retries: {}", retries, e));
+            }
+        }
+    }
+
+    if let Some(info) = transfer.split.take() {
+        return segmented::download(url, dest, info, connections, options).await;
+    }
+    finish(&transfer.part, dest, transfer.offset, transfer.expected).await?;
+    let _ = fs::remove_file(&transfer.meta).await;
+    hedge::record_throughput(url, transfer.offset.saturating_sub(resumed_from), started.elapsed());
+    Ok(DownloadOutcome {
+        path: dest.to_path_buf(),
+        size: transfer.offset,
+        content_type: transfer
+            .content_type
+            .unwrap_or_else(|| "application/octet-stream".to_string()),
+        resumed_from,
+    })
+}
+
+/// 校验大小，fsync 后原子改名
+pub(crate) async fn finish(part: &Path, dest: &Path, size: u64, expected: Option<u64>) -> Result<()> {
+    let actual = fs::metadata(part).await?.len();
+    if actual != size || expected.is_some_and(|e| e != actual) {
+        let _ = fs::remove_file(part).await;
+        return Err(anyhow!(
+            "Size check failed: wrote {} bytes, expected {}",
+            actual,
+            expected.unwrap_or(size)
+        ));
+    }
+    // Windows 上 FlushFileBuffers 需要写权限，只读句柄 fsync 会 ERROR_ACCESS_DENIED
+    fs::OpenOptions::new()
+        .write(true)
+        .open(part)
+        .await
+        .map_err(|e| anyhow!("Failed to open {:?} for sync: {}", part, e))?
+        .sync_all()
+        .await?;
+    fs::rename(part, dest)
+        .await
+        .map_err(|e| anyhow!("Failed to move {:?} into place: {}", part, e))?;
+    Ok(())
+}
@@ -0,0 +1,251 @@
+//! 对冲下载 (Hedged Download)
+//!
+//! 同一文件有多个 CDN 地址时（视频的 `master_url` + `backup_urls`），先从预计最快的
+//! 地址下载；该地址迟迟没有响应、或响应后速度低于阈值时，向下一个地址发起对冲
+//! 下载，取先完成的一个，其余取消并清理临时文件。某个地址失败时立即换下一个。
+//!
+//! - 所有下载（不只是对冲下载）都记录 CDN 主机的首字节延迟与吞吐（EWMA）以及
+//!   连续失败次数；候选地址按「首字节延迟 + 取 1 MiB 的预计耗时 + 失败惩罚」排序，
+//!   评分最好的作为主地址
+//! - 每个候选写入各自的临时路径（`<目标>.<url 哈希>`），胜出者完成后改名为目标文件
+//!
+//! 环境变量：
+//! - `XHS_DOWNLOAD_HEDGE_MS`: 主地址多久没有响应就对冲（默认 1000，`0` 关闭对冲，只做失败转移）
+//! - `XHS_DOWNLOAD_HEDGE_MIN_RATE`: 响应 2 s 后平均速度仍低于该值（字节/秒）时对冲
+//!   （默认 262144，`0` 关闭）
+
+use anyhow::{Result, anyhow};
+use once_cell::sync::Lazy;
+use serde::Serialize;
+use std::collections::HashMap;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+use tokio::fs;
+
+use super::engine::{
+    download_to, env_u64, host_of, meta_path, part_path, DownloadOptions, DownloadOutcome, Progress,
+};
+use super::segmented;
+
+const DEFAULT_HEDGE_MS: u64 = 1000;
+const DEFAULT_MIN_RATE: u64 = 256 * 1024;
+
+/// 响应后至少观察多久再判断速度
+const RATE_WINDOW: Duration = Duration::from_secs(2);
+
+/// 对冲条件的检查间隔
+const CHECK_INTERVAL: Duration = Duration::from_millis(200);
+
+/// EWMA 平滑系数（新样本权重）
+const EWMA_ALPHA: f64 = 0.3;
+
+/// 没有样本的主机的评分（毫秒），既不总是优先也不总是靠后
+const UNKNOWN_SCORE_MS: f64 = 500.0;
+
+/// 每次连续失败的评分惩罚（毫秒）
+const FAILURE_PENALTY_MS: f64 = 2000.0;
+
+static HOSTS: Lazy<Mutex<HashMap<String, HostStats>>> = Lazy::new(|| Mutex::new(HashMap::new()));
+static HEDGED: AtomicU64 = AtomicU64::new(0);
+static HEDGE_WINS: AtomicU64 = AtomicU64::new(0);
+
+/// 单个 CDN 主机的统计
+#[derive(Debug, Clone, Default, Serialize)]
+pub struct HostStats {
+    pub host: String,
+    /// 成功响应次数
+    pub responses: u64,
+    /// 首字节延迟 EWMA（毫秒）
+    pub ttfb_ms: f64,
+    /// 吞吐 EWMA（字节/秒，0 表示尚无样本）
+    pub throughput: f64,
+    pub failures: u64,
+    pub consecutive_failures: u32,
+}
+
+impl HostStats {
+    /// 评分：越小越好（毫秒）
+    fn score(&self) -> f64 {
+        let mut score = if self.responses == 0 { UNKNOWN_SCORE_MS } else { self.ttfb_ms };
+        if self.throughput > 0.0 {
+            score += 1024.0 * 1024.0 / self.throughput * 1000.0;
+        }
+        score + self.consecutive_failures as f64 * FAILURE_PENALTY_MS
+    }
+}
+
+fn ewma(current: f64, sample: f64, first: bool) -> f64 {
+    if first { sample } else { current + EWMA_ALPHA * (sample - current) }
+}
+
+fn with_host(url: &str, update: impl FnOnce(&mut HostStats)) {
+    let host = host_of(url);
+    let mut hosts = HOSTS.lock().unwrap();
+    let stats = hosts.entry(host.clone()).or_insert_with(|| HostStats { host, ..Default::default() });
+    update(stats);
+}
+
+/// 记录一次成功响应的首字节延迟
+pub fn record_response(url: &str, ttfb: Duration) {
+    with_host(url, |stats| {
+        stats.ttfb_ms = ewma(stats.ttfb_ms, ttfb.as_secs_f64() * 1000.0, stats.responses == 0);
+        stats.responses += 1;
+        stats.consecutive_failures = 0;
+    });
+}
+
+/// 记录一次连接失败或 5xx
+pub fn record_failure(url: &str) {
+    with_host(url, |stats| {
+        stats.failures += 1;
+        stats.consecutive_failures += 1;
+    });
+}
+
+/// 记录一次完成的传输的吞吐（太小的文件不计，主要反映延迟）
+pub fn record_throughput(url: &str, bytes: u64, elapsed: Duration) {
+    if bytes < 256 * 1024 || elapsed.is_zero() {
+        return;
+    }
+    let rate = bytes as f64 / elapsed.as_secs_f64();
+    with_host(url, |stats| stats.throughput = ewma(stats.throughput, rate, stats.throughput == 0.0));
+}
+
+/// 所有 CDN 主机的统计快照
+pub fn host_stats() -> Vec<HostStats> {
+    let mut stats: Vec<HostStats> = HOSTS.lock().unwrap().values().cloned().collect();
+    stats.sort_by(|a, b| a.host.cmp(&b.host));
+    stats
+}
+
+/// (对冲次数, 对冲胜出次数)
+pub fn hedge_counts() -> (u64, u64) {
+    (HEDGED.load(Ordering::Relaxed), HEDGE_WINS.load(Ordering::Relaxed))
+}
+
+/// 候选地址去重后按主机评分排序（评分相同保持原顺序）
+pub fn rank(urls: &[String]) -> Vec<String> {
+    let mut candidates: Vec<String> = Vec::with_capacity(urls.len());
+    for url in urls.iter().filter(|url| !url.is_empty()) {
+        if !candidates.contains(url) {
+            candidates.push(url.clone());
+        }
+    }
+    let scores: HashMap<String, f64> = {
+        let hosts = HOSTS.lock().unwrap();
+        candidates
+            .iter()
+            .map(|url| {
+                let score = hosts.get(&host_of(url)).map_or(UNKNOWN_SCORE_MS, HostStats::score);
+                (url.clone(), score)
+            })
+            .collect()
+    };
+    candidates.sort_by(|a, b| scores[a].total_cmp(&scores[b]));
+    candidates
+}
+
+/// 候选地址的临时目标路径
+fn candidate_path(dest: &Path, url: &str) -> PathBuf {
+    let mut name = dest.as_os_str().to_owned();
+    name.push(format!(".{}", &format!("{:x}", md5::compute(url))[..8]));
+    PathBuf::from(name)
+}
+
+/// 从多个等价地址下载到 `dest`（单个地址时等同于 [`download_to`]）
+pub async fn download_hedged(urls: &[String], dest: &Path, options: &DownloadOptions) -> Result<DownloadOutcome> {
+    let candidates = rank(urls);
+    match candidates.len() {
+        0 => Err(anyhow!("No download URL")),
+        1 => download_to(&candidates[0], dest, options).await,
+        _ => race(candidates, dest, options).await,
+    }
+}
+
+fn should_hedge(progress: &Progress, started: Instant, hedge_after: Duration, min_rate: u64) -> bool {
+    match progress.responded_at() {
+        None => started.elapsed() >= hedge_after,
+        Some(at) => {
+            let elapsed = at.elapsed();
+            min_rate > 0 && elapsed >= RATE_WINDOW && (progress.bytes() as f64 / elapsed.as_secs_f64()) < min_rate as f64
+        }
+    }
+}
+
+async fn race(candidates: Vec<String>, dest: &Path, options: &DownloadOptions) -> Result<DownloadOutcome> {
+    let hedge_ms = env_u64("XHS_DOWNLOAD_HEDGE_MS", DEFAULT_HEDGE_MS);
+    let hedge_after = (hedge_ms > 0).then(|| Duration::from_millis(hedge_ms));
+    let min_rate = env_u64("XHS_DOWNLOAD_HEDGE_MIN_RATE", DEFAULT_MIN_RATE);
+
+    let mut tasks = tokio::task::JoinSet::new();
+    let launch = |index: usize, tasks: &mut tokio::task::JoinSet<(usize, Result<DownloadOutcome>)>| {
+        let progress = Arc::new(Progress::default());
+        let options = DownloadOptions { progress: Some(progress.clone()), ..options.clone() };
+        let (url, path) = (candidates[index].clone(), candidate_path(dest, &candidates[index]));
+        tasks.spawn(async move { (index, download_to(&url, &path, &options).await) });
+        (progress, Instant::now())
+    };
+
+    let mut latest = launch(0, &mut tasks);
+    let mut launched = 1;
+    let mut last_error = None;
+    let mut ticker = tokio::time::interval(CHECK_INTERVAL);
+    ticker.set_missed_tick_behavior(tokio::time::MissedTickBehavior::Skip);
+
+    loop {
+        let can_hedge = launched < candidates.len();
+        tokio::select! {
+            Some(joined) = tasks.join_next() => {
+                let (index, result) = joined.map_err(|e| anyhow!("Download task failed: {}", e))?;
+                match result {
+                    Ok(outcome) => {
+                        tasks.abort_all();
+                        while tasks.join_next().await.is_some() {}
+                        if index > 0 {
+                            HEDGE_WINS.fetch_add(1, Ordering::Relaxed);
+                        }
+                        fs::rename(&outcome.path, dest)
+                            .await
+                            .map_err(|e| anyhow!("Failed to move {:?} into place: {}", outcome.path, e))?;
+                        for url in candidates[..launched].iter().filter(|url| **url != candidates[index]) {
+                            let path = candidate_path(dest, url);
+                            let _ = fs::remove_file(&path).await;
+                            let _ = fs::remove_file(part_path(&path)).await;
+                            let _ = fs::remove_file(meta_path(&path)).await;
+                            let _ = fs::remove_file(segmented::state_path(&path)).await;
+                        }
+                        return Ok(DownloadOutcome { path: dest.to_path_buf(), ..outcome });
+                    }
+                    Err(e) => {
+                        tracing::warn!("[MediaDownload] {} failed: {}", candidates[index], e);
+                        last_error = Some(e);
+                        if tasks.is_empty() {
+                            if !can_hedge {
+                                break;
+                            }
+                            // 失败转移：立即换下一个地址
+                            latest = launch(launched, &mut tasks);
+                            launched += 1;
+                        }
+                    }
+                }
+            }
+            _ = ticker.tick(), if can_hedge && hedge_after.is_some() => {
+                let (progress, started) = &latest;
+                if should_hedge(progress, *started, hedge_after.unwrap_or_default(), min_rate) {
+                    HEDGED.fetch_add(1, Ordering::Relaxed);
+                    tracing::info!(
+                        "[MediaDownload] Hedging {} with {} ({} bytes after {:?})",
+                        candidates[launched - 1], candidates[launched], progress.bytes(), started.elapsed()
+                    );
+                    latest = launch(launched, &mut tasks);
+                    launched += 1;
+                }
+            }
+            else => break,
+        }
+    }
+    Err(last_error.unwrap_or_else(|| anyhow!("All download URLs failed")))
+}
@@ -3,6 +3,7 @@
 //! Extracts image download URLs from note details
 
 use crate::api::XhsApiClient;
+use crate::api::note::card::fetch_note_feed;
 use anyhow::{Result, anyhow};
 use serde::{Deserialize, Serialize};
 use utoipa::ToSchema;
@@ -64,19 +65,8 @@ pub struct ImageItem {
 /// 从笔记详情中提取所有图片的下载 URL
 /// 返回有水印和无水印两个版本
 pub async fn get_image_urls(api: &XhsApiClient, req: ImagesRequest) -> Result<ImagesResponse> {
-    let path = "/api/sns/web/v1/feed";
-    
-    // 构造请求体
-    let payload = serde_json::json!({
-        "source_note_id": req.note_id,
-        "image_formats": ["jpg", "webp", "avif"],
-        "xsec_source": "pc_feed",
-        "xsec_token": req.xsec_token,
-        "extra": {"need_body_topic": "1"}
-    });
-    
-    let text = api.post_algo(path, payload).await?;
-    let raw: serde_json::Value = serde_json::from_str(&text)?;
+    // 与笔记详情共享同一个 feed 请求（按 note_id 缓存）
+    let raw = fetch_note_feed(api, &req.note_id, &req.xsec_token).await?;
     
     // 检查响应状态
     if raw.get("success").and_then(|v| v.as_bool()) != Some(true) {
@@ -0,0 +1,540 @@
+//! 批量下载任务 (Download Jobs)
+//!
+//! `POST /api/media/jobs` 提交一组 URL 或笔记，立即返回 job_id；任务在后台执行，
+//! 通过 `GET /api/media/jobs/:job_id` 轮询，或订阅 `GET /api/media/jobs/:job_id/events`（SSE）。
+//!
+//! - 笔记条目先解析媒体地址：视频取最高画质（带期望大小校验），图文取全部无水印原图
+//! - 内容寻址存储：文件按内容 MD5 命名，保存为 `<store>/objects/ab/<md5>.<ext>`；
+//!   `<store>/index.jsonl` 记录 URL → 内容哈希，已下载过的 URL 不再请求网络，
+//!   不同 URL 的相同内容只保存一份；同一 URL 的并发下载合并为一次
+//! - 所有任务共享全局并发上限与带宽上限；每个 CDN 主机的连接数受下载引擎的主机上限约束
+//!
+//! 环境变量：
+//! - `XHS_MEDIA_STORE_DIR`: 存储目录（默认 `./downloads/store`）
+//! - `XHS_JOB_CONCURRENCY`: 所有任务同时下载的文件数（默认 8）
+//! - `XHS_JOB_BANDWIDTH`: 所有任务的总带宽上限，字节/秒（默认 0 不限速）
+//! - `XHS_JOB_RETENTION`: 已结束任务的保留时长，秒（默认 3600）
+
+use anyhow::{Result, anyhow};
+use once_cell::sync::Lazy;
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::io::Read;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+use tokio::fs;
+use tokio::io::AsyncWriteExt;
+use tokio::sync::{watch, Semaphore};
+use utoipa::ToSchema;
+
+use super::download::is_url_allowed;
+use super::engine::{env_u64, DownloadOptions};
+use super::hedge::download_hedged;
+use super::images::{get_image_urls, ImagesRequest};
+use super::video::{get_video_urls, VideoRequest};
+use crate::api::note::card::fetch_note_feed;
+use crate::api::XhsApiClient;
+use crate::server::AppState;
+use crate::utils::{RateLimiter, TtlCache};
+
+const DEFAULT_STORE_DIR: &str = "./downloads/store";
+const DEFAULT_CONCURRENCY: u64 = 8;
+const DEFAULT_RETENTION_SECS: u64 = 3600;
+
+/// 所有任务共享的下载名额
+static SLOTS: Lazy<Arc<Semaphore>> =
+    Lazy::new(|| Arc::new(Semaphore::new(env_u64("XHS_JOB_CONCURRENCY", DEFAULT_CONCURRENCY).max(1) as usize)));
+
+/// 所有任务共享的带宽上限
+static BANDWIDTH: Lazy<Arc<RateLimiter>> = Lazy::new(|| Arc::new(RateLimiter::new(env_u64("XHS_JOB_BANDWIDTH", 0))));
+
+static STORE: Lazy<MediaStore> = Lazy::new(|| {
+    let dir = std::env::var("XHS_MEDIA_STORE_DIR")
+        .ok()
+        .filter(|dir| !dir.is_empty())
+        .unwrap_or_else(|| DEFAULT_STORE_DIR.to_string());
+    MediaStore::open(PathBuf::from(dir))
+});
+
+static JOBS: Lazy<Mutex<HashMap<String, Arc<Job>>>> = Lazy::new(|| Mutex::new(HashMap::new()));
+
+// ============================================================================
+// 请求 / 响应
+// ============================================================================
+
+/// 任务中的笔记条目
+#[derive(Debug, Clone, Deserialize, Serialize, ToSchema)]
+pub struct JobNote {
+    /// 笔记 ID
+    pub note_id: String,
+    /// xsec_token (从 feed/search 结果获取)
+    pub xsec_token: String,
+}
+
+/// 批量下载任务请求
+#[derive(Debug, Clone, Deserialize, Serialize, ToSchema)]
+pub struct JobRequest {
+    /// 媒体文件 URL 列表 (仅支持 xhscdn.com / xiaohongshu.com)
+    #[serde(default)]
+    pub urls: Vec<String>,
+    /// 笔记列表：视频笔记下载最高画质，图文笔记下载全部无水印原图
+    #[serde(default)]
+    pub notes: Vec<JobNote>,
+}
+
+/// 任务状态响应
+#[derive(Debug, Clone, Deserialize, Serialize, ToSchema)]
+pub struct JobResponse {
+    pub success: bool,
+    #[serde(default)]
+    pub msg: Option<String>,
+    #[serde(default)]
+    pub data: Option<JobStatus>,
+}
+
+/// 任务状态
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Deserialize, Serialize, ToSchema)]
+#[serde(rename_all = "lowercase")]
+pub enum JobState {
+    Running,
+    Finished,
+}
+
+/// 单个文件的状态
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Deserialize, Serialize, ToSchema)]
+#[serde(rename_all = "lowercase")]
+pub enum ItemState {
+    Pending,
+    Downloading,
+    /// 已下载并存入存储
+    Done,
+    /// 存储中已有，未请求网络
+    Cached,
+    Failed,
+}
+
+/// 任务中的单个文件
+#[derive(Debug, Clone, Deserialize, Serialize, ToSchema)]
+pub struct JobItem {
+    /// 媒体 URL（笔记解析失败时为空）
+    pub url: String,
+    /// 来源笔记 ID
+    #[serde(default)]
+    pub note_id: Option<String>,
+    pub state: ItemState,
+    /// 内容哈希 (MD5)
+    #[serde(default)]
+    pub hash: Option<String>,
+    /// 存储中的文件路径
+    #[serde(default)]
+    pub path: Option<String>,
+    /// 文件大小 (bytes)
+    #[serde(default)]
+    pub size: Option<u64>,
+    #[serde(default)]
+    pub error: Option<String>,
+}
+
+/// 任务进度
+#[derive(Debug, Clone, Deserialize, Serialize, ToSchema)]
+pub struct JobStatus {
+    pub job_id: String,
+    pub state: JobState,
+    /// 文件总数（笔记解析后增加）
+    pub total: usize,
+    pub done: usize,
+    pub cached: usize,
+    pub failed: usize,
+    /// 本任务实际下载的字节数
+    pub downloaded_bytes: u64,
+    pub items: Vec<JobItem>,
+}
+
+impl JobStatus {
+    fn recount(&mut self) {
+        let count = |state| self.items.iter().filter(|item| item.state == state).count();
+        self.total = self.items.len();
+        self.done = count(ItemState::Done);
+        self.cached = count(ItemState::Cached);
+        self.failed = count(ItemState::Failed);
+        self.downloaded_bytes = self
+            .items
+            .iter()
+            .filter(|item| item.state == ItemState::Done)
+            .filter_map(|item| item.size)
+            .sum();
+    }
+}
+
+// ============================================================================
+// 任务
+// ============================================================================
+
+struct Job {
+    status: watch::Sender<JobStatus>,
+    finished_at: Mutex<Option<Instant>>,
+}
+
+impl Job {
+    fn update(&self, change: impl FnOnce(&mut JobStatus)) {
+        self.status.send_modify(|status| {
+            change(status);
+            status.recount();
+        });
+    }
+
+    /// 追加一个文件，返回其序号
+    fn push(&self, item: JobItem) -> usize {
+        let mut index = 0;
+        self.update(|status| {
+            index = status.items.len();
+            status.items.push(item);
+        });
+        index
+    }
+}
+
+fn pending(url: String, note_id: Option<String>) -> JobItem {
+    let allowed = is_url_allowed(&url);
+    JobItem {
+        url,
+        note_id,
+        state: if allowed { ItemState::Pending } else { ItemState::Failed },
+        hash: None,
+        path: None,
+        size: None,
+        error: (!allowed).then(|| "URL domain not in whitelist".to_string()),
+    }
+}
+
+/// 提交任务（后台执行），返回初始状态
+pub fn submit(state: Arc<AppState>, req: JobRequest) -> Result<JobStatus> {
+    if req.urls.is_empty() && req.notes.is_empty() {
+        return Err(anyhow!("Either urls or notes is required"));
+    }
+
+    let retention = Duration::from_secs(env_u64("XHS_JOB_RETENTION", DEFAULT_RETENTION_SECS));
+    let job_id = uuid::Uuid::new_v4().simple().to_string();
+    let mut status = JobStatus {
+        job_id: job_id.clone(),
+        state: JobState::Running,
+        total: 0,
+        done: 0,
+        cached: 0,
+        failed: 0,
+        downloaded_bytes: 0,
+        items: req.urls.into_iter().map(|url| pending(url, None)).collect(),
+    };
+    status.recount();
+
+    let job = Arc::new(Job {
+        status: watch::channel(status.clone()).0,
+        finished_at: Mutex::new(None),
+    });
+    {
+        let mut jobs = JOBS.lock().unwrap();
+        jobs.retain(|_, job| job.finished_at.lock().unwrap().map_or(true, |at| at.elapsed() < retention));
+        jobs.insert(job_id.clone(), job.clone());
+    }
+
+    tracing::info!(
+        "[MediaJobs] Job {} submitted: {} urls, {} notes",
+        job_id, status.total, req.notes.len()
+    );
+    tokio::spawn(run(state, job, req.notes));
+    Ok(status)
+}
+
+/// 当前任务状态
+pub fn status(job_id: &str) -> Option<JobStatus> {
+    let job = JOBS.lock().unwrap().get(job_id).cloned()?;
+    let status = job.status.borrow().clone();
+    Some(status)
+}
+
+/// 订阅任务进度
+pub fn subscribe(job_id: &str) -> Option<watch::Receiver<JobStatus>> {
+    JOBS.lock().unwrap().get(job_id).map(|job| job.status.subscribe())
+}
+
+async fn run(state: Arc<AppState>, job: Arc<Job>, notes: Vec<JobNote>) {
+    let mut tasks = tokio::task::JoinSet::new();
+    let queued: Vec<(usize, String)> = job
+        .status
+        .borrow()
+        .items
+        .iter()
+        .enumerate()
+        .filter(|(_, item)| item.state == ItemState::Pending)
+        .map(|(index, item)| (index, item.url.clone()))
+        .collect();
+    for (index, url) in queued {
+        tasks.spawn(process(job.clone(), index, Media { url, backup_urls: Vec::new(), expected_size: None }));
+    }
+
+    // 笔记逐个解析（feed 请求需要签名），解析出的文件立即开始下载
+    for note in notes {
+        match resolve_note(&state.api, &note).await {
+            Ok(media) => {
+                for media in media {
+                    let item = pending(media.url.clone(), Some(note.note_id.clone()));
+                    let queue = item.state == ItemState::Pending;
+                    let index = job.push(item);
+                    if queue {
+                        tasks.spawn(process(job.clone(), index, media));
+                    }
+                }
+            }
+            Err(e) => {
+                tracing::warn!("[MediaJobs] Failed to resolve note {}: {}", note.note_id, e);
+                job.push(JobItem {
+                    url: String::new(),
+                    note_id: Some(note.note_id),
+                    state: ItemState::Failed,
+                    hash: None,
+                    path: None,
+                    size: None,
+                    error: Some(e.to_string()),
+                });
+            }
+        }
+    }
+
+    while tasks.join_next().await.is_some() {}
+    *job.finished_at.lock().unwrap() = Some(Instant::now());
+    job.update(|status| status.state = JobState::Finished);
+    let status = job.status.borrow().clone();
+    tracing::info!(
+        "[MediaJobs] Job {} finished: {} done, {} cached, {} failed, {} bytes downloaded",
+        status.job_id, status.done, status.cached, status.failed, status.downloaded_bytes
+    );
+}
+
+/// 待下载的文件
+struct Media {
+    url: String,
+    /// 同一文件的备用 CDN 地址（对冲下载）
+    backup_urls: Vec<String>,
+    expected_size: Option<u64>,
+}
+
+/// 解析笔记中的媒体地址
+async fn resolve_note(api: &XhsApiClient, note: &JobNote) -> Result<Vec<Media>> {
+    // 与 video / images 共享同一个缓存的 feed 请求
+    let raw = fetch_note_feed(api, &note.note_id, &note.xsec_token).await?;
+    let is_video = raw.pointer("/data/items/0/note_card/type").and_then(|v| v.as_str()) == Some("video");
+
+    if is_video {
+        let res = get_video_urls(api, VideoRequest { note_id: note.note_id.clone(), xsec_token: note.xsec_token.clone(), probe: false }).await?;
+        let data = res.data.ok_or_else(|| anyhow!(res.msg.unwrap_or_else(|| "Unknown error".to_string())))?;
+        // 按大小降序，第一个即最高画质
+        let best = data.videos.into_iter().next().ok_or_else(|| anyhow!("No video streams found"))?;
+        Ok(vec![Media {
+            url: best.url,
+            backup_urls: best.backup_url.into_iter().filter(|url| is_url_allowed(url)).collect(),
+            expected_size: u64::try_from(best.size).ok().filter(|&size| size > 0),
+        }])
+    } else {
+        let res = get_image_urls(api, ImagesRequest { note_id: note.note_id.clone(), xsec_token: note.xsec_token.clone() }).await?;
+        let data = res.data.ok_or_else(|| anyhow!(res.msg.unwrap_or_else(|| "Unknown error".to_string())))?;
+        // 有水印 / 无水印是不同内容，不作为备用地址
+        Ok(data
+            .images
+            .into_iter()
+            .map(|image| Media { url: image.url_original, backup_urls: Vec::new(), expected_size: None })
+            .collect())
+    }
+}
+
+async fn process(job: Arc<Job>, index: usize, media: Media) {
+    let url = &media.url;
+    // 存储中已有的 URL 不占用下载名额
+    let result = match STORE.lookup(url).await {
+        Some(object) => Ok((object, true)),
+        None => {
+            let _slot = SLOTS.clone().acquire_owned().await.expect("job semaphore closed");
+            job.update(|status| status.items[index].state = ItemState::Downloading);
+            STORE.fetch(&media).await
+        }
+    };
+
+    job.update(|status| {
+        let item = &mut status.items[index];
+        match result {
+            Ok((object, cached)) => {
+                item.state = if cached { ItemState::Cached } else { ItemState::Done };
+                item.path = Some(STORE.dir.join(&object.path).to_string_lossy().into_owned());
+                item.hash = Some(object.hash);
+                item.size = Some(object.size);
+            }
+            Err(e) => {
+                tracing::warn!("[MediaJobs] Failed to download {}: {}", url, e);
+                item.state = ItemState::Failed;
+                item.error = Some(e.to_string());
+            }
+        }
+    });
+}
+
+// ============================================================================
+// 内容寻址存储
+// ============================================================================
+
+/// 索引中的一条记录（`index.jsonl` 的一行）
+#[derive(Debug, Clone, Serialize, Deserialize)]
+struct StoredObject {
+    key: String,
+    hash: String,
+    size: u64,
+    content_type: String,
+    /// 相对存储目录的路径
+    path: String,
+}
+
+struct MediaStore {
+    dir: PathBuf,
+    /// URL 键 → 对象
+    index: Mutex<HashMap<String, StoredObject>>,
+    /// 同一 URL 的并发下载只执行一次（不缓存结果，结果在索引里）
+    flights: TtlCache<String, (StoredObject, bool)>,
+    /// 串行追加 `index.jsonl`
+    writer: tokio::sync::Mutex<()>,
+}
+
+/// 索引键：去掉协议与查询参数（同一 CDN 对象的 http/https 与签名参数不同）
+fn url_key(url: &str) -> String {
+    match reqwest::Url::parse(url) {
+        Ok(parsed) => format!("{}{}", parsed.host_str().unwrap_or_default(), parsed.path()),
+        Err(_) => url.to_string(),
+    }
+}
+
+/// 存储文件的扩展名：优先取 URL 路径，其次按 Content-Type
+fn extension(url: &str, content_type: &str) -> &'static str {
+    let path = reqwest::Url::parse(url).map(|u| u.path().to_ascii_lowercase()).unwrap_or_default();
+    let from_path = [".mp4", ".mov", ".jpg", ".jpeg", ".png", ".webp", ".gif", ".heic", ".avif"]
+        .into_iter()
+        .find(|ext| path.ends_with(ext));
+    from_path.unwrap_or(match content_type.split(';').next().unwrap_or("").trim() {
+        "video/mp4" => ".mp4",
+        "video/quicktime" => ".mov",
+        "image/jpeg" => ".jpg",
+        "image/png" => ".png",
+        "image/webp" => ".webp",
+        "image/gif" => ".gif",
+        "image/heic" => ".heic",
+        "image/avif" => ".avif",
+        _ => "",
+    })
+}
+
+/// 分块计算文件 MD5
+async fn hash_file(path: &Path) -> Result<String> {
+    let path = path.to_path_buf();
+    tokio::task::spawn_blocking(move || -> Result<String> {
+        let mut file = std::fs::File::open(&path)?;
+        let mut context = md5::Context::new();
+        let mut buffer = vec![0u8; 1024 * 1024];
+        loop {
+            let read = file.read(&mut buffer)?;
+            if read == 0 {
+                break;
+            }
+            context.consume(&buffer[..read]);
+        }
+        Ok(format!("{:x}", context.compute()))
+    })
+    .await?
+}
+
+impl MediaStore {
+    fn open(dir: PathBuf) -> Self {
+        let mut index = HashMap::new();
+        if let Ok(text) = std::fs::read_to_string(dir.join("index.jsonl")) {
+            for object in text.lines().filter_map(|line| serde_json::from_str::<StoredObject>(line).ok()) {
+                index.insert(object.key.clone(), object);
+            }
+        }
+        tracing::info!("[MediaJobs] Media store {:?}: {} indexed urls", dir, index.len());
+        Self {
+            dir,
+            index: Mutex::new(index),
+            flights: TtlCache::new(0, Duration::ZERO),
+            writer: tokio::sync::Mutex::new(()),
+        }
+    }
+
+    /// 索引中已有且文件完好的对象
+    async fn lookup(&self, url: &str) -> Option<StoredObject> {
+        let object = self.index.lock().unwrap().get(&url_key(url)).cloned()?;
+        let size = fs::metadata(self.dir.join(&object.path)).await.ok()?.len();
+        (size == object.size).then_some(object)
+    }
+
+    /// 下载并存入存储；返回 (对象, 是否来自存储)
+    async fn fetch(&self, media: &Media) -> Result<(StoredObject, bool)> {
+        let url = media.url.as_str();
+        let key = url_key(url);
+        let ((object, cached), shared) = self
+            .flights
+            .get_or_try_insert_with(key.clone(), move || async move {
+                // 等待名额期间可能已被其他任务下载
+                if let Some(object) = self.lookup(url).await {
+                    return Ok((object, true));
+                }
+                // 临时文件按 URL 命名，中断后再次提交可续传
+                let tmp = self.dir.join("tmp").join(format!("{:x}", md5::compute(&key)));
+                let options = DownloadOptions {
+                    expected_size: media.expected_size,
+                    bandwidth: Some(BANDWIDTH.clone()),
+                    ..Default::default()
+                };
+                let mut urls = vec![media.url.clone()];
+                urls.extend(media.backup_urls.iter().cloned());
+                let outcome = download_hedged(&urls, &tmp, &options).await?;
+                let hash = hash_file(&tmp).await?;
+                let path = format!("objects/{}/{}{}", &hash[..2], hash, extension(url, &outcome.content_type));
+                let target = self.dir.join(&path);
+
+                // 相同内容已存在（来自其他 URL）时只保留一份
+                if fs::metadata(&target).await.is_ok_and(|m| m.len() == outcome.size) {
+                    fs::remove_file(&tmp).await?;
+                } else {
+                    if let Some(parent) = target.parent() {
+                        fs::create_dir_all(parent).await?;
+                    }
+                    fs::rename(&tmp, &target).await?;
+                }
+
+                let object = StoredObject {
+                    key,
+                    hash,
+                    size: outcome.size,
+                    content_type: outcome.content_type,
+                    path,
+                };
+                self.record(&object).await?;
+                Ok((object, false))
+            })
+            .await?;
+        // 等待同一 URL 的其他下载完成的，也算来自存储
+        Ok((object, cached || shared))
+    }
+
+    async fn record(&self, object: &StoredObject) -> Result<()> {
+        let mut line = serde_json::to_vec(object)?;
+        line.push(b'\n');
+        {
+            let _guard = self.writer.lock().await;
+            let mut file = fs::OpenOptions::new()
+                .create(true)
+                .append(true)
+                .open(self.dir.join("index.jsonl"))
+                .await?;
+            file.write_all(&line).await?;
+        }
+        self.index.lock().unwrap().insert(object.key.clone(), object.clone());
+        Ok(())
+    }
+}
@@ -5,6 +5,11 @@
 pub mod video;
 pub mod images;
 pub mod download;
+pub mod engine;
+pub mod segmented;
+pub mod hedge;
+pub mod probe;
+pub mod jobs;
 
 pub use video::*;
 pub use images::*;
@@ -0,0 +1,601 @@
+//! 视频元数据探测 (MP4 Probe)
+//!
+//! 不下载整个视频，只用 `Range` 请求读取 MP4 的 `moov` box，解析时长、分辨率、编码与码率：
+//!
+//! 1. 读取文件开头 `XHS_PROBE_HEAD_BYTES`（默认 64 KiB），逐个遍历顶层 box
+//! 2. `moov` 在开头（faststart）时通常一次请求就够；在 `mdat` 之后（文件末尾）时，
+//!    按 box 大小跳过 `mdat`，再请求 `moov` 所在区间
+//! 3. 解析 `mvhd`（时长）、各 `trak` 的 `tkhd` / `mdhd` / `hdlr` / `stsd` / `stsz`
+//!    （分辨率、编码、采样率、帧数与各轨道字节数 → 码率）
+//!
+//! 每个视频通常只读取几十 KiB。`moov` 超过 `XHS_PROBE_MAX_MOOV`（默认 8 MiB）时放弃。
+
+use anyhow::{Result, anyhow};
+use reqwest::header::{HeaderName, CONTENT_LENGTH, CONTENT_RANGE, RANGE};
+use reqwest::StatusCode;
+use serde::{Deserialize, Serialize};
+use std::time::Instant;
+use utoipa::ToSchema;
+
+use super::engine::{cdn_get, chunk_timeout, env_u64, host_permit, parse_content_range};
+use super::hedge;
+use super::video::VideoItem;
+
+const DEFAULT_HEAD_BYTES: u64 = 64 * 1024;
+const DEFAULT_MAX_MOOV: u64 = 8 * 1024 * 1024;
+
+/// 最多遍历的顶层 box 数
+const MAX_TOP_LEVEL_BOXES: usize = 64;
+
+/// 探测结果
+#[derive(Debug, Clone, Default, Deserialize, Serialize, ToSchema)]
+pub struct VideoProbe {
+    /// 时长 (ms)
+    pub duration_ms: u64,
+    /// 视频宽度
+    pub width: u32,
+    /// 视频高度
+    pub height: u32,
+    /// 视频编码 (如 avc1.640028、hvc1)
+    #[serde(default)]
+    pub video_codec: Option<String>,
+    /// 帧率
+    #[serde(default)]
+    pub frame_rate: Option<f64>,
+    /// 视频码率 (bps)
+    #[serde(default)]
+    pub video_bitrate: Option<u64>,
+    /// 音频编码 (如 mp4a)
+    #[serde(default)]
+    pub audio_codec: Option<String>,
+    /// 音频采样率 (Hz)
+    #[serde(default)]
+    pub audio_sample_rate: Option<u32>,
+    /// 音频码率 (bps)
+    #[serde(default)]
+    pub audio_bitrate: Option<u64>,
+    /// 总码率 (bps，文件大小 / 时长)
+    pub bitrate: u64,
+    /// 文件大小 (bytes)
+    pub file_size: u64,
+    /// moov 位置: start (faststart) / end
+    pub moov_at: String,
+    /// 探测实际读取的字节数
+    pub bytes_fetched: u64,
+}
+
+// ============================================================================
+// 区间读取
+// ============================================================================
+
+struct Fetcher<'a> {
+    url: &'a str,
+    /// 文件总长（首个响应得到）
+    total: Option<u64>,
+    fetched: u64,
+}
+
+impl Fetcher<'_> {
+    /// 读取 `[start, start + len)`，服务端忽略 Range 时只读取需要的前缀
+    async fn read(&mut self, start: u64, len: u64) -> Result<Vec<u8>> {
+        if len == 0 {
+            return Ok(Vec::new());
+        }
+        let end = start + len - 1;
+        let _permit = host_permit(self.url).await;
+        let started = Instant::now();
+        let mut response = cdn_get(self.url)
+            .header(RANGE, format!("bytes={}-{}", start, end))
+            .send()
+            .await
+            .inspect_err(|_| hedge::record_failure(self.url))?;
+        let status = response.status();
+        if status.is_server_error() {
+            hedge::record_failure(self.url);
+        }
+        let header = |name: HeaderName| response.headers().get(name).and_then(|v| v.to_str().ok());
+        match status {
+            StatusCode::PARTIAL_CONTENT => {
+                let (range_start, total) = header(CONTENT_RANGE).map(parse_content_range).unwrap_or_default();
+                if range_start != Some(start) {
+                    return Err(anyhow!("Unexpected Content-Range for bytes {}-{}", start, end));
+                }
+                self.total = self.total.or(total);
+            }
+            StatusCode::OK if start == 0 => {
+                self.total = self.total.or(header(CONTENT_LENGTH).and_then(|v| v.parse().ok()));
+            }
+            StatusCode::RANGE_NOT_SATISFIABLE => return Err(anyhow!("Byte {} is beyond the end of the file", start)),
+            _ => return Err(anyhow!("Probe request failed with status: {}", status)),
+        }
+        hedge::record_response(self.url, started.elapsed());
+
+        let mut body = Vec::with_capacity(len as usize);
+        while (body.len() as u64) < len {
+            match tokio::time::timeout(chunk_timeout(), response.chunk()).await {
+                Ok(Ok(Some(bytes))) => body.extend_from_slice(&bytes),
+                Ok(Ok(None)) => break,
+                Ok(Err(e)) => return Err(e.into()),
+                Err(_) => return Err(anyhow!("Probe read timed out")),
+            }
+        }
+        body.truncate(len as usize);
+        self.fetched += body.len() as u64;
+        Ok(body)
+    }
+}
+
+// ============================================================================
+// Box 解析
+// ============================================================================
+
+fn be_u16(buf: &[u8], at: usize) -> Option<u16> {
+    Some(u16::from_be_bytes(buf.get(at..at + 2)?.try_into().ok()?))
+}
+
+fn be_u32(buf: &[u8], at: usize) -> Option<u32> {
+    Some(u32::from_be_bytes(buf.get(at..at + 4)?.try_into().ok()?))
+}
+
+fn be_u64(buf: &[u8], at: usize) -> Option<u64> {
+    Some(u64::from_be_bytes(buf.get(at..at + 8)?.try_into().ok()?))
+}
+
+/// box 头：(类型, 头长度, box 总长；0 表示延伸到文件末尾)
+fn box_header(buf: &[u8]) -> Option<([u8; 4], usize, u64)> {
+    let size = be_u32(buf, 0)?;
+    let kind: [u8; 4] = buf.get(4..8)?.try_into().ok()?;
+    match size {
+        1 => Some((kind, 16, be_u64(buf, 8)?)),
+        0 => Some((kind, 8, 0)),
+        size if size >= 8 => Some((kind, 8, size as u64)),
+        _ => None,
+    }
+}
+
+/// 容器内的子 box：(类型, 内容)
+fn children<'a>(buf: &'a [u8]) -> impl Iterator<Item = ([u8; 4], &'a [u8])> + 'a {
+    let mut offset = 0usize;
+    std::iter::from_fn(move || {
+        let (kind, header_len, size) = box_header(buf.get(offset..)?)?;
+        let end = if size == 0 { buf.len() } else { offset.checked_add(size as usize)?.min(buf.len()) };
+        let body = buf.get(offset + header_len..end)?;
+        offset = end;
+        Some((kind, body))
+    })
+}
+
+fn child<'a>(buf: &'a [u8], kind: &[u8; 4]) -> Option<&'a [u8]> {
+    children(buf).find(|(k, _)| k == kind).map(|(_, body)| body)
+}
+
+fn descend<'a>(buf: &'a [u8], path: &[&[u8; 4]]) -> Option<&'a [u8]> {
+    path.iter().try_fold(buf, |current, kind| child(current, kind))
+}
+
+/// `mvhd` / `mdhd`：(timescale, duration)
+fn time_info(body: &[u8]) -> Option<(u32, u64)> {
+    match body.first()? {
+        1 => Some((be_u32(body, 20)?, be_u64(body, 24)?)),
+        _ => Some((be_u32(body, 12)?, be_u32(body, 16)? as u64)),
+    }
+}
+
+fn fourcc(kind: &[u8]) -> String {
+    String::from_utf8_lossy(kind).trim().to_string()
+}
+
+/// 单个轨道
+#[derive(Default)]
+struct Track {
+    handler: [u8; 4],
+    seconds: f64,
+    width: u32,
+    height: u32,
+    codec: Option<String>,
+    sample_rate: Option<u32>,
+    samples: u64,
+    bytes: u64,
+}
+
+fn parse_track(trak: &[u8]) -> Option<Track> {
+    let mdia = child(trak, b"mdia")?;
+    let mut track = Track {
+        handler: child(mdia, b"hdlr")?.get(8..12)?.try_into().ok()?,
+        ..Default::default()
+    };
+    if let Some((timescale, duration)) = child(mdia, b"mdhd").and_then(time_info).filter(|(ts, _)| *ts > 0) {
+        track.seconds = duration as f64 / timescale as f64;
+    }
+    // tkhd 末尾 8 字节为 16.16 定点宽高
+    if let Some(tkhd) = child(trak, b"tkhd").filter(|b| b.len() >= 8) {
+        track.width = be_u32(tkhd, tkhd.len() - 8)? >> 16;
+        track.height = be_u32(tkhd, tkhd.len() - 4)? >> 16;
+    }
+
+    let stbl = descend(mdia, &[b"minf", b"stbl"])?;
+    // stsd: version/flags(4) + entry_count(4) + 第一个 sample entry
+    if let Some((format, entry)) = child(stbl, b"stsd").and_then(|stsd| children(stsd.get(8..)?).next()) {
+        let mut codec = fourcc(&format);
+        match &track.handler {
+            b"vide" => {
+                // VisualSampleEntry: 宽高在内容偏移 24，子 box（avcC / hvcC）从 78 开始
+                if track.width == 0 {
+                    track.width = be_u16(entry, 24).unwrap_or(0) as u32;
+                    track.height = be_u16(entry, 26).unwrap_or(0) as u32;
+                }
+                if let Some(avcc) = entry.get(78..).and_then(|boxes| child(boxes, b"avcC")) {
+                    if let Some(profile) = avcc.get(1..4) {
+                        codec = format!("{}.{:02x}{:02x}{:02x}", codec, profile[0], profile[1], profile[2]);
+                    }
+                }
+            }
+            b"soun" => {
+                // AudioSampleEntry: 采样率为偏移 24 处的 16.16 定点数
+                track.sample_rate = be_u32(entry, 24).map(|rate| rate >> 16).filter(|&rate| rate > 0);
+            }
+            _ => {}
+        }
+        track.codec = Some(codec);
+    }
+
+    // stsz: version/flags(4) + sample_size(4) + sample_count(4) + [entry_size...]
+    if let Some(stsz) = child(stbl, b"stsz") {
+        let sample_size = be_u32(stsz, 4).unwrap_or(0) as u64;
+        track.samples = be_u32(stsz, 8).unwrap_or(0) as u64;
+        track.bytes = if sample_size > 0 {
+            sample_size * track.samples
+        } else {
+            (0..track.samples as usize)
+                .map_while(|i| be_u32(stsz, 12 + i * 4))
+                .map(u64::from)
+                .sum()
+        };
+    }
+    Some(track)
+}
+
+fn parse_moov(moov: &[u8], file_size: u64) -> Result<VideoProbe> {
+    let (timescale, duration) = child(moov, b"mvhd")
+        .and_then(time_info)
+        .filter(|(timescale, _)| *timescale > 0)
+        .ok_or_else(|| anyhow!("moov has no valid mvhd"))?;
+    let seconds = duration as f64 / timescale as f64;
+
+    let mut probe = VideoProbe {
+        duration_ms: (seconds * 1000.0).round() as u64,
+        file_size,
+        bitrate: if seconds > 0.0 { (file_size as f64 * 8.0 / seconds) as u64 } else { 0 },
+        ..Default::default()
+    };
+    let bitrate = |track: &Track| (track.seconds > 0.0 && track.bytes > 0).then(|| (track.bytes as f64 * 8.0 / track.seconds) as u64);
+
+    for track in children(moov).filter(|(kind, _)| kind == b"trak").filter_map(|(_, trak)| parse_track(trak)) {
+        match &track.handler {
+            b"vide" if probe.video_codec.is_none() => {
+                probe.width = track.width;
+                probe.height = track.height;
+                probe.frame_rate = (track.seconds > 0.0 && track.samples > 0)
+                    .then(|| (track.samples as f64 / track.seconds * 100.0).round() / 100.0);
+                probe.video_bitrate = bitrate(&track);
+                probe.video_codec = track.codec;
+            }
+            b"soun" if probe.audio_codec.is_none() => {
+                probe.audio_sample_rate = track.sample_rate;
+                probe.audio_bitrate = bitrate(&track);
+                probe.audio_codec = track.codec;
+            }
+            _ => {}
+        }
+    }
+    Ok(probe)
+}
+
+// ============================================================================
+// 顶层遍历
+// ============================================================================
+
+/// 顶层 box 遍历状态：只依赖各 box 头，与读取方式无关
+struct TopLevelWalk {
+    /// 下一个 box 的起始位置
+    offset: u64,
+    /// 文件总长
+    total: u64,
+    /// 是否已跳过 `mdat`（moov 在其后即为 end）
+    seen_mdat: bool,
+}
+
+impl TopLevelWalk {
+    fn new(total: u64) -> Self {
+        Self { offset: 0, total, seen_mdat: false }
+    }
+
+    /// 下一个 box 头的位置；剩余不足一个 box 头时为 None
+    fn next_offset(&self) -> Option<u64> {
+        (self.offset.checked_add(8)? <= self.total).then_some(self.offset)
+    }
+
+    /// 处理当前位置的 box 头：是 `moov` 时返回其内容区间 `[start, end)`，否则跳过该 box
+    fn step(&mut self, header: &[u8]) -> Result<Option<(u64, u64)>> {
+        let offset = self.offset;
+        let (kind, header_len, size) = box_header(header).ok_or_else(|| anyhow!("Invalid MP4 box at byte {}", offset))?;
+        let size = if size == 0 { self.total - offset } else { size };
+        let end = offset
+            .checked_add(size)
+            .filter(|_| size >= header_len as u64)
+            .ok_or_else(|| anyhow!("Invalid MP4 box size {} at byte {}", size, offset))?;
+
+        if &kind == b"moov" {
+            return Ok(Some((offset + header_len as u64, end)));
+        }
+        self.seen_mdat |= &kind == b"mdat";
+        self.offset = end;
+        Ok(None)
+    }
+}
+
+// ============================================================================
+// 探测入口
+// ============================================================================
+
+/// 探测 MP4 文件的 `moov` 元数据
+pub async fn probe_mp4(url: &str) -> Result<VideoProbe> {
+    let head_bytes = env_u64("XHS_PROBE_HEAD_BYTES", DEFAULT_HEAD_BYTES).max(1024);
+    let max_moov = env_u64("XHS_PROBE_MAX_MOOV", DEFAULT_MAX_MOOV);
+
+    let mut fetcher = Fetcher { url, total: None, fetched: 0 };
+    let head = fetcher.read(0, head_bytes).await?;
+    let total = fetcher.total.unwrap_or(head.len() as u64);
+
+    let mut walk = TopLevelWalk::new(total);
+    for _ in 0..MAX_TOP_LEVEL_BOXES {
+        let Some(offset) = walk.next_offset() else { break };
+        // 开头缓冲区内直接读取 box 头，否则请求 16 字节
+        let header = match head.get(offset as usize..).filter(|rest| rest.len() >= 16) {
+            Some(rest) => rest[..16].to_vec(),
+            None => fetcher.read(offset, 16.min(total - offset)).await?,
+        };
+        let Some((start, end)) = walk.step(&header)? else { continue };
+
+        let size = end - offset;
+        if size > max_moov {
+            return Err(anyhow!("moov box is {} bytes, larger than the {} byte limit", size, max_moov));
+        }
+        let body = match head.get(start as usize..end as usize) {
+            Some(body) => body.to_vec(),
+            None => fetcher.read(start, end - start).await?,
+        };
+        let mut probe = parse_moov(&body, total)?;
+        probe.moov_at = if walk.seen_mdat { "end" } else { "start" }.to_string();
+        probe.bytes_fetched = fetcher.fetched;
+        return Ok(probe);
+    }
+    Err(anyhow!("No moov box found (read {} bytes)", fetcher.fetched))
+}
+
+/// 并发探测视频列表中的每个画质（主地址失败时尝试备用地址），结果写回 `VideoItem`
+pub async fn probe_videos(videos: &mut [VideoItem]) {
+    let mut tasks = tokio::task::JoinSet::new();
+    for (index, video) in videos.iter().enumerate() {
+        let urls: Vec<String> = std::iter::once(video.url.clone()).chain(video.backup_url.clone()).collect();
+        tasks.spawn(async move {
+            let mut last_error = anyhow!("No video URL");
+            for url in &urls {
+                match probe_mp4(url).await {
+                    Ok(probe) => return (index, Ok(probe)),
+                    Err(e) => last_error = e,
+                }
+            }
+            (index, Err(last_error))
+        });
+    }
+    while let Some(joined) = tasks.join_next().await {
+        let Ok((index, result)) = joined else { continue };
+        match result {
+            Ok(probe) => videos[index].probe = Some(probe),
+            Err(e) => {
+                tracing::warn!("[MediaProbe] Failed to probe {}: {}", videos[index].url, e);
+                videos[index].probe_error = Some(e.to_string());
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn cat(parts: &[&[u8]]) -> Vec<u8> {
+        parts.concat()
+    }
+
+    /// 普通 box：32 位 size + 类型 + 内容
+    fn mp4_box(kind: &[u8; 4], body: &[u8]) -> Vec<u8> {
+        let mut out = ((body.len() + 8) as u32).to_be_bytes().to_vec();
+        out.extend_from_slice(kind);
+        out.extend_from_slice(body);
+        out
+    }
+
+    /// 64 位 box：size = 1，后跟 largesize
+    fn mp4_box64(kind: &[u8; 4], body: &[u8]) -> Vec<u8> {
+        let mut out = 1u32.to_be_bytes().to_vec();
+        out.extend_from_slice(kind);
+        out.extend_from_slice(&((body.len() + 16) as u64).to_be_bytes());
+        out.extend_from_slice(body);
+        out
+    }
+
+    /// `mvhd` / `mdhd` version 0：version/flags + 创建/修改时间 + timescale + duration
+    fn time_body(timescale: u32, duration: u32) -> Vec<u8> {
+        cat(&[&[0u8; 12], &timescale.to_be_bytes(), &duration.to_be_bytes()])
+    }
+
+    fn hdlr(handler: &[u8; 4]) -> Vec<u8> {
+        cat(&[&[0u8; 8], handler, &[0u8; 13]])
+    }
+
+    fn stsz(sample_size: u32, count: u32, entries: &[u32]) -> Vec<u8> {
+        let mut body = cat(&[&[0u8; 4], &sample_size.to_be_bytes(), &count.to_be_bytes()]);
+        for entry in entries {
+            body.extend_from_slice(&entry.to_be_bytes());
+        }
+        body
+    }
+
+    fn trak(tkhd: &[u8], mdhd: Vec<u8>, handler: &[u8; 4], entry: Vec<u8>, stsz_body: Vec<u8>) -> Vec<u8> {
+        let stsd = cat(&[&[0u8; 4], &1u32.to_be_bytes(), &entry]);
+        let stbl = mp4_box(b"stbl", &[mp4_box(b"stsd", &stsd), mp4_box(b"stsz", &stsz_body)].concat());
+        let mdia = [mp4_box(b"mdhd", &mdhd), mp4_box(b"hdlr", &hdlr(handler)), mp4_box(b"minf", &stbl)].concat();
+        mp4_box(b"trak", &[mp4_box(b"tkhd", tkhd), mp4_box(b"mdia", &mdia)].concat())
+    }
+
+    /// 10 秒 1280x720 avc1 High@3.1，30 fps，每帧 1000 字节
+    fn video_trak() -> Vec<u8> {
+        let mut tkhd = vec![0u8; 84];
+        tkhd[76..80].copy_from_slice(&(1280u32 << 16).to_be_bytes());
+        tkhd[80..84].copy_from_slice(&(720u32 << 16).to_be_bytes());
+        let mut entry = vec![0u8; 78];
+        entry[24..26].copy_from_slice(&1280u16.to_be_bytes());
+        entry[26..28].copy_from_slice(&720u16.to_be_bytes());
+        entry.extend(mp4_box(b"avcC", &[1, 0x64, 0x00, 0x1f, 0xff]));
+        trak(&tkhd, time_body(1000, 10_000), b"vide", mp4_box(b"avc1", &entry), stsz(1000, 300, &[]))
+    }
+
+    /// 10 秒 44.1 kHz mp4a，逐个样本大小共 600 字节
+    fn audio_trak() -> Vec<u8> {
+        let mut entry = vec![0u8; 28];
+        entry[24..28].copy_from_slice(&(44_100u32 << 16).to_be_bytes());
+        trak(&[0u8; 84], time_body(44_100, 441_000), b"soun", mp4_box(b"mp4a", &entry), stsz(0, 3, &[100, 200, 300]))
+    }
+
+    fn moov_body() -> Vec<u8> {
+        [mp4_box(b"mvhd", &time_body(1000, 10_000)), video_trak(), audio_trak()].concat()
+    }
+
+    fn ftyp() -> Vec<u8> {
+        mp4_box(b"ftyp", b"isom\0\0\x02\0isomavc1")
+    }
+
+    /// 在内存中的完整文件上遍历顶层 box（与 probe_mp4 相同的 16 字节头读取）
+    fn find_moov(file: &[u8]) -> Result<Option<(Vec<u8>, bool)>> {
+        let mut walk = TopLevelWalk::new(file.len() as u64);
+        while let Some(offset) = walk.next_offset() {
+            let offset = offset as usize;
+            let header = &file[offset..(offset + 16).min(file.len())];
+            if let Some((start, end)) = walk.step(header)? {
+                let body = file.get(start as usize..end as usize).ok_or_else(|| anyhow!("moov is truncated"))?;
+                return Ok(Some((body.to_vec(), walk.seen_mdat)));
+            }
+        }
+        Ok(None)
+    }
+
+    #[test]
+    fn parses_faststart_moov() {
+        let moov = moov_body();
+        let file = [ftyp(), mp4_box(b"moov", &moov), mp4_box(b"mdat", &[0u8; 64])].concat();
+
+        let (body, seen_mdat) = find_moov(&file).unwrap().expect("moov found");
+        assert_eq!(body, moov);
+        assert!(!seen_mdat);
+
+        let probe = parse_moov(&body, 1_000_000).unwrap();
+        assert_eq!(probe.duration_ms, 10_000);
+        assert_eq!((probe.width, probe.height), (1280, 720));
+        assert_eq!(probe.video_codec.as_deref(), Some("avc1.64001f"));
+        assert_eq!(probe.frame_rate, Some(30.0));
+        assert_eq!(probe.video_bitrate, Some(240_000));
+        assert_eq!(probe.audio_codec.as_deref(), Some("mp4a"));
+        assert_eq!(probe.audio_sample_rate, Some(44_100));
+        assert_eq!(probe.audio_bitrate, Some(480));
+        assert_eq!(probe.bitrate, 800_000);
+    }
+
+    #[test]
+    fn finds_moov_after_mdat() {
+        let moov = moov_body();
+        let file = [ftyp(), mp4_box(b"free", &[]), mp4_box(b"mdat", &[0u8; 256]), mp4_box(b"moov", &moov)].concat();
+
+        let (body, seen_mdat) = find_moov(&file).unwrap().expect("moov found");
+        assert_eq!(body, moov);
+        assert!(seen_mdat);
+    }
+
+    #[test]
+    fn skips_64_bit_mdat() {
+        let mdat = mp4_box64(b"mdat", &[0u8; 100]);
+        assert_eq!(box_header(&mdat), Some((*b"mdat", 16, 116)));
+
+        let moov = moov_body();
+        let file = [ftyp(), mdat, mp4_box(b"moov", &moov)].concat();
+        let (body, seen_mdat) = find_moov(&file).unwrap().expect("moov found");
+        assert_eq!(body, moov);
+        assert!(seen_mdat);
+    }
+
+    #[test]
+    fn zero_size_box_extends_to_end_of_file() {
+        // size = 0 的 mdat 延伸到文件末尾，之后没有 moov
+        let mut file = ftyp();
+        file.extend_from_slice(&0u32.to_be_bytes());
+        file.extend_from_slice(b"mdat");
+        file.extend_from_slice(&[0u8; 32]);
+        assert_eq!(box_header(&file[ftyp().len()..]), Some((*b"mdat", 8, 0)));
+        assert!(find_moov(&file).unwrap().is_none());
+
+        // 容器内同理：最后一个 size = 0 的子 box 取剩余全部内容
+        let container = [mp4_box(b"free", &[1, 2]), 0u32.to_be_bytes().to_vec(), b"skip".to_vec(), vec![7u8; 5]].concat();
+        let kids: Vec<_> = children(&container).collect();
+        assert_eq!(kids, vec![(*b"free", &[1u8, 2][..]), (*b"skip", &[7u8; 5][..])]);
+    }
+
+    #[test]
+    fn rejects_invalid_box_sizes() {
+        // 32 位 size 小于头长度
+        let bad = cat(&[&4u32.to_be_bytes(), b"free"]);
+        assert_eq!(box_header(&bad), None);
+        assert_eq!(children(&bad).count(), 0);
+        assert!(find_moov(&[ftyp(), bad].concat()).is_err());
+
+        // 64 位 size 小于 16 字节头
+        let bad64 = cat(&[&1u32.to_be_bytes(), b"mdat", &8u64.to_be_bytes()]);
+        assert!(find_moov(&[ftyp(), bad64].concat()).is_err());
+
+        // 64 位 size 超出偏移范围
+        let huge = cat(&[&1u32.to_be_bytes(), b"mdat", &u64::MAX.to_be_bytes()]);
+        assert!(find_moov(&[ftyp(), huge].concat()).is_err());
+    }
+
+    #[test]
+    fn tolerates_truncated_boxes() {
+        // 声明 100 字节但只有 20 字节：内容截断到缓冲区末尾
+        let truncated = cat(&[&100u32.to_be_bytes(), b"trak", &[9u8; 12]]);
+        let kids: Vec<_> = children(&truncated).collect();
+        assert_eq!(kids, vec![(*b"trak", &[9u8; 12][..])]);
+
+        // 不足一个 box 头
+        assert_eq!(box_header(&[0, 0, 0]), None);
+        assert_eq!(box_header(&[0, 0, 0, 1, b'm', b'd', b'a', b't', 0, 0]), None);
+
+        // moov 的任意前缀都不能 panic；mvhd 不完整时报错
+        let moov = moov_body();
+        let mvhd_len = 8 + time_body(1000, 10_000).len();
+        for len in 0..moov.len() {
+            let result = parse_moov(&moov[..len], 1_000_000);
+            if len < mvhd_len {
+                assert!(result.is_err(), "prefix of {} bytes", len);
+            }
+        }
+
+        // moov 声明的区间超出文件
+        let file = [ftyp(), mp4_box(b"moov", &moov)].concat();
+        assert!(find_moov(&file[..file.len() - 10]).is_err());
+    }
+
+    #[test]
+    fn reads_version_1_time_info() {
+        let body = cat(&[&[1u8, 0, 0, 0], &[0u8; 16], &90_000u32.to_be_bytes(), &(90_000u64 * 5).to_be_bytes()]);
+        assert_eq!(time_info(&body), Some((90_000, 450_000)));
+    }
+}
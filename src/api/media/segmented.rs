@@ -0,0 +1,335 @@
+//! 分段并发下载 (Segmented Download)
+//!
+//! 大文件（如 `h265_1080p` 视频流）按字节区间切分，由多条连接并发下载，各自写入
+//! 预分配文件的对应偏移，单个下载也能用满带宽：
+//!
+//! - 不单独探测：[`super::engine`] 的第一个请求就带 `Range: bytes=0-`，响应为 206 且
+//!   `Content-Range` 给出的总长不小于两个分段时才切换为分段下载，否则这个响应直接
+//!   作为单连接流式下载继续，小文件只需一次往返
+//! - 续传未完成的分段下载时用 `Range: bytes=0-0` 探测（[`probe`]），确认对象未变化
+//! - 每个分段独立重试，从该分段已写入的位置续传
+//! - 已完成的分段记录在 `<目标>.part.segments`（连同来源 URL 与校验值），再次下载
+//!   同一路径时，URL、总长与校验值都一致才只下载剩余分段；分段请求带 `If-Range`，
+//!   对象中途变化时报错而不是拼接两个版本
+//! - 连接数受单个下载上限与主机上限双重约束（见 [`super::engine::host_permit`]）
+//!
+//! 环境变量：
+//! - `XHS_DOWNLOAD_SEGMENT_SIZE`: 分段大小，字节（默认 4 MiB，最小 64 KiB）
+
+use anyhow::{Result, anyhow};
+use reqwest::header::{HeaderName, CONTENT_RANGE, CONTENT_TYPE, IF_RANGE, RANGE};
+use reqwest::StatusCode;
+use serde::{Deserialize, Serialize};
+use std::collections::{BTreeSet, VecDeque};
+use std::io::SeekFrom;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+use tokio::fs;
+use tokio::io::{AsyncSeekExt, AsyncWriteExt, BufWriter};
+
+use super::engine::{
+    backoff, cdn_get, chunk_timeout, env_u64, finish, host_permit, parse_content_range, part_path, retries,
+    validator, Attempt, DownloadOptions, DownloadOutcome, WRITE_BUFFER,
+};
+use super::hedge;
+
+const DEFAULT_SEGMENT_SIZE: u64 = 4 * 1024 * 1024;
+const MIN_SEGMENT_SIZE: u64 = 64 * 1024;
+
+/// 分段进度（`<目标>.part.segments`）
+#[derive(Serialize, Deserialize)]
+struct SegmentState {
+    #[serde(default)]
+    url: String,
+    /// 强 ETag 或 Last-Modified
+    #[serde(default)]
+    validator: Option<String>,
+    total: u64,
+    segment_size: u64,
+    /// 已完成的分段序号
+    done: BTreeSet<u64>,
+}
+
+/// 区间请求的探测结果
+#[derive(Debug, Clone)]
+pub struct RangeInfo {
+    /// 文件总长
+    pub total: u64,
+    pub content_type: Option<String>,
+    /// 校验值（续传与分段请求的 `If-Range`）
+    pub validator: Option<String>,
+}
+
+impl SegmentState {
+    fn range(&self, index: u64) -> (u64, u64) {
+        let start = index * self.segment_size;
+        (start, (start + self.segment_size).min(self.total) - 1)
+    }
+
+    fn done_bytes(&self) -> u64 {
+        self.done
+            .iter()
+            .map(|&index| {
+                let (start, end) = self.range(index);
+                end - start + 1
+            })
+            .sum()
+    }
+}
+
+pub fn segment_size() -> u64 {
+    env_u64("XHS_DOWNLOAD_SEGMENT_SIZE", DEFAULT_SEGMENT_SIZE).max(MIN_SEGMENT_SIZE)
+}
+
+/// 分段进度文件路径
+pub fn state_path(dest: &Path) -> PathBuf {
+    let mut name = part_path(dest).into_os_string();
+    name.push(".segments");
+    PathBuf::from(name)
+}
+
+/// 探测区间请求支持（续传分段下载时使用），不支持或探测失败时返回 None
+pub async fn probe(url: &str) -> Option<RangeInfo> {
+    let _permit = host_permit(url).await;
+    let started = Instant::now();
+    let response = match cdn_get(url).header(RANGE, "bytes=0-0").send().await {
+        Ok(response) => response,
+        Err(_) => {
+            hedge::record_failure(url);
+            return None;
+        }
+    };
+    if response.status() != StatusCode::PARTIAL_CONTENT {
+        return None;
+    }
+    hedge::record_response(url, started.elapsed());
+    let header = |name: HeaderName| response.headers().get(name).and_then(|v| v.to_str().ok());
+    let (_, total) = parse_content_range(header(CONTENT_RANGE)?);
+    let content_type = header(CONTENT_TYPE).map(str::to_owned);
+    let validator = validator(response.headers());
+    total
+        .filter(|&total| total > 0)
+        .map(|total| RangeInfo { total, content_type, validator })
+}
+
+async fn load_state(path: &Path) -> Option<SegmentState> {
+    serde_json::from_slice(&fs::read(path).await.ok()?).ok()
+}
+
+async fn save_state(path: &Path, state: &SegmentState) -> Result<()> {
+    let mut tmp = path.as_os_str().to_owned();
+    tmp.push(".tmp");
+    fs::write(&tmp, serde_json::to_vec(state)?).await?;
+    fs::rename(&tmp, path).await?;
+    Ok(())
+}
+
+/// 分段并发下载到 `dest`（`info` 来自 [`probe`]）
+pub async fn download(
+    url: &str,
+    dest: &Path,
+    info: RangeInfo,
+    connections: usize,
+    options: &DownloadOptions,
+) -> Result<DownloadOutcome> {
+    let RangeInfo { total, content_type, validator } = info;
+    let expected_size = options.expected_size;
+    if let Some(expected) = expected_size.filter(|&e| e != total) {
+        return Err(anyhow!("Size mismatch: server reports {} bytes, expected {}", total, expected));
+    }
+
+    let part = part_path(dest);
+    let state_file = state_path(dest);
+    let segment_size = segment_size();
+
+    // 进度文件与 `.part` 都匹配、且对象未变化（同一 URL 与校验值）才续传，否则重新预分配
+    let part_len = fs::metadata(&part).await.map(|m| m.len()).ok();
+    let state = match load_state(&state_file).await {
+        Some(state)
+            if state.url == url
+                && state.validator.is_some()
+                && state.validator == validator
+                && state.total == total
+                && state.segment_size == segment_size
+                && part_len == Some(total) =>
+        {
+            state
+        }
+        _ => {
+            let file = fs::File::create(&part)
+                .await
+                .map_err(|e| anyhow!("Failed to create file: {}", e))?;
+            file.set_len(total)
+                .await
+                .map_err(|e| anyhow!("Failed to preallocate {} bytes: {}", total, e))?;
+            let state = SegmentState {
+                url: url.to_string(),
+                validator: validator.clone(),
+                total,
+                segment_size,
+                done: BTreeSet::new(),
+            };
+            save_state(&state_file, &state).await?;
+            state
+        }
+    };
+
+    let resumed_from = state.done_bytes();
+    let started = Instant::now();
+    let pending: VecDeque<u64> = (0..total.div_ceil(segment_size))
+        .filter(|index| !state.done.contains(index))
+        .collect();
+    let workers = connections.clamp(1, pending.len().max(1));
+    tracing::info!(
+        "[MediaDownload] Segmented download {} ({} bytes): {} segments pending, {} connections",
+        url, total, pending.len(), workers
+    );
+
+    let queue = Arc::new(Mutex::new(pending));
+    let state = Arc::new(tokio::sync::Mutex::new(state));
+    let mut tasks = tokio::task::JoinSet::new();
+    for _ in 0..workers {
+        let (url, part, state_file) = (url.to_string(), part.clone(), state_file.clone());
+        let (queue, state, options, validator) = (queue.clone(), state.clone(), options.clone(), validator.clone());
+        tasks.spawn(async move {
+            loop {
+                let next = queue.lock().unwrap().pop_front();
+                let Some(index) = next else { break };
+                let (start, end) = state.lock().await.range(index);
+                fetch_segment(&url, &part, start, end, validator.as_deref(), &options).await?;
+                let mut state = state.lock().await;
+                state.done.insert(index);
+                save_state(&state_file, &state).await?;
+            }
+            Ok::<(), anyhow::Error>(())
+        });
+    }
+    while let Some(joined) = tasks.join_next().await {
+        let result: Result<()> = joined.map_err(|e| anyhow!("Segment task failed: {}", e)).and_then(|r| r);
+        if let Err(e) = result {
+            // 已完成的分段保留在进度文件中，下次请求同一路径时续传
+            tasks.abort_all();
+            return Err(e);
+        }
+    }
+
+    let _ = fs::remove_file(&state_file).await;
+    finish(&part, dest, total, expected_size).await?;
+    hedge::record_throughput(url, total - resumed_from, started.elapsed());
+    Ok(DownloadOutcome {
+        path: dest.to_path_buf(),
+        size: total,
+        content_type: content_type.unwrap_or_else(|| "application/octet-stream".to_string()),
+        resumed_from,
+    })
+}
+
+/// 下载一个分段 `[start, end]`，中断后从已写入的位置重试
+async fn fetch_segment(
+    url: &str,
+    part: &Path,
+    start: u64,
+    end: u64,
+    validator: Option<&str>,
+    options: &DownloadOptions,
+) -> Result<()> {
+    let (retries, chunk_timeout) = (retries(), chunk_timeout());
+    let mut position = start;
+    let mut attempt = 0;
+    loop {
+        let result = {
+            let _permit = host_permit(url).await;
+            write_range(url, part, &mut position, end, validator, chunk_timeout, options).await?
+        };
+        match result {
+            Attempt::Complete => return Ok(()),
+            Attempt::Interrupted(e) if attempt < retries => {
+                attempt += 1;
+                tracing::debug!(
+                    "[MediaDownload] Segment {}-{} interrupted at byte {} ({}), retry {}/{}",
+                    start, end, position, e, attempt, retries
+                );
+                tokio::time::sleep(backoff(attempt)).await;
+            }
+            Attempt::Interrupted(e) => {
+                return Err(anyhow!("Segment {}-{} failed after {} retries: {}", start, end, retries, e));
+            }
+        }
+    }
+}
+
+/// 请求 `[position, end]` 并写入文件对应偏移，`position` 随写入推进
+async fn write_range(
+    url: &str,
+    part: &Path,
+    position: &mut u64,
+    end: u64,
+    validator: Option<&str>,
+    chunk_timeout: Duration,
+    options: &DownloadOptions,
+) -> Result<Attempt> {
+    let started = Instant::now();
+    let mut request = cdn_get(url).header(RANGE, format!("bytes={}-{}", *position, end));
+    if let Some(validator) = validator {
+        // 对象变化时服务端返回 200 整个文件，下面按「区间未被遵守」报错
+        request = request.header(IF_RANGE, validator);
+    }
+    let mut response = match request.send().await {
+        Ok(response) => response,
+        Err(e) => {
+            hedge::record_failure(url);
+            return Ok(Attempt::Interrupted(e.into()));
+        }
+    };
+    let status = response.status();
+    if status.is_server_error() {
+        hedge::record_failure(url);
+        return Ok(Attempt::Interrupted(anyhow!("Segment request failed with status: {}", status)));
+    }
+    let (range_start, _) = response
+        .headers()
+        .get(CONTENT_RANGE)
+        .and_then(|v| v.to_str().ok())
+        .map(parse_content_range)
+        .unwrap_or_default();
+    if status != StatusCode::PARTIAL_CONTENT || range_start != Some(*position) {
+        return Err(anyhow!("Range request for bytes {}-{} not honored (status {})", *position, end, status));
+    }
+    hedge::record_response(url, started.elapsed());
+    options.on_response();
+
+    let mut file = fs::OpenOptions::new()
+        .write(true)
+        .open(part)
+        .await
+        .map_err(|e| anyhow!("Failed to open file: {}", e))?;
+    file.seek(SeekFrom::Start(*position)).await?;
+    let mut writer = BufWriter::with_capacity(WRITE_BUFFER, file);
+
+    let outcome = loop {
+        match tokio::time::timeout(chunk_timeout, response.chunk()).await {
+            Ok(Ok(Some(bytes))) => {
+                options.on_chunk(bytes.len()).await;
+                let take = (bytes.len() as u64).min(end + 1 - *position) as usize;
+                writer
+                    .write_all(&bytes[..take])
+                    .await
+                    .map_err(|e| anyhow!("Failed to write file: {}", e))?;
+                *position += take as u64;
+                if *position > end {
+                    break Attempt::Complete;
+                }
+            }
+            Ok(Ok(None)) => break Attempt::Interrupted(anyhow!("Connection closed at byte {}", *position)),
+            Ok(Err(e)) => break Attempt::Interrupted(e.into()),
+            Err(_) => break Attempt::Interrupted(anyhow!("No data for {:?}", chunk_timeout)),
+        }
+    };
+    writer.flush().await.map_err(|e| anyhow!("Failed to flush file: {}", e))?;
+    if matches!(outcome, Attempt::Complete) {
+        // 分段记为完成前先落盘
+        writer.into_inner().sync_data().await?;
+    }
+    Ok(outcome)
+}
@@ -3,7 +3,9 @@
 //! Extracts video download URLs from note details
 
 use crate::api::XhsApiClient;
+use crate::api::note::card::fetch_note_feed;
 use anyhow::{Result, anyhow};
+use super::probe::{probe_videos, VideoProbe};
 use serde::{Deserialize, Serialize};
 use utoipa::ToSchema;
 
@@ -14,6 +16,9 @@ pub struct VideoRequest {
     pub note_id: String,
     /// xsec_token (必填，从 feed/search 结果获取)
     pub xsec_token: String,
+    /// 探测模式：用 Range 请求读取每个画质的 MP4 moov，返回时长、分辨率、编码与码率
+    #[serde(default)]
+    pub probe: bool,
 }
 
 /// 视频地址响应
@@ -62,25 +67,20 @@ pub struct VideoItem {
     pub size: i64,
     /// 编码格式 (hevc/h264)
     pub codec: String,
+    /// 容器元数据 (仅探测模式)
+    #[serde(default)]
+    pub probe: Option<VideoProbe>,
+    /// 探测失败原因 (仅探测模式)
+    #[serde(default)]
+    pub probe_error: Option<String>,
 }
 
 /// 获取视频下载地址
 ///
 /// 从笔记详情中提取所有画质的视频下载 URL
 pub async fn get_video_urls(api: &XhsApiClient, req: VideoRequest) -> Result<VideoResponse> {
-    let path = "/api/sns/web/v1/feed";
-    
-    // 构造请求体
-    let payload = serde_json::json!({
-        "source_note_id": req.note_id,
-        "image_formats": ["jpg", "webp", "avif"],
-        "xsec_source": "pc_feed",
-        "xsec_token": req.xsec_token,
-        "extra": {"need_body_topic": "1"}
-    });
-    
-    let text = api.post_algo(path, payload).await?;
-    let raw: serde_json::Value = serde_json::from_str(&text)?;
+    // 与笔记详情共享同一个 feed 请求（按 note_id 缓存）
+    let raw = fetch_note_feed(api, &req.note_id, &req.xsec_token).await?;
     
     // 检查响应状态
     if raw.get("success").and_then(|v| v.as_bool()) != Some(true) {
@@ -151,6 +151,10 @@ pub async fn get_video_urls(api: &XhsApiClient, req: VideoRequest) -> Result<Vid
     // 按文件大小降序排列 (最高画质在前)
     videos.sort_by(|a, b| b.size.cmp(&a.size));
     
+    if req.probe {
+        probe_videos(&mut videos).await;
+    }
+    
     Ok(VideoResponse {
         success: true,
         msg: None,
@@ -195,5 +199,7 @@ fn parse_video_stream(stream: &serde_json::Value, codec: &str) -> Option<VideoIt
         height,
         size,
         codec: codec.to_string(),
+        probe: None,
+        probe_error: None,
     })
 }
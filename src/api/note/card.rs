@@ -0,0 +1,74 @@
+//! 笔记卡片缓存 (Note Card Cache)
+//!
+//! `note::detail`、`media::video`、`media::images` 都通过同一个
+//! `/api/sns/web/v1/feed` 请求获取笔记内容。这里缓存该请求的响应，
+//! 同一篇笔记先取正文再取媒体时只签名、请求一次；同一篇笔记的并发未命中共享
+//! 一次上游请求。
+//!
+//! 缓存键为 `user_id|note_id|xsec_token`：响应中的 `interact_info`（点赞、收藏、关注）
+//! 随账号不同，重新登录后不会读到上一个账号的结果；xsec_token 决定上游是否放行，
+//! 过期或错误的 token 不会命中其他调用方用有效 token 取得的响应。
+//!
+//! - `XHS_NOTE_CACHE_SIZE`: 最多缓存的笔记数（默认 512，0 关闭缓存）
+//! - `XHS_NOTE_CACHE_TTL`: 缓存时长，秒（默认 300）
+//!
+//! 只缓存 `success = true` 的响应；失败响应只在并发请求之间共享。
+
+use anyhow::Result;
+use once_cell::sync::Lazy;
+use serde_json::Value;
+use std::sync::Arc;
+use std::time::Duration;
+
+use crate::api::XhsApiClient;
+use crate::utils::TtlCache;
+
+const FEED_PATH: &str = "/api/sns/web/v1/feed";
+const DEFAULT_CACHE_SIZE: usize = 512;
+const DEFAULT_CACHE_TTL_SECS: u64 = 300;
+
+static NOTE_CARDS: Lazy<TtlCache<String, Arc<Value>>> = Lazy::new(|| {
+    let size = std::env::var("XHS_NOTE_CACHE_SIZE")
+        .ok()
+        .and_then(|v| v.parse::<usize>().ok())
+        .unwrap_or(DEFAULT_CACHE_SIZE);
+    let ttl = std::env::var("XHS_NOTE_CACHE_TTL")
+        .ok()
+        .and_then(|v| v.parse::<u64>().ok())
+        .unwrap_or(DEFAULT_CACHE_TTL_SECS);
+    TtlCache::new(size, Duration::from_secs(ttl))
+});
+
+static NOTE_CARD_METRICS: Lazy<crate::metrics::CacheCounters> =
+    Lazy::new(|| crate::metrics::CacheCounters::new("note_card"));
+
+/// 共享请求使用的默认请求体（图片格式、xsec_source、extra 与各调用方默认值一致）
+pub fn default_feed_payload(note_id: &str, xsec_token: &str) -> Value {
+    serde_json::json!({
+        "source_note_id": note_id,
+        "image_formats": ["jpg", "webp", "avif"],
+        "xsec_source": "pc_feed",
+        "xsec_token": xsec_token,
+        "extra": {"need_body_topic": "1"}
+    })
+}
+
+/// 获取笔记的 feed 响应（原始 JSON，含 `data.items[0].note_card`），优先读缓存
+pub async fn fetch_note_feed(api: &XhsApiClient, note_id: &str, xsec_token: &str) -> Result<Arc<Value>> {
+    let user_id = api.user_id().await?;
+    let key = format!("{}|{}|{}", user_id, note_id, xsec_token);
+    let (raw, hit) = NOTE_CARDS
+        .get_or_try_insert_with(key.clone(), move || async move {
+            let text = api.post_algo(FEED_PATH, default_feed_payload(note_id, xsec_token)).await?;
+            Ok(Arc::new(crate::timing::parse_json::<Value>(&text)?))
+        })
+        .await?;
+    NOTE_CARD_METRICS.record(hit);
+
+    if raw.get("success").and_then(|v| v.as_bool()) != Some(true) {
+        NOTE_CARDS.invalidate(&key);
+    } else if hit {
+        tracing::debug!("[NoteCardCache] Hit for note {}", note_id);
+    }
+    Ok(raw)
+}
@@ -88,6 +88,17 @@ async fn get_note_detail_internal(
     api: &crate::api::XhsApiClient,
     req: NoteDetailRequest,
 ) -> anyhow::Result<NoteDetailResponse> {
+    // 默认参数的请求与视频 / 图片接口共享笔记卡片缓存。共享请求总是带
+    // `extra: {"need_body_topic": "1"}`，未传 extra 的请求不走缓存，保持原样不带该字段
+    let default_extra = serde_json::json!({"need_body_topic": "1"});
+    if req.image_formats == default_image_formats()
+        && req.xsec_source == default_xsec_source()
+        && req.extra.as_ref() == Some(&default_extra)
+    {
+        let raw = super::card::fetch_note_feed(api, &req.source_note_id, &req.xsec_token).await?;
+        return Ok(NoteDetailResponse::deserialize(&*raw)?);
+    }
+    
     let path = "/api/sns/web/v1/feed";
     
     // 构造请求体
@@ -104,6 +115,6 @@ async fn get_note_detail_internal(
     }
     
     let text = api.post_algo(path, payload).await?;
-    let response: NoteDetailResponse = serde_json::from_str(&text)?;
+    let response: NoteDetailResponse = crate::timing::parse_json(&text)?;
     Ok(response)
 }
@@ -1,2 +1,3 @@
 pub mod page;
 pub mod detail;
+pub mod card;
@@ -81,6 +81,6 @@ async fn get_note_page_internal(
     
     // 使用公共模块发送请求
     let text = api.get_with_url("note_page", &url).await?;
-    let response: serde_json::Value = serde_json::from_str(&text)?;
+    let response: serde_json::Value = crate::timing::parse_json(&text)?;
     Ok(response)
 }
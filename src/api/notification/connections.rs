@@ -72,7 +72,7 @@ pub async fn get_connections_with_params(api: &XhsApiClient, params: Connections
     let uri = format!("/api/sns/web/v1/you/connections?num={}&cursor={}", params.num, cursor);
     
     let text = api.get_with_query(&uri).await?;
-    let result = serde_json::from_str::<ConnectionsResponse>(&text)?;
+    let result = crate::timing::parse_json::<ConnectionsResponse>(&text)?;
     Ok(result)
 }
 
@@ -72,6 +72,6 @@ pub async fn get_likes_with_params(api: &XhsApiClient, params: LikesParams) -> R
     let uri = format!("/api/sns/web/v1/you/likes?num={}&cursor={}", params.num, cursor);
     
     let text = api.get_with_query(&uri).await?;
-    let result = serde_json::from_str::<LikesResponse>(&text)?;
+    let result = crate::timing::parse_json::<LikesResponse>(&text)?;
     Ok(result)
 }
@@ -72,7 +72,7 @@ pub async fn get_mentions_with_params(api: &XhsApiClient, params: MentionsParams
     let uri = format!("/api/sns/web/v1/you/mentions?num={}&cursor={}", params.num, cursor);
     
     let text = api.get_with_query(&uri).await?;
-    let result = serde_json::from_str::<MentionsResponse>(&text)?;
+    let result = crate::timing::parse_json::<MentionsResponse>(&text)?;
     Ok(result)
 }
 
@@ -8,8 +8,8 @@ use std::time::{SystemTime, UNIX_EPOCH};
 /// 
 /// 获取小红书首页搜索框的热门搜索推荐词
 pub async fn query_trending(api: &XhsApiClient) -> Result<QueryTrendingResponse> {
-    let text = api.get("search_trending").await?;
-    let result = serde_json::from_str::<QueryTrendingResponse>(&text)?;
+    let text = api.cached("search_trending", "", || api.get("search_trending")).await?;
+    let result = crate::timing::parse_json::<QueryTrendingResponse>(&text)?;
     Ok(result)
 }
 
@@ -21,8 +21,10 @@ pub async fn recommend_search(api: &XhsApiClient, keyword: &str) -> Result<Searc
     let url = format!("https://edith.xiaohongshu.com/api/sns/web/v1/search/recommend?keyword={}", encoded_keyword);
     
     // 使用 get_with_url 处理动态参数并进行纯算法签名
-    let text = api.get_with_url("search_recommend", &url).await?;
-    let result = serde_json::from_str::<SearchRecommendResponse>(&text)?;
+    let text = api
+        .cached("search_recommend", keyword, || api.get_with_url("search_recommend", &url))
+        .await?;
+    let result = crate::timing::parse_json::<SearchRecommendResponse>(&text)?;
     Ok(result)
 }
 
@@ -96,7 +98,7 @@ pub async fn search_notes(api: &XhsApiClient, mut req: SearchNotesRequest) -> Re
     
     // 使用 post_algo 进行签名和发送
     let text = api.post_algo(path, payload).await?;
-    let mut result = serde_json::from_str::<SearchNotesResponse>(&text)?;
+    let mut result = crate::timing::parse_json::<SearchNotesResponse>(&text)?;
     
     // 注入 search_id 到响应中，供客户端用于后续请求 (如 onebox)
     if let Some(ref mut data) = result.data {
@@ -122,8 +124,10 @@ pub async fn search_onebox(api: &XhsApiClient, mut req: SearchOneboxRequest) ->
     let path = "/api/sns/web/v1/search/onebox";
     let payload = serde_json::to_value(&req)?;
     
-    let text = api.post_algo(path, payload).await?;
-    let result = serde_json::from_str::<SearchOneboxResponse>(&text)?;
+    // 同一关键词的聚合结果可复用（search_id / request_id 每次随机，不参与缓存键）
+    let key = format!("{}|{}", req.biz_type, req.keyword);
+    let text = api.cached("search_onebox", &key, || api.post_algo(path, payload)).await?;
+    let result = crate::timing::parse_json::<SearchOneboxResponse>(&text)?;
     Ok(result)
 }
 
@@ -134,8 +138,11 @@ pub async fn search_filter(api: &XhsApiClient, keyword: &str, search_id: &str) -
     let url = format!("https://edith.xiaohongshu.com/api/sns/web/v1/search/filter?keyword={}&search_id={}", encoded_kw, encoded_sid);
     
     // get_with_url 适用于任何 edith URL，只要路径正确即可
-    let text = api.get_with_url("search_filter", &url).await?;
-    let result = serde_json::from_str::<SearchFilterResponse>(&text)?;
+    // 筛选项只取决于关键词，search_id 不参与缓存键
+    let text = api
+        .cached("search_filter", keyword, || api.get_with_url("search_filter", &url))
+        .await?;
+    let result = crate::timing::parse_json::<SearchFilterResponse>(&text)?;
     Ok(result)
 }
 
@@ -158,6 +165,6 @@ pub async fn search_user(api: &XhsApiClient, mut req: SearchUserRequest) -> Resu
     
     let payload = serde_json::to_value(&request_wrapper)?;
     let text = api.post_algo(path, payload).await?;
-    let result = serde_json::from_str::<SearchUserResponse>(&text)?;
+    let result = crate::timing::parse_json::<SearchUserResponse>(&text)?;
     Ok(result)
 }
@@ -11,6 +11,6 @@ pub async fn get_current_user(api: &XhsApiClient) -> Result<UserMeResponse> {
     // 使用公共模块的 get 方法，自动处理签名和 headers
     let text = api.get("user_me").await?;
     
-    let result = serde_json::from_str::<UserMeResponse>(&text)?;
+    let result = crate::timing::parse_json::<UserMeResponse>(&text)?;
     Ok(result)
 }
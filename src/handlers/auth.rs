@@ -19,7 +19,7 @@ use crate::api::login::{GuestInitResponse, CreateQrCodeResponse, PollStatusRespo
 
 /// 初始化访客登录会话
 ///
-/// 通过 Playwright 获取访客 Cookie，存储到内存中供后续 QR 登录使用
+/// 通过 Playwright 获取访客 Cookie（优先使用预热缓存），存储到内存中供后续 QR 登录使用
 #[utoipa::path(
     post,
     path = "/api/auth/guest-init",
@@ -35,7 +35,7 @@ pub async fn guest_init_handler(
 ) -> impl IntoResponse {
     tracing::info!("Guest init requested");
     
-    match api::login::fetch_guest_cookies().await {
+    match api::login::get_guest_cookies().await {
         Ok(cookies) => {
             // Store cookies in state
             {
@@ -211,6 +211,8 @@ pub async fn poll_qrcode_status_handler(
             
             // If login success, merge new cookies with guest cookies and save
             if code_status == 2 {
+                // 访客会话已被本次登录使用，下次 guest-init 取新的一组
+                api::login::invalidate_guest_cookies();
                 if let Some(ref new_c) = new_cookies {
                     let mut merged = cookies.clone();
                     merged.extend(new_c.clone());
@@ -1,13 +1,18 @@
 //! Media HTTP Handlers
 //!
-//! Handles: video URL extraction, image URL extraction, media download
+//! Handles: video URL extraction, image URL extraction, media download, batch download jobs
 
 use axum::{
-    extract::State,
-    response::IntoResponse,
+    extract::{Path, State},
+    http::StatusCode,
+    response::{
+        sse::{Event, KeepAlive, Sse},
+        IntoResponse,
+    },
     Json,
 };
 use std::sync::Arc;
+use tokio_stream::wrappers::ReceiverStream;
 
 use crate::api::media;
 use crate::server::AppState;
@@ -24,7 +29,7 @@ use crate::server::AppState;
     path = "/api/note/video",
     tag = "Media",
     summary = "视频地址解析",
-    description = "从视频笔记中提取所有画质的视频下载 URL，返回 CDN 直链",
+    description = "从视频笔记中提取所有画质的视频下载 URL，返回 CDN 直链。`probe: true` 时通过 Range 请求只读取每个画质的 MP4 moov box，附带时长、分辨率、编码与码率 (probe 字段)",
     request_body = media::video::VideoRequest,
     responses(
         (status = 200, description = "视频地址列表", body = media::video::VideoResponse),
@@ -102,3 +107,101 @@ pub async fn download_handler(
         })).into_response(),
     }
 }
+
+/// 提交批量下载任务
+///
+/// 立即返回 job_id，下载在后台执行
+#[utoipa::path(
+    post,
+    path = "/api/media/jobs",
+    tag = "Media",
+    summary = "批量下载任务",
+    description = "提交一组媒体 URL 或笔记（note_id + xsec_token），立即返回 job_id。文件按内容哈希存入媒体存储，已下载过的 URL 直接复用，不再请求网络。通过 /api/media/jobs/{job_id} 轮询或 /api/media/jobs/{job_id}/events (SSE) 获取进度",
+    request_body = media::jobs::JobRequest,
+    responses(
+        (status = 200, description = "任务初始状态", body = media::jobs::JobResponse)
+    )
+)]
+pub async fn submit_job_handler(
+    State(state): State<Arc<AppState>>,
+    Json(req): Json<media::jobs::JobRequest>,
+) -> impl IntoResponse {
+    match media::jobs::submit(state, req) {
+        Ok(status) => Json(media::jobs::JobResponse { success: true, msg: None, data: Some(status) }).into_response(),
+        Err(e) => Json(serde_json::json!({
+            "success": false,
+            "msg": e.to_string(),
+            "data": null
+        })).into_response(),
+    }
+}
+
+/// 查询批量下载任务进度
+#[utoipa::path(
+    get,
+    path = "/api/media/jobs/{job_id}",
+    tag = "Media",
+    summary = "批量下载任务进度",
+    params(
+        ("job_id" = String, Path, description = "提交任务时返回的 job_id")
+    ),
+    responses(
+        (status = 200, description = "任务状态", body = media::jobs::JobResponse),
+        (status = 404, description = "任务不存在或已过期")
+    )
+)]
+pub async fn job_status_handler(Path(job_id): Path<String>) -> impl IntoResponse {
+    match media::jobs::status(&job_id) {
+        Some(status) => Json(media::jobs::JobResponse { success: true, msg: None, data: Some(status) }).into_response(),
+        None => job_not_found(),
+    }
+}
+
+/// 订阅批量下载任务进度 (SSE)
+///
+/// 每次文件状态变化推送一个 `progress` 事件（完整任务状态），任务结束时推送 `done` 事件后关闭
+#[utoipa::path(
+    get,
+    path = "/api/media/jobs/{job_id}/events",
+    tag = "Media",
+    summary = "批量下载任务进度推送 (SSE)",
+    params(
+        ("job_id" = String, Path, description = "提交任务时返回的 job_id")
+    ),
+    responses(
+        (status = 200, description = "text/event-stream，事件数据为任务状态 JSON", body = String, content_type = "text/event-stream"),
+        (status = 404, description = "任务不存在或已过期")
+    )
+)]
+pub async fn job_events_handler(Path(job_id): Path<String>) -> impl IntoResponse {
+    let Some(mut progress) = media::jobs::subscribe(&job_id) else {
+        return job_not_found();
+    };
+
+    let (tx, rx) = tokio::sync::mpsc::channel(16);
+    tokio::spawn(async move {
+        loop {
+            let status = progress.borrow_and_update().clone();
+            let finished = status.state == media::jobs::JobState::Finished;
+            let event = Event::default()
+                .event(if finished { "done" } else { "progress" })
+                .json_data(&status);
+            if tx.send(event).await.is_err() || finished || progress.changed().await.is_err() {
+                break;
+            }
+        }
+    });
+    Sse::new(ReceiverStream::new(rx)).keep_alive(KeepAlive::default()).into_response()
+}
+
+fn job_not_found() -> axum::response::Response {
+    (
+        StatusCode::NOT_FOUND,
+        Json(serde_json::json!({
+            "success": false,
+            "msg": "Job not found or expired",
+            "data": null
+        })),
+    )
+        .into_response()
+}
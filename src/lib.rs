@@ -8,6 +8,8 @@ pub mod handlers;  // HTTP request handlers (modular)
 pub mod openapi;   // OpenAPI documentation
 pub mod signature;  // 纯算法签名服务模块
 pub mod agent_manager;  // Python Agent 进程管理
+pub mod metrics;  // Prometheus 指标
+pub mod timing;  // Server-Timing 与请求 ID
 
 pub use client::XhsClient;
 pub use auth::{UserCredentials, CredentialStorage, AuthService};
@@ -21,12 +21,16 @@ async fn main() -> anyhow::Result<()> {
     // 自动启动 Python Signature Agent
     info!("Starting Python Signature Agent...");
     match agent_manager::start_agent() {
-        Ok(_) => info!("Python Agent started successfully"),
+        Ok(_) => info!("Python Agent spawned, readiness is confirmed in the background"),
         Err(e) => {
             warn!("Failed to start Python Agent: {}. Signature generation will fallback to stored signatures.", e);
         }
     }
     
+    // 进程内签名：在后台线程上初始化 Python 解释器，完成前签名走 Agent，不占用 tokio 工作线程
+    #[cfg(feature = "embedded-signer")]
+    xhs_rs::signature::embedded::prewarm();
+    
     // 设置 Ctrl+C 信号处理，确保清理 Agent
     let shutdown = tokio::signal::ctrl_c();
     
@@ -0,0 +1,577 @@
+//! 指标模块 (Prometheus Metrics)
+//!
+//! 无外部依赖的 Prometheus 文本格式指标，`GET /metrics` 导出：
+//! - HTTP 接口请求数与延迟直方图（按路由）
+//! - 上游（XHS）响应状态码计数，406 / 461 等风控信号一目了然
+//! - 签名调用延迟与错误
+//! - 缓存命中（访客 Cookie、签名会话句柄）
+//! - Agent 监督状态与签名池各端点状态
+//! - 媒体下载：各 CDN 主机的首字节延迟 / 吞吐 / 失败，对冲次数
+//! - 合并各 Agent 自身的 `/metrics`（加 `agent` 标签）：签名延迟、执行器队列、
+//!   Playwright 启动 / 导航耗时、Cookie 获取结果
+//!
+//! 热路径只做原子加法：签名、缓存等固定标签的调用点持有序列句柄
+//! （[`CounterVec::with_labels`] / [`HistogramVec::with_labels`]），不查找；
+//! 其余按标签哈希在固定大小的槽位表中无锁查找，序列首次出现时占用一个槽位。
+
+use once_cell::sync::Lazy;
+use std::collections::hash_map::DefaultHasher;
+use std::collections::HashMap;
+use std::fmt::Write;
+use std::hash::{Hash, Hasher};
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{Arc, OnceLock};
+use std::time::{Duration, Instant};
+
+use crate::agent_manager::AgentReadiness;
+use crate::signature::pool::{self, EndpointStats};
+
+/// 延迟直方图的桶上限（秒）
+const LATENCY_BUCKETS: &[f64] = &[
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+];
+
+/// 抓取单个 Agent `/metrics` 的超时
+const AGENT_SCRAPE_TIMEOUT: Duration = Duration::from_secs(1);
+
+/// 每个指标最多的标签组合数（超出后的样本计入一个不导出的溢出序列）
+const MAX_SERIES: usize = 1024;
+
+// ============================================================================
+// Metric types
+// ============================================================================
+
+/// 按标签值查找序列：开放寻址的槽位表，槽位一经占用不再改变，读取无锁
+struct Series<T> {
+    slots: Box<[OnceLock<(Vec<String>, Arc<T>)>]>,
+    overflow: Arc<T>,
+    overflowed: AtomicBool,
+}
+
+impl<T: Default> Series<T> {
+    fn new() -> Self {
+        Self {
+            slots: (0..MAX_SERIES).map(|_| OnceLock::new()).collect(),
+            overflow: Arc::new(T::default()),
+            overflowed: AtomicBool::new(false),
+        }
+    }
+
+    fn get(&self, labels: &[&str]) -> Arc<T> {
+        let start = label_hash(labels) as usize % MAX_SERIES;
+        for probe in 0..MAX_SERIES {
+            let slot = &self.slots[(start + probe) % MAX_SERIES];
+            // 空槽位由第一个到达者占用；被其他标签组合占用时继续探测
+            let (values, value) = slot.get_or_init(|| {
+                (labels.iter().map(|l| l.to_string()).collect(), Arc::new(T::default()))
+            });
+            if values.iter().map(String::as_str).eq(labels.iter().copied()) {
+                return value.clone();
+            }
+        }
+        if !self.overflowed.swap(true, Ordering::Relaxed) {
+            tracing::warn!("[Metrics] More than {} label sets for one metric, dropping new series", MAX_SERIES);
+        }
+        self.overflow.clone()
+    }
+
+    /// 按标签排序后的快照（渲染用）
+    fn snapshot(&self) -> Vec<(Vec<String>, Arc<T>)> {
+        let mut all: Vec<_> = self
+            .slots
+            .iter()
+            .filter_map(OnceLock::get)
+            .map(|(labels, value)| (labels.clone(), value.clone()))
+            .collect();
+        all.sort_by(|a, b| a.0.cmp(&b.0));
+        all
+    }
+}
+
+fn label_hash(labels: &[&str]) -> u64 {
+    let mut hasher = DefaultHasher::new();
+    for label in labels {
+        label.hash(&mut hasher);
+    }
+    hasher.finish()
+}
+
+/// 单个计数器序列的句柄（固定标签的调用点持有，计数时不再查找）
+#[derive(Clone)]
+pub struct Counter(Arc<AtomicU64>);
+
+impl Counter {
+    pub fn inc(&self) {
+        self.add(1);
+    }
+
+    pub fn add(&self, value: u64) {
+        self.0.fetch_add(value, Ordering::Relaxed);
+    }
+}
+
+/// 带标签的计数器
+pub struct CounterVec {
+    name: &'static str,
+    help: &'static str,
+    label_names: &'static [&'static str],
+    series: Series<AtomicU64>,
+}
+
+impl CounterVec {
+    pub fn new(name: &'static str, help: &'static str, label_names: &'static [&'static str]) -> Self {
+        Self {
+            name,
+            help,
+            label_names,
+            series: Series::new(),
+        }
+    }
+
+    /// 取得一组标签对应的序列句柄
+    pub fn with_labels(&self, labels: &[&str]) -> Counter {
+        Counter(self.series.get(labels))
+    }
+
+    pub fn inc(&self, labels: &[&str]) {
+        self.add(labels, 1);
+    }
+
+    pub fn add(&self, labels: &[&str], value: u64) {
+        self.series.get(labels).fetch_add(value, Ordering::Relaxed);
+    }
+
+    fn render(&self, out: &mut String) {
+        header(out, self.name, self.help, "counter");
+        for (labels, value) in self.series.snapshot() {
+            let _ = writeln!(
+                out,
+                "{}{} {}",
+                self.name,
+                format_labels(self.label_names, &labels, None),
+                value.load(Ordering::Relaxed)
+            );
+        }
+    }
+}
+
+/// 单个直方图序列
+#[derive(Default)]
+pub struct Histogram {
+    /// 每个桶的（非累计）计数，最后一个为 +Inf
+    buckets: [AtomicU64; LATENCY_BUCKETS.len() + 1],
+    sum_micros: AtomicU64,
+    count: AtomicU64,
+}
+
+impl Histogram {
+    pub fn observe(&self, seconds: f64) {
+        let index = LATENCY_BUCKETS
+            .iter()
+            .position(|bound| seconds <= *bound)
+            .unwrap_or(LATENCY_BUCKETS.len());
+        self.buckets[index].fetch_add(1, Ordering::Relaxed);
+        self.sum_micros.fetch_add((seconds * 1_000_000.0) as u64, Ordering::Relaxed);
+        self.count.fetch_add(1, Ordering::Relaxed);
+    }
+
+    pub fn observe_since(&self, started: Instant) {
+        self.observe(started.elapsed().as_secs_f64());
+    }
+}
+
+/// 带标签的延迟直方图（秒）
+pub struct HistogramVec {
+    name: &'static str,
+    help: &'static str,
+    label_names: &'static [&'static str],
+    series: Series<Histogram>,
+}
+
+impl HistogramVec {
+    pub fn new(name: &'static str, help: &'static str, label_names: &'static [&'static str]) -> Self {
+        Self {
+            name,
+            help,
+            label_names,
+            series: Series::new(),
+        }
+    }
+
+    /// 取得一组标签对应的序列句柄
+    pub fn with_labels(&self, labels: &[&str]) -> Arc<Histogram> {
+        self.series.get(labels)
+    }
+
+    pub fn observe(&self, labels: &[&str], seconds: f64) {
+        self.series.get(labels).observe(seconds);
+    }
+
+    pub fn observe_since(&self, labels: &[&str], started: Instant) {
+        self.observe(labels, started.elapsed().as_secs_f64());
+    }
+
+    fn render(&self, out: &mut String) {
+        header(out, self.name, self.help, "histogram");
+        for (labels, histogram) in self.series.snapshot() {
+            let mut cumulative = 0;
+            for (index, count) in histogram.buckets.iter().enumerate() {
+                cumulative += count.load(Ordering::Relaxed);
+                let le = LATENCY_BUCKETS
+                    .get(index)
+                    .map(|bound| bound.to_string())
+                    .unwrap_or_else(|| "+Inf".to_string());
+                let _ = writeln!(
+                    out,
+                    "{}_bucket{} {}",
+                    self.name,
+                    format_labels(self.label_names, &labels, Some(&le)),
+                    cumulative
+                );
+            }
+            let labels = format_labels(self.label_names, &labels, None);
+            let sum = histogram.sum_micros.load(Ordering::Relaxed) as f64 / 1_000_000.0;
+            let _ = writeln!(out, "{}_sum{} {}", self.name, labels, sum);
+            let _ = writeln!(out, "{}_count{} {}", self.name, labels, histogram.count.load(Ordering::Relaxed));
+        }
+    }
+}
+
+fn header(out: &mut String, name: &str, help: &str, kind: &str) {
+    let _ = writeln!(out, "# HELP {} {}", name, help);
+    let _ = writeln!(out, "# TYPE {} {}", name, kind);
+}
+
+fn gauge(out: &mut String, name: &str, help: &str, samples: &[(String, f64)]) {
+    header(out, name, help, "gauge");
+    for (labels, value) in samples {
+        let _ = writeln!(out, "{}{} {}", name, labels, value);
+    }
+}
+
+fn format_labels(names: &[&str], values: &[String], le: Option<&str>) -> String {
+    let mut pairs: Vec<String> = names
+        .iter()
+        .zip(values)
+        .map(|(name, value)| format!("{}=\"{}\"", name, escape(value)))
+        .collect();
+    if let Some(le) = le {
+        pairs.push(format!("le=\"{}\"", le));
+    }
+    if pairs.is_empty() {
+        String::new()
+    } else {
+        format!("{{{}}}", pairs.join(","))
+    }
+}
+
+fn escape(value: &str) -> String {
+    value.replace('\\', "\\\\").replace('"', "\\\"").replace('\n', "\\n")
+}
+
+// ============================================================================
+// Metrics
+// ============================================================================
+
+pub static HTTP_REQUESTS: Lazy<CounterVec> = Lazy::new(|| {
+    CounterVec::new("xhs_http_requests_total", "HTTP requests served, by route and status", &["route", "method", "status"])
+});
+
+pub static HTTP_DURATION: Lazy<HistogramVec> = Lazy::new(|| {
+    HistogramVec::new("xhs_http_request_duration_seconds", "HTTP request latency by route", &["route"])
+});
+
+pub static UPSTREAM_RESPONSES: Lazy<CounterVec> = Lazy::new(|| {
+    CounterVec::new("xhs_upstream_responses_total", "XHS API responses by endpoint and status code", &["endpoint", "status"])
+});
+
+pub static SIGN_DURATION: Lazy<HistogramVec> = Lazy::new(|| {
+    HistogramVec::new("xhs_sign_duration_seconds", "Signature generation latency as seen by the Rust server", &["backend"])
+});
+
+pub static SIGN_ERRORS: Lazy<CounterVec> = Lazy::new(|| {
+    CounterVec::new("xhs_sign_errors_total", "Failed signature generations", &["backend"])
+});
+
+pub static CACHE_REQUESTS: Lazy<CounterVec> = Lazy::new(|| {
+    CounterVec::new("xhs_cache_requests_total", "Cache lookups by cache and result (hit / miss)", &["cache", "result"])
+});
+
+/// 记录一次缓存查找
+pub fn record_cache(cache: &str, hit: bool) {
+    CACHE_REQUESTS.inc(&[cache, if hit { "hit" } else { "miss" }]);
+}
+
+/// 单个缓存的命中 / 未命中计数句柄（缓存名固定的调用点放在静态变量中）
+pub struct CacheCounters {
+    hit: Counter,
+    miss: Counter,
+}
+
+impl CacheCounters {
+    pub fn new(cache: &str) -> Self {
+        Self {
+            hit: CACHE_REQUESTS.with_labels(&[cache, "hit"]),
+            miss: CACHE_REQUESTS.with_labels(&[cache, "miss"]),
+        }
+    }
+
+    pub fn record(&self, hit: bool) {
+        if hit { self.hit.inc() } else { self.miss.inc() }
+    }
+}
+
+// ============================================================================
+// Rendering
+// ============================================================================
+
+/// 渲染本进程指标，并合并各 Agent 的指标
+pub async fn render() -> String {
+    let mut out = String::with_capacity(16 * 1024);
+    HTTP_REQUESTS.render(&mut out);
+    HTTP_DURATION.render(&mut out);
+    UPSTREAM_RESPONSES.render(&mut out);
+    SIGN_DURATION.render(&mut out);
+    SIGN_ERRORS.render(&mut out);
+    CACHE_REQUESTS.render(&mut out);
+    render_supervisor(&mut out);
+    render_pool(&mut out);
+    render_downloads(&mut out);
+    render_agents(&mut out).await;
+    out
+}
+
+fn render_supervisor(out: &mut String) {
+    let stats = crate::agent_manager::supervisor_stats();
+    let ready = |state: AgentReadiness| if state == AgentReadiness::Ready { 1.0 } else { 0.0 };
+
+    gauge(out, "xhs_agent_ready", "1 when at least one signing agent is ready", &[(String::new(), ready(stats.readiness))]);
+    let local: Vec<(String, f64)> = stats
+        .agents
+        .iter()
+        .map(|agent| (format!("{{agent=\"{}\"}}", agent.index), ready(agent.readiness)))
+        .collect();
+    gauge(out, "xhs_local_agent_ready", "1 when the local agent is ready", &local);
+    gauge(out, "xhs_agent_breaker_open", "1 while the agent circuit breaker is open", &[(String::new(), if stats.breaker_open { 1.0 } else { 0.0 })]);
+
+    for (name, help, value) in [
+        ("xhs_agent_restarts_total", "Agent restarts by the supervisor", stats.restarts),
+        ("xhs_agent_exits_total", "Unexpected agent process exits", stats.exits),
+        ("xhs_agent_health_failures_total", "Failed agent health checks", stats.health_failures),
+        ("xhs_agent_breaker_opens_total", "Times the agent circuit breaker opened", stats.breaker_opens),
+        ("xhs_agent_fast_failures_total", "Sign calls rejected while the agent was unavailable", stats.fast_failures),
+    ] {
+        header(out, name, help, "counter");
+        let _ = writeln!(out, "{} {}", name, value);
+    }
+}
+
+fn render_pool(out: &mut String) {
+    let stats = pool::shared().stats();
+    let per_endpoint = |value: &dyn Fn(&EndpointStats) -> f64| -> Vec<(String, f64)> {
+        stats
+            .endpoints
+            .iter()
+            .map(|e| (format!("{{endpoint=\"{}\"}}", escape(&e.endpoint)), value(e)))
+            .collect()
+    };
+
+    gauge(out, "xhs_sign_pool_outstanding", "In-flight sign calls per agent endpoint", &per_endpoint(&|e| e.outstanding as f64));
+    gauge(out, "xhs_sign_pool_ejected", "1 while the endpoint is ejected after repeated failures", &per_endpoint(&|e| if e.ejected { 1.0 } else { 0.0 }));
+    header(out, "xhs_sign_pool_requests_total", "Sign calls sent per agent endpoint", "counter");
+    for (labels, value) in per_endpoint(&|e| e.requests as f64) {
+        let _ = writeln!(out, "xhs_sign_pool_requests_total{} {}", labels, value);
+    }
+    header(out, "xhs_sign_pool_failures_total", "Failed sign calls per agent endpoint", "counter");
+    for (labels, value) in per_endpoint(&|e| e.failures as f64) {
+        let _ = writeln!(out, "xhs_sign_pool_failures_total{} {}", labels, value);
+    }
+    for (name, help, value) in [
+        ("xhs_sign_pool_hedged_total", "Sign calls hedged to a second agent", stats.hedged),
+        ("xhs_sign_pool_hedge_wins_total", "Hedged sign calls won by the second agent", stats.hedge_wins),
+        ("xhs_sign_pool_failovers_total", "Sign calls retried on another agent", stats.failovers),
+    ] {
+        header(out, name, help, "counter");
+        let _ = writeln!(out, "{} {}", name, value);
+    }
+}
+
+fn render_downloads(out: &mut String) {
+    let hosts = crate::api::media::hedge::host_stats();
+    let per_host = |value: &dyn Fn(&crate::api::media::hedge::HostStats) -> f64| -> Vec<(String, f64)> {
+        hosts
+            .iter()
+            .map(|h| (format!("{{host=\"{}\"}}", escape(&h.host)), value(h)))
+            .collect()
+    };
+
+    gauge(out, "xhs_cdn_ttfb_seconds", "Time to first byte per CDN host (EWMA)", &per_host(&|h| h.ttfb_ms / 1000.0));
+    gauge(out, "xhs_cdn_throughput_bytes", "Download throughput per CDN host in bytes/s (EWMA)", &per_host(&|h| h.throughput));
+    header(out, "xhs_cdn_failures_total", "Failed requests (connection errors, 5xx) per CDN host", "counter");
+    for (labels, value) in per_host(&|h| h.failures as f64) {
+        let _ = writeln!(out, "xhs_cdn_failures_total{} {}", labels, value);
+    }
+    let (hedged, hedge_wins) = crate::api::media::hedge::hedge_counts();
+    for (name, help, value) in [
+        ("xhs_download_hedged_total", "Downloads hedged to a backup CDN URL", hedged),
+        ("xhs_download_hedge_wins_total", "Downloads finished first by a backup CDN URL", hedge_wins),
+    ] {
+        header(out, name, help, "counter");
+        let _ = writeln!(out, "{} {}", name, value);
+    }
+}
+
+/// 并发抓取各 Agent 的 `/metrics`，加上 `agent` 标签后追加
+async fn render_agents(out: &mut String) {
+    let client = reqwest::Client::new();
+    let mut scrapes = tokio::task::JoinSet::new();
+    for (index, url) in pool::agent_http_urls().into_iter().enumerate() {
+        let client = client.clone();
+        scrapes.spawn(async move {
+            let body = async {
+                client
+                    .get(format!("{}/metrics", url))
+                    .timeout(AGENT_SCRAPE_TIMEOUT)
+                    .send()
+                    .await?
+                    .error_for_status()?
+                    .text()
+                    .await
+            }
+            .await;
+            (index, url, body.ok())
+        });
+    }
+
+    let mut results = Vec::new();
+    while let Some(joined) = scrapes.join_next().await {
+        if let Ok(result) = joined {
+            results.push(result);
+        }
+    }
+    results.sort_by_key(|(index, _, _)| *index);
+
+    let up: Vec<(String, f64)> = results
+        .iter()
+        .map(|(_, url, body)| (format!("{{agent=\"{}\"}}", escape(url)), if body.is_some() { 1.0 } else { 0.0 }))
+        .collect();
+    gauge(out, "xhs_agent_scrape_up", "1 when the agent's /metrics was scraped successfully", &up);
+
+    let mut families = AgentFamilies::default();
+    for (_, url, body) in &results {
+        if let Some(body) = body {
+            families.merge(url, body);
+        }
+    }
+    families.render(out);
+}
+
+/// 合并后的一个指标族：HELP / TYPE 取第一个提供的 Agent，样本按 Agent 顺序排在一起
+#[derive(Default)]
+struct Family {
+    help: Option<String>,
+    kind: Option<String>,
+    samples: Vec<String>,
+}
+
+/// 各 Agent 的指标按族合并：Prometheus 文本格式要求同一族的样本连续出现
+#[derive(Default)]
+struct AgentFamilies {
+    order: Vec<String>,
+    families: HashMap<String, Family>,
+}
+
+impl AgentFamilies {
+    fn family(&mut self, name: &str) -> &mut Family {
+        if !self.families.contains_key(name) {
+            self.order.push(name.to_string());
+        }
+        self.families.entry(name.to_string()).or_default()
+    }
+
+    /// 样本所属的族：histogram / summary 的 `_bucket` / `_sum` / `_count` 归入声明过的族名
+    fn family_of(&self, sample: &str) -> String {
+        if !self.families.contains_key(sample) {
+            for suffix in ["_bucket", "_sum", "_count", "_total", "_created"] {
+                if let Some(base) = sample.strip_suffix(suffix).filter(|base| self.families.contains_key(*base)) {
+                    return base.to_string();
+                }
+            }
+        }
+        sample.to_string()
+    }
+
+    /// 解析一个 Agent 的指标，给每个样本加上 `agent` 标签
+    fn merge(&mut self, agent: &str, body: &str) {
+        let agent_label = format!("agent=\"{}\"", escape(agent));
+        for line in body.lines().map(str::trim_end).filter(|l| !l.is_empty()) {
+            if let Some(rest) = line.strip_prefix("# HELP ") {
+                if let Some((name, help)) = rest.split_once(' ') {
+                    self.family(name).help.get_or_insert_with(|| help.to_string());
+                }
+                continue;
+            }
+            if let Some(rest) = line.strip_prefix("# TYPE ") {
+                if let Some((name, kind)) = rest.split_once(' ') {
+                    self.family(name).kind.get_or_insert_with(|| kind.to_string());
+                }
+                continue;
+            }
+            if line.starts_with('#') {
+                continue;
+            }
+            let Some(i) = line.find(|c: char| c == '{' || c == ' ') else { continue };
+            let name = &line[..i];
+            let sample = if line.as_bytes()[i] == b'{' {
+                let rest = &line[i + 1..];
+                let sep = if rest.starts_with('}') { "" } else { "," };
+                format!("{}{{{}{}{}", name, agent_label, sep, rest)
+            } else {
+                format!("{}{{{}}}{}", name, agent_label, &line[i..])
+            };
+            let family = self.family_of(name);
+            self.family(&family).samples.push(sample);
+        }
+    }
+
+    fn render(&self, out: &mut String) {
+        for name in &self.order {
+            let family = &self.families[name];
+            if let Some(help) = &family.help {
+                let _ = writeln!(out, "# HELP {} {}", name, help);
+            }
+            if let Some(kind) = &family.kind {
+                let _ = writeln!(out, "# TYPE {} {}", name, kind);
+            }
+            for sample in &family.samples {
+                out.push_str(sample);
+                out.push('\n');
+            }
+        }
+    }
+}
+
+/// axum 中间件：按路由模板统计请求数与延迟
+pub async fn track_http(request: axum::extract::Request, next: axum::middleware::Next) -> axum::response::Response {
+    let route = request
+        .extensions()
+        .get::<axum::extract::MatchedPath>()
+        .map(|path| path.as_str().to_owned())
+        .unwrap_or_else(|| "unmatched".to_owned());
+    let method = request.method().clone();
+    let started = Instant::now();
+
+    let response = next.run(request).await;
+
+    HTTP_DURATION.observe_since(&[route.as_str()], started);
+    HTTP_REQUESTS.inc(&[route.as_str(), method.as_str(), response.status().as_str()]);
+    response
+}
+
+/// `GET /metrics`：Prometheus 文本格式
+pub async fn metrics_handler() -> impl axum::response::IntoResponse {
+    (
+        [(axum::http::header::CONTENT_TYPE, "text/plain; version=0.0.4; charset=utf-8")],
+        render().await,
+    )
+}
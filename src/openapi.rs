@@ -24,8 +24,10 @@ use crate::{
     api::note::detail::{NoteDetailRequest, NoteDetailResponse},
     api::media::{
         video::{VideoRequest, VideoResponse, VideoData, VideoItem},
+        probe::VideoProbe,
         images::{ImagesRequest, ImagesResponse, ImagesData, ImageItem},
         download::{DownloadRequest, DownloadResponse, DownloadData},
+        jobs::{JobRequest, JobNote, JobResponse, JobStatus, JobState, JobItem, ItemState},
     },
     handlers::search as search_handlers,
     handlers::auth as auth_handlers,
@@ -58,6 +60,9 @@ use crate::{
         media_handlers::video_handler,
         media_handlers::images_handler,
         media_handlers::download_handler,
+        media_handlers::submit_job_handler,
+        media_handlers::job_status_handler,
+        media_handlers::job_events_handler,
     ),
     components(
         schemas(
@@ -74,9 +79,10 @@ use crate::{
             LikesResponse, LikesData,
             HomefeedRequest, HomefeedResponse, HomefeedData, HomefeedItem, NoteCard, NoteUser, NoteCover, CoverImageInfo, InteractInfo, NoteVideo, VideoCapa,
             NoteDetailRequest, NoteDetailResponse,
-            VideoRequest, VideoResponse, VideoData, VideoItem,
+            VideoRequest, VideoResponse, VideoData, VideoItem, VideoProbe,
             ImagesRequest, ImagesResponse, ImagesData, ImageItem,
-            DownloadRequest, DownloadResponse, DownloadData
+            DownloadRequest, DownloadResponse, DownloadData,
+            JobRequest, JobNote, JobResponse, JobStatus, JobState, JobItem, ItemState
         )
     ),
     tags(
@@ -84,7 +90,7 @@ use crate::{
         (name = "auth", description = "认证相关"),
         (name = "Feed", description = "主页发现频道：recommend(推荐)、fashion(穿搭)、food(美食)、cosmetics(彩妆)、movie_and_tv(影视)、career(职场)、love(情感)、household_product(家居)、gaming(游戏)、travel(旅行)、fitness(健身)"),
         (name = "Note", description = "笔记相关接口：detail(详情)、page(评论)、video(视频地址)"),
-        (name = "Media", description = "媒体文件操作：video(视频地址解析)、images(图片地址解析)、download(通用媒体下载)"),
+        (name = "Media", description = "媒体文件操作：video(视频地址解析)、images(图片地址解析)、download(通用媒体下载)、jobs(批量下载任务)"),
         (name = "Search", description = "搜索相关接口：notes(笔记)、usersearch(用户)、onebox(聚合)、recommend(推荐)、filter(筛选)")
     )
 )]
@@ -4,6 +4,7 @@
 //! All handlers are delegated to the `handlers` module.
 
 use axum::{
+    middleware::from_fn,
     routing::{get, post},
     Router,
 };
@@ -52,16 +53,19 @@ pub async fn start_server() -> anyhow::Result<()> {
     
     let state = Arc::new(AppState { api, auth, guest_cookies, qrcode_info });
 
+    // Keep a guest cookie set ready so guest-init rarely waits on Playwright
+    api::login::spawn_guest_cookie_prewarm();
+
     let app = Router::new()
         // Swagger UI
         .merge(SwaggerUi::new("/swagger-ui").url("/api-docs/openapi.json", ApiDoc::openapi()))
         
         // Search routes
-        .route("/api/search/trending", get(handlers::query_trending_handler))
-        .route("/api/search/recommend", get(handlers::search_recommend_handler))
+        .route("/api/search/trending", get(handlers::query_trending_handler).layer(from_fn(api::cache::conditional)))
+        .route("/api/search/recommend", get(handlers::search_recommend_handler).layer(from_fn(api::cache::conditional)))
         .route("/api/search/notes", post(handlers::search_notes_handler))
-        .route("/api/search/onebox", post(handlers::search_onebox_handler))
-        .route("/api/search/filter", get(handlers::search_filter_handler))
+        .route("/api/search/onebox", post(handlers::search_onebox_handler).layer(from_fn(api::cache::conditional)))
+        .route("/api/search/filter", get(handlers::search_filter_handler).layer(from_fn(api::cache::conditional)))
         .route("/api/search/usersearch", post(handlers::search_user_handler))
         
         // User routes
@@ -84,17 +88,26 @@ pub async fn start_server() -> anyhow::Result<()> {
         .route("/api/note/video", post(handlers::video_handler))
         .route("/api/note/images", post(handlers::images_handler))
         .route("/api/media/download", post(handlers::download_handler))
+        .route("/api/media/jobs", post(handlers::submit_job_handler))
+        .route("/api/media/jobs/:job_id", get(handlers::job_status_handler))
+        .route("/api/media/jobs/:job_id/events", get(handlers::job_events_handler))
         
         // Auth routes
         .route("/api/auth/guest-init", post(handlers::guest_init_handler))
         .route("/api/auth/qrcode/create", post(handlers::create_qrcode_handler))
         .route("/api/auth/qrcode/status", get(handlers::poll_qrcode_status_handler))
+
+        // Metrics (Rust server + merged agent metrics)
+        .route("/metrics", get(crate::metrics::metrics_handler))
         
         // Middleware
+        .layer(axum::middleware::from_fn(crate::metrics::track_http))
+        .layer(axum::middleware::from_fn(crate::timing::track_request))
         .layer(CorsLayer::new()
             .allow_origin(Any)
             .allow_methods(Any)
-            .allow_headers(Any))
+            .allow_headers(Any)
+            .expose_headers(Any))
         .layer(tower_http::trace::TraceLayer::new_for_http())
         .with_state(state);
 
@@ -0,0 +1,149 @@
+//! 签名微批处理 (Sign Micro-Batching)
+//!
+//! 并发的 Handler 各自需要一次签名，逐个调用 Agent 的 `/sign` 会产生 N 次
+//! Agent 往返。`SignBatcher` 把同时排队的签名请求合并为一次批量调用
+//! （HTTP `/sign/batch` 或 UDS `sign_batch` 帧），再按顺序把结果分发回各个调用方。
+//!
+//! - 没有批次在途时立即发送已排队的请求，单个请求不等待窗口
+//! - 已有批次在途时才在窗口内继续收集（反正要等 Agent），负载越高批次越大
+//! - 批次只有 1 个请求时 HTTP 直接走 `/sign`，不引入额外开销
+//! - 批次达到 `max_size` 时立即发送，不等待窗口结束
+//! - 批次发送在独立 task 中进行，收集下一批不会被上一批阻塞
+
+use anyhow::{Result, anyhow};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Arc;
+use std::time::Duration;
+use tokio::sync::{mpsc, oneshot};
+
+use super::pool::AgentPool;
+use super::{SignRequest, SignResponse};
+
+/// 批处理队列容量（超过后调用方在 send 处等待）
+const QUEUE_CAPACITY: usize = 1024;
+
+/// 批处理配置
+#[derive(Debug, Clone)]
+pub struct BatchConfig {
+    /// 已有批次在途时的收集窗口，为 0 时关闭批处理
+    pub window: Duration,
+    /// 单批最大请求数
+    pub max_size: usize,
+}
+
+impl BatchConfig {
+    /// 从环境变量读取配置
+    ///
+    /// - `XHS_SIGN_BATCH_WINDOW_MS`: 收集窗口（毫秒，默认 2，0 表示关闭）
+    /// - `XHS_SIGN_BATCH_MAX`: 单批最大请求数（默认 32）
+    pub fn from_env() -> Self {
+        let window_ms = std::env::var("XHS_SIGN_BATCH_WINDOW_MS")
+            .ok()
+            .and_then(|v| v.parse::<u64>().ok())
+            .unwrap_or(2);
+        let max_size = std::env::var("XHS_SIGN_BATCH_MAX")
+            .ok()
+            .and_then(|v| v.parse::<usize>().ok())
+            .filter(|n| *n > 0)
+            .unwrap_or(32);
+        Self {
+            window: Duration::from_millis(window_ms),
+            max_size,
+        }
+    }
+
+    /// 是否启用批处理
+    pub fn enabled(&self) -> bool {
+        !self.window.is_zero() && self.max_size > 1
+    }
+}
+
+/// 等待签名结果的请求
+struct PendingSign {
+    request: SignRequest,
+    reply: oneshot::Sender<Result<SignResponse>>,
+}
+
+/// 签名微批处理器
+pub struct SignBatcher {
+    tx: mpsc::Sender<PendingSign>,
+}
+
+impl SignBatcher {
+    /// 启动批处理后台任务（需在 tokio runtime 内调用）
+    pub fn spawn(pool: Arc<AgentPool>, config: BatchConfig) -> Self {
+        let (tx, rx) = mpsc::channel(QUEUE_CAPACITY);
+        tokio::spawn(run(rx, pool, config));
+        Self { tx }
+    }
+
+    /// 提交一个签名请求并等待其结果
+    pub async fn submit(&self, request: SignRequest) -> Result<SignResponse> {
+        let (reply, rx) = oneshot::channel();
+        self.tx
+            .send(PendingSign { request, reply })
+            .await
+            .map_err(|_| anyhow!("Sign batcher stopped"))?;
+        rx.await.map_err(|_| anyhow!("Sign batcher dropped request"))?
+    }
+}
+
+/// 批处理主循环：收集 → 分发
+async fn run(
+    mut rx: mpsc::Receiver<PendingSign>,
+    pool: Arc<AgentPool>,
+    config: BatchConfig,
+) {
+    let in_flight = Arc::new(AtomicUsize::new(0));
+    while let Some(first) = rx.recv().await {
+        let mut batch = vec![first];
+        // 先取走已经排队的请求
+        while batch.len() < config.max_size {
+            match rx.try_recv() {
+                Ok(pending) => batch.push(pending),
+                Err(_) => break,
+            }
+        }
+
+        // 只有在途批次占着 Agent 时才等待窗口，空闲时立即发送
+        if in_flight.load(Ordering::Acquire) > 0 {
+            let deadline = tokio::time::Instant::now() + config.window;
+            while batch.len() < config.max_size {
+                match tokio::time::timeout_at(deadline, rx.recv()).await {
+                    Ok(Some(pending)) => batch.push(pending),
+                    // 通道关闭或窗口结束
+                    Ok(None) | Err(_) => break,
+                }
+            }
+        }
+
+        in_flight.fetch_add(1, Ordering::AcqRel);
+        tokio::spawn(dispatch(pool.clone(), batch, in_flight.clone()));
+    }
+}
+
+/// 发送一批请求并把结果按顺序分发给调用方
+async fn dispatch(pool: Arc<AgentPool>, batch: Vec<PendingSign>, in_flight: Arc<AtomicUsize>) {
+    let (requests, replies): (Vec<_>, Vec<_>) = batch
+        .into_iter()
+        .map(|p| (p.request, p.reply))
+        .unzip();
+
+    tracing::debug!("[SignBatcher] Dispatching {} sign request(s)", requests.len());
+
+    let result = pool.sign_batch(&requests).await;
+    in_flight.fetch_sub(1, Ordering::AcqRel);
+    match result {
+        Ok(results) => {
+            for (reply, result) in replies.into_iter().zip(results) {
+                let _ = reply.send(Ok(result));
+            }
+        }
+        Err(e) => {
+            let msg = e.to_string();
+            for reply in replies {
+                let _ = reply.send(Err(anyhow!("{}", msg)));
+            }
+        }
+    }
+}
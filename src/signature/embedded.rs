@@ -0,0 +1,279 @@
+//! 进程内签名 (Embedded In-Process Signing)
+//!
+//! 单机部署时可以不经过 Agent：Rust 进程内嵌 Python 解释器，直接调用
+//! `scripts/xhs_agent/signing.py` 中与 Agent 相同的签名函数，省去回环 HTTP、
+//! JSON 编解码以及签名进程的监督。
+//!
+//! - 编译：`cargo build --features embedded-signer`（依赖 pyo3）
+//! - 启用：`XHS_SIGN_BACKEND=embedded`；初始化失败时记录错误并回退到 Agent
+//! - `XHS_EMBEDDED_SIGN_THREADS`: 签名线程数（默认 1）。xhshow 是纯 Python，
+//!   持有 GIL 计算，多线程不会带来并行，只用于隔离慢请求
+//!
+//! 所有 GIL 操作都在专用线程上执行，tokio 工作线程只等待 oneshot 结果；解释器初始化
+//! 同样在后台线程上进行（[`prewarm`]），完成前签名请求走 Agent。
+//! Cookie 派生的 a1 / x-s-common 按 Cookie 指纹在本地缓存（同 [`super::session`]），
+//! 每组 Cookie 只计算一次。
+//!
+//! 注意：登录流程所需的 Playwright 接口（`/guest-cookies` 等）仍由 Agent 提供。
+
+use anyhow::{Result, anyhow};
+use once_cell::sync::Lazy;
+use pyo3::prelude::*;
+use pyo3::types::{PyDict, PyList};
+use serde_json::Value;
+use std::collections::HashMap;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::mpsc;
+use std::sync::{Arc, Mutex};
+use tokio::sync::oneshot;
+
+use super::session::{SessionCache, fingerprint};
+use super::SignResponse;
+
+/// 本地最多缓存的 Cookie 派生状态数，超过后整体清空
+const MAX_SESSIONS: usize = 1024;
+
+/// Cookie 指纹 → (a1, x-s-common)
+type SessionMemo = Mutex<HashMap<u64, (String, String)>>;
+
+/// 一次签名任务
+struct Job {
+    method: String,
+    uri: String,
+    cookies: HashMap<String, String>,
+    payload: Option<Value>,
+    reply: oneshot::Sender<Result<SignResponse>>,
+}
+
+static SIGNER: Lazy<Option<EmbeddedSigner>> = Lazy::new(|| {
+    if !enabled() {
+        return None;
+    }
+    match EmbeddedSigner::start() {
+        Ok(signer) => Some(signer),
+        Err(e) => {
+            tracing::error!("[EmbeddedSigner] Failed to start, falling back to Agent: {}", e);
+            None
+        }
+    }
+});
+
+/// 后台初始化是否已启动
+static INIT_STARTED: AtomicBool = AtomicBool::new(false);
+
+/// 是否通过环境变量选择了进程内签名
+pub fn enabled() -> bool {
+    std::env::var("XHS_SIGN_BACKEND")
+        .map(|v| v.eq_ignore_ascii_case("embedded"))
+        .unwrap_or(false)
+}
+
+/// 在后台线程上初始化解释器并导入 xhshow（幂等，未启用时不做任何事）
+pub fn prewarm() {
+    if !enabled() || INIT_STARTED.swap(true, Ordering::SeqCst) {
+        return;
+    }
+    let spawned = std::thread::Builder::new()
+        .name("embedded-signer-init".to_string())
+        .spawn(|| {
+            Lazy::force(&SIGNER);
+        });
+    if let Err(e) = spawned {
+        tracing::error!("[EmbeddedSigner] Failed to spawn init thread, using Agent: {}", e);
+    }
+}
+
+/// 获取已初始化的进程内签名器（未启用、初始化中或初始化失败时为 `None`，调用方回退到 Agent）
+///
+/// 从不阻塞调用线程：初始化尚未开始时在后台启动（见 [`prewarm`]）。
+pub fn shared() -> Option<&'static EmbeddedSigner> {
+    match Lazy::get(&SIGNER) {
+        Some(signer) => signer.as_ref(),
+        None => {
+            prewarm();
+            None
+        }
+    }
+}
+
+/// 进程内签名器
+pub struct EmbeddedSigner {
+    tx: Mutex<mpsc::Sender<Job>>,
+}
+
+impl EmbeddedSigner {
+    /// 初始化解释器、导入签名模块并启动签名线程
+    fn start() -> Result<Self> {
+        let scripts = crate::agent_manager::project_root()?.join("scripts");
+        let started = std::time::Instant::now();
+
+        // 在这里导入并创建 Xhshow 实例，让缺少依赖等问题在启动时暴露，而不是首个请求
+        Python::with_gil(|py| -> PyResult<()> {
+            let sys = py.import_bound("sys")?;
+            sys.getattr("path")?
+                .call_method1("insert", (0, scripts.to_string_lossy().into_owned()))?;
+            py.import_bound("xhs_agent.signing")?.call_method0("get_client")?;
+            Ok(())
+        })
+        .map_err(|e| anyhow!("Failed to load xhs_agent.signing from {:?}: {}", scripts, e))?;
+
+        let threads = std::env::var("XHS_EMBEDDED_SIGN_THREADS")
+            .ok()
+            .and_then(|v| v.parse::<usize>().ok())
+            .unwrap_or(1)
+            .max(1);
+        let memo_enabled = SessionCache::from_env().enabled();
+        let memo: Arc<SessionMemo> = Arc::new(Mutex::new(HashMap::new()));
+        let (tx, rx) = mpsc::channel::<Job>();
+        let rx = Arc::new(Mutex::new(rx));
+
+        for index in 0..threads {
+            let rx = rx.clone();
+            let memo = memo_enabled.then(|| memo.clone());
+            std::thread::Builder::new()
+                .name(format!("py-sign-{}", index))
+                .spawn(move || worker(rx, memo))?;
+        }
+
+        tracing::info!(
+            "[EmbeddedSigner] Ready with {} signing thread(s) in {:?}",
+            threads,
+            started.elapsed()
+        );
+        Ok(Self { tx: Mutex::new(tx) })
+    }
+
+    /// 在签名线程上生成签名，返回与 Agent 相同的 `SignResponse`
+    pub async fn sign(
+        &self,
+        method: &str,
+        uri: &str,
+        cookies: &HashMap<String, String>,
+        payload: Option<&Value>,
+    ) -> Result<SignResponse> {
+        let (reply, rx) = oneshot::channel();
+        self.tx
+            .lock()
+            .unwrap()
+            .send(Job {
+                method: method.to_uppercase(),
+                uri: uri.to_string(),
+                cookies: cookies.clone(),
+                payload: payload.cloned(),
+                reply,
+            })
+            .map_err(|_| anyhow!("Embedded signer stopped"))?;
+        rx.await.map_err(|_| anyhow!("Embedded signer dropped request"))?
+    }
+}
+
+/// 签名线程：逐个取任务，在 GIL 内完成签名
+fn worker(rx: Arc<Mutex<mpsc::Receiver<Job>>>, memo: Option<Arc<SessionMemo>>) {
+    loop {
+        let job = match rx.lock().unwrap().recv() {
+            Ok(job) => job,
+            Err(_) => return,
+        };
+        let result = Python::with_gil(|py| sign_in_python(py, &job, memo.as_deref()))
+            .map_err(|e| anyhow!("Embedded signing failed: {}", e));
+        let _ = job.reply.send(result);
+    }
+}
+
+/// 组装与 Agent 相同的请求字典，调用 `signing.sign_request`
+fn sign_in_python(py: Python<'_>, job: &Job, memo: Option<&SessionMemo>) -> PyResult<SignResponse> {
+    let signing = py.import_bound("xhs_agent.signing")?;
+
+    let request = PyDict::new_bound(py);
+    request.set_item("method", &job.method)?;
+    request.set_item("uri", &job.uri)?;
+    if let Some(payload) = &job.payload {
+        request.set_item("payload", json_to_py(py, payload)?)?;
+        request.set_item("return_body", true)?;
+    }
+
+    match memo.filter(|_| job.cookies.contains_key("a1")) {
+        Some(memo) => {
+            let (a1, x_s_common) = derive_session(&signing, memo, &job.cookies)?;
+            request.set_item("a1", a1)?;
+            request.set_item("x_s_common", x_s_common)?;
+        }
+        None => request.set_item("cookies", &job.cookies)?,
+    }
+
+    let result = signing.call_method1("sign_request", (request,))?;
+    let result = result.downcast::<PyDict>()?;
+    Ok(SignResponse {
+        success: get_item(result, "success")?.unwrap_or(false),
+        x_s: get_item(result, "x_s")?,
+        x_t: get_item(result, "x_t")?,
+        x_s_common: get_item(result, "x_s_common")?,
+        x_b3_traceid: get_item(result, "x_b3_traceid")?,
+        x_xray_traceid: get_item(result, "x_xray_traceid")?,
+        error: get_item(result, "error")?,
+        error_code: None,
+        body: get_item(result, "body")?,
+    })
+}
+
+/// 每组 Cookie 只调用一次 `signing.derive_session`
+fn derive_session(
+    signing: &Bound<'_, PyModule>,
+    memo: &SessionMemo,
+    cookies: &HashMap<String, String>,
+) -> PyResult<(String, String)> {
+    let key = fingerprint(cookies);
+    if let Some(state) = memo.lock().unwrap().get(&key) {
+        return Ok(state.clone());
+    }
+
+    let derived = signing.call_method1("derive_session", (cookies.clone(),))?;
+    let derived = derived.downcast::<PyDict>()?;
+    let state: (String, String) = (
+        get_item(derived, "a1")?.unwrap_or_default(),
+        get_item(derived, "x_s_common")?.unwrap_or_default(),
+    );
+
+    let mut memo = memo.lock().unwrap();
+    if memo.len() >= MAX_SESSIONS {
+        memo.clear();
+    }
+    memo.insert(key, state.clone());
+    Ok(state)
+}
+
+/// 读取可选字段（缺失或 None 时为 `None`）
+fn get_item<'py, T: FromPyObject<'py>>(dict: &Bound<'py, PyDict>, key: &str) -> PyResult<Option<T>> {
+    match dict.get_item(key)? {
+        Some(value) if !value.is_none() => value.extract().map(Some),
+        _ => Ok(None),
+    }
+}
+
+/// serde_json 值 → Python 对象（保持对象键顺序，签名 body 与 Agent 模式逐字节一致）
+fn json_to_py(py: Python<'_>, value: &Value) -> PyResult<PyObject> {
+    Ok(match value {
+        Value::Null => py.None(),
+        Value::Bool(b) => b.into_py(py),
+        Value::Number(n) => match (n.as_i64(), n.as_u64()) {
+            (Some(i), _) => i.into_py(py),
+            (None, Some(u)) => u.into_py(py),
+            _ => n.as_f64().unwrap_or_default().into_py(py),
+        },
+        Value::String(s) => s.into_py(py),
+        Value::Array(items) => {
+            let list = PyList::empty_bound(py);
+            for item in items {
+                list.append(json_to_py(py, item)?)?;
+            }
+            list.into_py(py)
+        }
+        Value::Object(map) => {
+            let dict = PyDict::new_bound(py);
+            for (key, item) in map {
+                dict.set_item(key, json_to_py(py, item)?)?;
+            }
+            dict.into_py(py)
+        }
+    })
+}
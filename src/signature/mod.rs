@@ -5,24 +5,75 @@
 //! 2. **浏览器捕获 (Browser Capture)**: 从 MongoDB 读取之前通过 Playwright 捕获的签名（兜底）
 //!
 //! 默认优先使用纯算法，失败时自动降级到浏览器捕获。
+//!
+//! 并发的签名请求会在短时间窗口内合并为一次批量调用（见 [`batch`]），
+//! 传输方式可选 HTTP 或 Unix Domain Socket（见 [`transport`]），
+//! 请求在一个或多个 Agent 之间负载均衡（见 [`pool`]）。
+//! 每组 Cookie 只注册一次，之后按会话句柄签名（见 [`session`]）。
+//!
+//! POST 请求由 Agent 同时返回被签名的 body 字符串（`return_body`），
+//! 调用方原样发送，保证签名内容与实际请求体一致，Rust 侧也不再重复序列化。
+//!
+//! 编译 `embedded-signer` feature 并设置 `XHS_SIGN_BACKEND=embedded` 时，
+//! 签名在进程内完成，不经过 Agent（见 `embedded` 模块）。
+
+pub mod batch;
+#[cfg(feature = "embedded-signer")]
+pub mod embedded;
+pub mod pool;
+pub mod session;
+pub mod transport;
 
 use anyhow::{Result, anyhow};
+use once_cell::sync::{Lazy, OnceCell};
 use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
+use std::sync::Arc;
+
+use batch::{BatchConfig, SignBatcher};
+use pool::AgentPool;
+use session::SessionCache;
+
+/// 某个签名后端的指标句柄（避免每次签名按标签查找序列）
+struct SignMetrics {
+    duration: Arc<crate::metrics::Histogram>,
+    errors: crate::metrics::Counter,
+}
+
+impl SignMetrics {
+    fn new(backend: &str) -> Self {
+        Self {
+            duration: crate::metrics::SIGN_DURATION.with_labels(&[backend]),
+            errors: crate::metrics::SIGN_ERRORS.with_labels(&[backend]),
+        }
+    }
+}
 
-/// Agent 服务配置
-const AGENT_URL: &str = "http://127.0.0.1:8765";
+static AGENT_SIGN_METRICS: Lazy<SignMetrics> = Lazy::new(|| SignMetrics::new("agent"));
+#[cfg(feature = "embedded-signer")]
+static EMBEDDED_SIGN_METRICS: Lazy<SignMetrics> = Lazy::new(|| SignMetrics::new("embedded"));
 
 /// 签名请求结构
 #[derive(Debug, Serialize)]
 pub struct SignRequest {
     pub method: String,
     pub uri: String,
+    /// 使用会话句柄时为空
+    #[serde(skip_serializing_if = "HashMap::is_empty")]
     pub cookies: HashMap<String, String>,
+    /// Agent 会话句柄（见 [`session`]）
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub session_id: Option<String>,
     #[serde(skip_serializing_if = "Option::is_none")]
     pub params: Option<serde_json::Value>,
     #[serde(skip_serializing_if = "Option::is_none")]
     pub payload: Option<serde_json::Value>,
+    /// 要求 Agent 返回被签名的 body 字符串
+    #[serde(skip_serializing_if = "std::ops::Not::not")]
+    pub return_body: bool,
+    /// 发起签名的 HTTP 请求 ID（见 [`crate::timing`]），Agent 日志中据此关联
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub request_id: Option<String>,
 }
 
 /// 签名响应结构
@@ -35,6 +86,51 @@ pub struct SignResponse {
     pub x_b3_traceid: Option<String>,
     pub x_xray_traceid: Option<String>,
     pub error: Option<String>,
+    /// 如 `unknown_session`：句柄已失效，需重新注册
+    #[serde(default)]
+    pub error_code: Option<String>,
+    /// 被签名的 POST body（请求时 `return_body = true`）
+    #[serde(default)]
+    pub body: Option<String>,
+}
+
+impl SignResponse {
+    /// 转换为请求构建使用的 `Signature`（Agent 与进程内签名共用）
+    fn into_signature(self, payload: Option<&serde_json::Value>) -> Result<Signature> {
+        if !self.success {
+            return Err(anyhow!(
+                "Agent signing failed: {}",
+                self.error.unwrap_or_else(|| "Unknown error".to_string())
+            ));
+        }
+
+        // 旧版 Agent 不返回 body 时退回本地序列化
+        let body = match self.body {
+            Some(body) => Some(body),
+            None => payload.map(serde_json::to_string).transpose()?,
+        };
+
+        Ok(Signature {
+            x_s: self.x_s.unwrap_or_default(),
+            x_t: self.x_t.unwrap_or_default(),
+            x_s_common: self.x_s_common.unwrap_or_default(),
+            x_b3_traceid: self.x_b3_traceid.unwrap_or_default(),
+            x_xray_traceid: self.x_xray_traceid.unwrap_or_default(),
+            body,
+        })
+    }
+}
+
+/// 批量签名请求结构 (`POST /sign/batch`)
+#[derive(Debug, Serialize)]
+pub struct BatchSignRequest<'a> {
+    pub requests: &'a [SignRequest],
+}
+
+/// 批量签名响应结构（与请求顺序一致）
+#[derive(Debug, Deserialize)]
+pub struct BatchSignResponse {
+    pub results: Vec<SignResponse>,
 }
 
 /// 签名结果（用于请求构建）
@@ -45,18 +141,33 @@ pub struct Signature {
     pub x_s_common: String,
     pub x_b3_traceid: String,
     pub x_xray_traceid: String,
+    /// POST 请求体：与签名内容逐字节一致，应原样发送
+    pub body: Option<String>,
 }
 
 /// 签名服务 - 提供签名获取的统一接口
 pub struct SignatureService {
     client: reqwest::Client,
+    pool: Arc<AgentPool>,
+    batch_config: BatchConfig,
+    /// 首次签名时在 tokio runtime 内惰性启动
+    batcher: OnceCell<SignBatcher>,
+    sessions: SessionCache,
 }
 
 impl SignatureService {
     /// 创建签名服务实例
     pub fn new() -> Self {
+        #[cfg(not(feature = "embedded-signer"))]
+        warn_embedded_unavailable();
+
+        let client = reqwest::Client::new();
         Self {
-            client: reqwest::Client::new(),
+            pool: pool::shared(),
+            client,
+            batch_config: BatchConfig::from_env(),
+            batcher: OnceCell::new(),
+            sessions: SessionCache::from_env(),
         }
     }
 
@@ -69,7 +180,7 @@ impl SignatureService {
     /// * `payload` - POST 请求体 (可选)
     ///
     /// # Returns
-    /// 生成的签名或错误
+    /// 生成的签名或错误；有 payload 时 `Signature::body` 为应发送的请求体
     pub async fn get_signature_from_agent(
         &self,
         method: &str,
@@ -77,50 +188,107 @@ impl SignatureService {
         cookies: HashMap<String, String>,
         payload: Option<serde_json::Value>,
     ) -> Result<Signature> {
+        let metrics = Self::backend_metrics();
+        let started = std::time::Instant::now();
+        let result = self.sign_with_backend(method, uri, cookies, payload).await;
+
+        metrics.duration.observe_since(started);
+        if result.is_err() {
+            metrics.errors.inc();
+        }
+        result
+    }
+
+    /// 当前签名后端的指标句柄
+    fn backend_metrics() -> &'static SignMetrics {
+        #[cfg(feature = "embedded-signer")]
+        {
+            if embedded::shared().is_some() {
+                return &EMBEDDED_SIGN_METRICS;
+            }
+        }
+        &AGENT_SIGN_METRICS
+    }
+
+    /// 进程内签名或经 Agent 签名
+    async fn sign_with_backend(
+        &self,
+        method: &str,
+        uri: &str,
+        cookies: HashMap<String, String>,
+        payload: Option<serde_json::Value>,
+    ) -> Result<Signature> {
+        #[cfg(feature = "embedded-signer")]
+        {
+            if let Some(signer) = embedded::shared() {
+                tracing::debug!("[SignatureService] Signing in-process: {} {}", method, uri);
+                return signer
+                    .sign(method, uri, &cookies, payload.as_ref())
+                    .await?
+                    .into_signature(payload.as_ref());
+            }
+        }
+
+        // Agent 启动/重启中时短暂排队；不可用（熔断打开）时快速失败
+        crate::agent_manager::ensure_agent_available().await?;
+
+        tracing::debug!("[SignatureService] Calling Agent: {} {}", method, uri);
+
+        let session_id = self.sessions.handle_for(&self.pool, &cookies).await;
         let request = SignRequest {
             method: method.to_uppercase(),
             uri: uri.to_string(),
-            cookies,
+            cookies: if session_id.is_some() { HashMap::new() } else { cookies.clone() },
+            session_id,
             params: None,
-            payload,
+            payload: payload.clone(),
+            return_body: payload.is_some(),
+            request_id: crate::timing::request_id(),
         };
+        let mut sign_resp = self.dispatch(request).await?;
 
-        let url = format!("{}/sign", AGENT_URL);
-        
-        tracing::debug!("[SignatureService] Calling Agent: {} {}", method, uri);
-        
-        let response = self.client
-            .post(&url)
-            .json(&request)
-            .timeout(std::time::Duration::from_secs(5))
-            .send()
-            .await
-            .map_err(|e| anyhow!("Agent connection failed: {}. Is agent_server.py running?", e))?;
-
-        let sign_resp: SignResponse = response
-            .json()
-            .await
-            .map_err(|e| anyhow!("Failed to parse Agent response: {}", e))?;
-
-        if !sign_resp.success {
-            return Err(anyhow!(
-                "Agent signing failed: {}",
-                sign_resp.error.unwrap_or_else(|| "Unknown error".to_string())
-            ));
+        // Agent 重启或淘汰了句柄：作废本地句柄，带完整 Cookie 重试一次
+        if sign_resp.error_code.as_deref() == Some("unknown_session") {
+            tracing::debug!("[SignatureService] Sign session expired, retrying with cookies");
+            self.sessions.invalidate(&cookies);
+            sign_resp = self
+                .dispatch(SignRequest {
+                    method: method.to_uppercase(),
+                    uri: uri.to_string(),
+                    cookies,
+                    session_id: None,
+                    params: None,
+                    payload: payload.clone(),
+                    return_body: payload.is_some(),
+                    request_id: crate::timing::request_id(),
+                })
+                .await?;
         }
 
-        Ok(Signature {
-            x_s: sign_resp.x_s.unwrap_or_default(),
-            x_t: sign_resp.x_t.unwrap_or_default(),
-            x_s_common: sign_resp.x_s_common.unwrap_or_default(),
-            x_b3_traceid: sign_resp.x_b3_traceid.unwrap_or_default(),
-            x_xray_traceid: sign_resp.x_xray_traceid.unwrap_or_default(),
-        })
+        sign_resp.into_signature(payload.as_ref())
+    }
+
+    /// 发送一次签名请求（启用时经过微批处理）
+    async fn dispatch(&self, request: SignRequest) -> Result<SignResponse> {
+        let result = if self.batch_config.enabled() {
+            let batcher = self.batcher.get_or_init(|| {
+                SignBatcher::spawn(self.pool.clone(), self.batch_config.clone())
+            });
+            batcher.submit(request).await
+        } else {
+            self.pool
+                .sign_batch(std::slice::from_ref(&request))
+                .await
+                .map(|mut responses| responses.remove(0))
+        };
+        // 只有传输层失败计入熔断；签名本身失败说明 Agent 仍在正常响应
+        crate::agent_manager::record_agent_call(result.is_ok());
+        result
     }
 
     /// 检查 Agent 是否可用
     pub async fn is_agent_available(&self) -> bool {
-        let url = format!("{}/health", AGENT_URL);
+        let url = format!("{}/health", pool::agent_http_url());
         match self.client.get(&url).timeout(std::time::Duration::from_secs(2)).send().await {
             Ok(resp) => resp.status().is_success(),
             Err(_) => false,
@@ -144,3 +312,17 @@ pub fn parse_cookie_string(cookie_str: &str) -> HashMap<String, String> {
     }
     cookies
 }
+
+/// 要求进程内签名但未编译 `embedded-signer` feature 时提示一次
+#[cfg(not(feature = "embedded-signer"))]
+fn warn_embedded_unavailable() {
+    static WARNED: std::sync::Once = std::sync::Once::new();
+    let requested = std::env::var("XHS_SIGN_BACKEND")
+        .map(|v| v.eq_ignore_ascii_case("embedded"))
+        .unwrap_or(false);
+    if requested {
+        WARNED.call_once(|| {
+            tracing::warn!("[SignatureService] XHS_SIGN_BACKEND=embedded requires the `embedded-signer` feature, using the Agent");
+        });
+    }
+}
@@ -0,0 +1,416 @@
+//! 签名 Agent 池 (Signing Agent Pool)
+//!
+//! 签名请求在多个 Agent 端点之间做客户端负载均衡，签名容量可以按进程、按机器扩展，
+//! 与 Rust 前端相互独立。
+//!
+//! 端点来源（去重后合并）：
+//! - 本地托管的 Agent（`XHS_LOCAL_AGENTS`，见 [`crate::agent_manager`]）
+//! - `XHS_AGENT_URLS` / `PYTHON_AGENT_URL`：逗号分隔，`http://host:port` 或 `unix:/path`
+//!
+//! 调度策略：
+//! - **最少未完成请求**：选当前 outstanding 最少的端点，并列时轮转
+//! - **被动健康检查**：连续 3 次传输失败的端点摘除 5 s，到期后放行试探请求
+//! - **失败转移**：传输失败时换一个端点重试一次（签名没有副作用）
+//! - **对冲**：调用超过 `XHS_AGENT_HEDGE_MS`（默认 150，`0` 关闭）仍未返回时，
+//!   向另一个端点发送同一批请求，取先成功的结果
+//!
+//! 会话句柄由 Agent 按 Cookie 内容生成，各端点一致，注册时广播到所有可用端点；
+//! 新加入或重启的 Agent 返回 `unknown_session` 时由调用方重新注册。
+
+use anyhow::{Result, anyhow};
+use once_cell::sync::Lazy;
+use serde::Serialize;
+use std::collections::HashMap;
+use std::sync::atomic::{AtomicU64, AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+
+use super::transport::AgentTransport;
+use super::{SignRequest, SignResponse};
+
+/// 默认 Agent 地址（没有任何配置时）
+const DEFAULT_AGENT_URL: &str = "http://127.0.0.1:8765";
+
+/// 默认对冲延迟（`XHS_AGENT_HEDGE_MS`）
+const DEFAULT_HEDGE_MS: u64 = 150;
+
+/// 连续多少次传输失败后摘除端点
+const EJECT_THRESHOLD: u32 = 3;
+
+/// 摘除时长
+const EJECT_DURATION: Duration = Duration::from_secs(5);
+
+/// 全局共享的 Agent 池（所有 `SignatureService` 共用，未完成请求计数才准确）
+static POOL: Lazy<Arc<AgentPool>> = Lazy::new(|| Arc::new(AgentPool::from_env()));
+
+/// 获取全局 Agent 池
+pub fn shared() -> Arc<AgentPool> {
+    POOL.clone()
+}
+
+/// Agent 的 HTTP 基础地址（`/guest-cookies`、`/health` 等只提供 HTTP 的接口使用）
+///
+/// 优先返回第一个可用的地址（本地 Agent 已就绪、远程 Agent 未被摘除），都不可用时返回第一个。
+pub fn agent_http_url() -> String {
+    let now = Instant::now();
+    POOL.http_urls
+        .iter()
+        .find(|url| POOL.http_available(url, now))
+        .or_else(|| POOL.http_urls.first())
+        .cloned()
+        .unwrap_or_else(|| DEFAULT_AGENT_URL.to_string())
+}
+
+/// 是否还有未被摘除的远程 Agent（`XHS_AGENT_URLS` / `PYTHON_AGENT_URL`）
+///
+/// 本地 Agent 宕机或重启时，只要仍有可用的远程端点，签名请求就不必排队或熔断。
+pub fn remote_available() -> bool {
+    let now = Instant::now();
+    POOL.endpoints.iter().any(|e| !e.local && !e.is_ejected(now))
+}
+
+/// 所有 Agent 的 HTTP 基础地址（本地 Agent 在 UDS 模式下同样提供 HTTP）
+pub fn agent_http_urls() -> Vec<String> {
+    if POOL.http_urls.is_empty() {
+        return vec![DEFAULT_AGENT_URL.to_string()];
+    }
+    POOL.http_urls.clone()
+}
+
+/// 单个端点的被动健康状态
+#[derive(Default)]
+struct EndpointHealth {
+    consecutive_failures: u32,
+    ejected_until: Option<Instant>,
+}
+
+/// 一个 Agent 端点
+struct Endpoint {
+    name: String,
+    /// 本地托管的 Agent（可用性以 [`crate::agent_manager`] 的就绪状态为准）
+    local: bool,
+    transport: AgentTransport,
+    outstanding: AtomicUsize,
+    requests: AtomicU64,
+    failures: AtomicU64,
+    health: Mutex<EndpointHealth>,
+}
+
+/// 端点状态快照
+#[derive(Debug, Clone, Serialize)]
+pub struct EndpointStats {
+    pub endpoint: String,
+    pub outstanding: usize,
+    pub requests: u64,
+    pub failures: u64,
+    pub ejected: bool,
+}
+
+/// Agent 池状态快照
+#[derive(Debug, Clone, Serialize)]
+pub struct PoolStats {
+    pub endpoints: Vec<EndpointStats>,
+    pub hedged: u64,
+    pub hedge_wins: u64,
+    pub failovers: u64,
+}
+
+/// 请求结束（含被对冲取消）时归还未完成计数
+struct Outstanding<'a>(&'a AtomicUsize);
+
+impl Drop for Outstanding<'_> {
+    fn drop(&mut self) {
+        self.0.fetch_sub(1, Ordering::Relaxed);
+    }
+}
+
+impl Endpoint {
+    fn new(client: reqwest::Client, name: String, local: bool) -> Self {
+        Self {
+            transport: AgentTransport::from_endpoint(client, &name),
+            name,
+            local,
+            outstanding: AtomicUsize::new(0),
+            requests: AtomicU64::new(0),
+            failures: AtomicU64::new(0),
+            health: Mutex::new(EndpointHealth::default()),
+        }
+    }
+
+    fn is_ejected(&self, now: Instant) -> bool {
+        matches!(self.health.lock().unwrap().ejected_until, Some(until) if now < until)
+    }
+
+    /// 未被摘除，且本地 Agent 没有处于宕机 / 重启中
+    fn is_available(&self, now: Instant) -> bool {
+        !self.is_ejected(now) && (!self.local || crate::agent_manager::local_agent_ready(&self.name).unwrap_or(true))
+    }
+
+    fn record(&self, success: bool) {
+        let mut health = self.health.lock().unwrap();
+        if success {
+            health.consecutive_failures = 0;
+            health.ejected_until = None;
+            return;
+        }
+        self.failures.fetch_add(1, Ordering::Relaxed);
+        health.consecutive_failures += 1;
+        if health.consecutive_failures >= EJECT_THRESHOLD {
+            if health.ejected_until.is_none() {
+                tracing::warn!(
+                    "[AgentPool] Ejecting {} after {} consecutive failures",
+                    self.name,
+                    health.consecutive_failures
+                );
+            }
+            health.ejected_until = Some(Instant::now() + EJECT_DURATION);
+        }
+    }
+
+    async fn sign_batch(&self, requests: &[SignRequest]) -> Result<Vec<SignResponse>> {
+        self.outstanding.fetch_add(1, Ordering::Relaxed);
+        let _outstanding = Outstanding(&self.outstanding);
+        self.requests.fetch_add(1, Ordering::Relaxed);
+
+        let result = self.transport.sign_batch(requests).await;
+        self.record(result.is_ok());
+        result
+    }
+
+    async fn register_session(&self, cookies: &HashMap<String, String>) -> Result<String> {
+        let result = self.transport.register_session(cookies).await;
+        // 注册失败也可能是 Cookie 本身的问题，只有成功才用于恢复健康
+        if result.is_ok() {
+            self.record(true);
+        }
+        result
+    }
+}
+
+/// 签名 Agent 池
+pub struct AgentPool {
+    endpoints: Vec<Endpoint>,
+    http_urls: Vec<String>,
+    hedge_after: Option<Duration>,
+    /// 并列时的轮转起点
+    next: AtomicUsize,
+    hedged: AtomicU64,
+    hedge_wins: AtomicU64,
+    failovers: AtomicU64,
+}
+
+impl AgentPool {
+    /// 从本地托管的 Agent 与环境变量构建
+    pub fn from_env() -> Self {
+        let local_urls = crate::agent_manager::local_agent_urls();
+        let mut names = crate::agent_manager::local_agent_endpoints();
+        let local_count = names.len();
+        let mut http_urls = local_urls.clone();
+
+        for var in ["XHS_AGENT_URLS", "PYTHON_AGENT_URL"] {
+            let Ok(value) = std::env::var(var) else { continue };
+            for name in value.split(',').map(|s| s.trim().trim_end_matches('/')) {
+                if name.is_empty() || names.iter().any(|n| n == name) || local_urls.iter().any(|u| u == name) {
+                    continue;
+                }
+                if !name.starts_with("unix:") {
+                    http_urls.push(name.to_string());
+                }
+                names.push(name.to_string());
+            }
+        }
+
+        let hedge_ms = std::env::var("XHS_AGENT_HEDGE_MS")
+            .ok()
+            .and_then(|v| v.parse::<u64>().ok())
+            .unwrap_or(DEFAULT_HEDGE_MS);
+
+        tracing::info!("[AgentPool] Signing agents: {:?} (hedge after {} ms)", names, hedge_ms);
+
+        let client = reqwest::Client::new();
+        Self {
+            endpoints: names
+                .into_iter()
+                .enumerate()
+                .map(|(index, name)| Endpoint::new(client.clone(), name, index < local_count))
+                .collect(),
+            http_urls,
+            hedge_after: (hedge_ms > 0).then(|| Duration::from_millis(hedge_ms)),
+            next: AtomicUsize::new(0),
+            hedged: AtomicU64::new(0),
+            hedge_wins: AtomicU64::new(0),
+            failovers: AtomicU64::new(0),
+        }
+    }
+
+    /// 选择未完成请求最少的可用端点
+    ///
+    /// `exclude` 为已经在用的端点（对冲 / 失败转移）；此时只考虑可用的端点。
+    /// 否则全部不可用时仍返回一个端点，交给熔断器决定是否快速失败。
+    fn pick(&self, exclude: Option<usize>) -> Option<usize> {
+        let count = self.endpoints.len();
+        if count == 0 {
+            return None;
+        }
+        let now = Instant::now();
+        let start = self.next.fetch_add(1, Ordering::Relaxed) % count;
+
+        let mut best: Option<(usize, usize)> = None;
+        let mut fallback = None;
+        for offset in 0..count {
+            let index = (start + offset) % count;
+            if Some(index) == exclude {
+                continue;
+            }
+            let endpoint = &self.endpoints[index];
+            if !endpoint.is_available(now) {
+                fallback.get_or_insert(index);
+                continue;
+            }
+            let load = endpoint.outstanding.load(Ordering::Relaxed);
+            if best.map_or(true, |(_, best_load)| load < best_load) {
+                best = Some((index, load));
+            }
+        }
+
+        match best {
+            Some((index, _)) => Some(index),
+            None if exclude.is_none() => fallback,
+            None => None,
+        }
+    }
+
+    /// 发送一批签名请求，结果与请求顺序一致
+    pub async fn sign_batch(&self, requests: &[SignRequest]) -> Result<Vec<SignResponse>> {
+        let primary = self.pick(None).ok_or_else(|| anyhow!("No signing agent configured"))?;
+        let first = self.endpoints[primary].sign_batch(requests);
+        tokio::pin!(first);
+
+        let hedge_after = match self.hedge_after {
+            Some(delay) if self.endpoints.len() > 1 => delay,
+            _ => {
+                return match first.await {
+                    Ok(results) => Ok(results),
+                    Err(e) => self.failover(primary, requests, e).await,
+                };
+            }
+        };
+
+        match tokio::time::timeout(hedge_after, &mut first).await {
+            Ok(Ok(results)) => return Ok(results),
+            Ok(Err(e)) => return self.failover(primary, requests, e).await,
+            Err(_) => {}
+        }
+
+        let Some(second) = self.pick(Some(primary)) else {
+            return first.await;
+        };
+        self.hedged.fetch_add(1, Ordering::Relaxed);
+        tracing::debug!(
+            "[AgentPool] {} slower than {:?}, hedging to {}",
+            self.endpoints[primary].name,
+            hedge_after,
+            self.endpoints[second].name
+        );
+
+        let hedge = self.endpoints[second].sign_batch(requests);
+        tokio::pin!(hedge);
+
+        // 取先成功的一方；先返回的失败时继续等另一方
+        tokio::select! {
+            result = &mut first => match result {
+                Ok(results) => Ok(results),
+                Err(_) => hedge.await,
+            },
+            result = &mut hedge => match result {
+                Ok(results) => {
+                    self.hedge_wins.fetch_add(1, Ordering::Relaxed);
+                    Ok(results)
+                }
+                Err(_) => first.await,
+            },
+        }
+    }
+
+    /// 传输失败时换一个可用端点重试一次
+    async fn failover(
+        &self,
+        failed: usize,
+        requests: &[SignRequest],
+        error: anyhow::Error,
+    ) -> Result<Vec<SignResponse>> {
+        let Some(next) = self.pick(Some(failed)) else {
+            return Err(error);
+        };
+        self.failovers.fetch_add(1, Ordering::Relaxed);
+        tracing::warn!(
+            "[AgentPool] {} failed ({}), retrying on {}",
+            self.endpoints[failed].name,
+            error,
+            self.endpoints[next].name
+        );
+        self.endpoints[next].sign_batch(requests).await
+    }
+
+    /// 并发向所有可用端点注册同一组 Cookie，返回句柄
+    ///
+    /// 句柄由 Cookie 内容决定，各端点返回的值相同：第一个成功即返回，
+    /// 其余端点的注册在后台完成，首个签名不必等最慢（或挂起）的端点。
+    pub async fn register_session(self: &Arc<Self>, cookies: &HashMap<String, String>) -> Result<String> {
+        let now = Instant::now();
+        let cookies = Arc::new(cookies.clone());
+        let mut tasks = tokio::task::JoinSet::new();
+        for index in (0..self.endpoints.len()).filter(|&i| self.endpoints[i].is_available(now)) {
+            let (pool, cookies) = (self.clone(), cookies.clone());
+            tasks.spawn(async move { pool.endpoints[index].register_session(&cookies).await });
+        }
+
+        let mut last_error = None;
+        while let Some(joined) = tasks.join_next().await {
+            match joined {
+                Ok(Ok(session_id)) => {
+                    if !tasks.is_empty() {
+                        // JoinSet 被丢弃时会取消任务，交给后台任务收尾
+                        tokio::spawn(async move { while tasks.join_next().await.is_some() {} });
+                    }
+                    return Ok(session_id);
+                }
+                Ok(Err(e)) => last_error = Some(e),
+                Err(e) => last_error = Some(anyhow!("Session registration task failed: {}", e)),
+            }
+        }
+        Err(last_error.unwrap_or_else(|| anyhow!("No signing agent available")))
+    }
+
+    /// HTTP 地址对应的 Agent 是否可用（不在池中的地址视为可用）
+    fn http_available(&self, url: &str, now: Instant) -> bool {
+        if let Some(ready) = crate::agent_manager::local_agent_ready(url) {
+            return ready;
+        }
+        self.endpoints
+            .iter()
+            .find(|e| e.name == url)
+            .map_or(true, |e| !e.is_ejected(now))
+    }
+
+    /// 池状态快照
+    pub fn stats(&self) -> PoolStats {
+        let now = Instant::now();
+        PoolStats {
+            endpoints: self
+                .endpoints
+                .iter()
+                .map(|e| EndpointStats {
+                    endpoint: e.name.clone(),
+                    outstanding: e.outstanding.load(Ordering::Relaxed),
+                    requests: e.requests.load(Ordering::Relaxed),
+                    failures: e.failures.load(Ordering::Relaxed),
+                    ejected: e.is_ejected(now),
+                })
+                .collect(),
+            hedged: self.hedged.load(Ordering::Relaxed),
+            hedge_wins: self.hedge_wins.load(Ordering::Relaxed),
+            failovers: self.failovers.load(Ordering::Relaxed),
+        }
+    }
+}
@@ -0,0 +1,101 @@
+//! 签名会话句柄 (Sign Session Handles)
+//!
+//! 同一组 Cookie 会被反复用于签名，而 x-s-common 只依赖 Cookie，
+//! 约占 xhshow 单次签名 CPU 的 90%。`SessionCache` 对每组 Cookie 只向 Agent
+//! 注册一次（`POST /session` 或 UDS `register_session` 帧），之后签名请求只带
+//! `session_id`，由 Agent 复用已计算好的 a1 / x-s-common。
+//!
+//! - 句柄由 Agent 按 Cookie 内容生成，Cookie 变化即得到新句柄
+//! - 注册失败时返回 `None`，调用方回退为直接发送完整 Cookie
+//! - Agent 重启或淘汰句柄后返回 `unknown_session`，调用方作废本地句柄并重试
+//!
+//! 通过环境变量 `XHS_SIGN_SESSIONS` 控制（默认开启，`0` / `false` 关闭）。
+
+use std::collections::HashMap;
+use std::collections::hash_map::DefaultHasher;
+use std::hash::{Hash, Hasher};
+use std::sync::{Arc, Mutex};
+
+use once_cell::sync::Lazy;
+
+use super::pool::AgentPool;
+use crate::metrics::CacheCounters;
+
+/// 本地最多缓存的句柄数，超过后整体清空（Agent 端另有 LRU + TTL 淘汰）
+const MAX_HANDLES: usize = 1024;
+
+static SESSION_CACHE_METRICS: Lazy<CacheCounters> = Lazy::new(|| CacheCounters::new("sign_session"));
+
+/// Cookie 指纹 → Agent 会话句柄
+pub struct SessionCache {
+    enabled: bool,
+    handles: Mutex<HashMap<u64, String>>,
+}
+
+impl SessionCache {
+    /// 从环境变量读取配置
+    pub fn from_env() -> Self {
+        let enabled = std::env::var("XHS_SIGN_SESSIONS")
+            .map(|v| !matches!(v.to_lowercase().as_str(), "0" | "false" | "off"))
+            .unwrap_or(true);
+        Self {
+            enabled,
+            handles: Mutex::new(HashMap::new()),
+        }
+    }
+
+    /// 是否启用会话句柄
+    pub fn enabled(&self) -> bool {
+        self.enabled
+    }
+
+    /// 获取 Cookie 对应的句柄，本地没有时向 Agent 注册
+    ///
+    /// 返回 `None` 表示应直接发送完整 Cookie（未启用、缺少 a1 或注册失败）
+    pub async fn handle_for(
+        &self,
+        pool: &Arc<AgentPool>,
+        cookies: &HashMap<String, String>,
+    ) -> Option<String> {
+        if !self.enabled || !cookies.contains_key("a1") {
+            return None;
+        }
+
+        let key = fingerprint(cookies);
+        if let Some(handle) = self.handles.lock().unwrap().get(&key) {
+            SESSION_CACHE_METRICS.record(true);
+            return Some(handle.clone());
+        }
+        SESSION_CACHE_METRICS.record(false);
+
+        match pool.register_session(cookies).await {
+            Ok(handle) => {
+                tracing::debug!("[SessionCache] Registered sign session {}", handle);
+                let mut handles = self.handles.lock().unwrap();
+                if handles.len() >= MAX_HANDLES {
+                    handles.clear();
+                }
+                handles.insert(key, handle.clone());
+                Some(handle)
+            }
+            Err(e) => {
+                tracing::warn!("[SessionCache] Session registration failed, sending cookies: {}", e);
+                None
+            }
+        }
+    }
+
+    /// 作废 Cookie 对应的本地句柄（Agent 已不认识该句柄时调用）
+    pub fn invalidate(&self, cookies: &HashMap<String, String>) {
+        self.handles.lock().unwrap().remove(&fingerprint(cookies));
+    }
+}
+
+/// 与顺序无关的 Cookie 指纹
+pub(crate) fn fingerprint(cookies: &HashMap<String, String>) -> u64 {
+    let mut entries: Vec<_> = cookies.iter().collect();
+    entries.sort();
+    let mut hasher = DefaultHasher::new();
+    entries.hash(&mut hasher);
+    hasher.finish()
+}
@@ -0,0 +1,282 @@
+//! Agent 传输层 (Rust ↔ Agent Transport)
+//!
+//! 签名请求发往 Python Agent 的两种方式：
+//! 1. **HTTP** (默认): `POST /sign` / `POST /sign/batch`，JSON 编码，TCP 回环
+//! 2. **UDS**: Unix Domain Socket + 长度前缀的 msgpack 帧，跳过 HTTP 解析与 pydantic 校验
+//!
+//! 每个 Agent 端点各自一个传输实例（见 [`super::pool`]），由端点写法决定：
+//! `http://host:port` 走 HTTP，`unix:/path` 走 UDS。本地 Agent 的端点由
+//! `XHS_AGENT_TRANSPORT`（`http` | `uds`）与 `XHS_AGENT_SOCKET` 决定，与 Agent 端共用。
+//!
+//! UDS 帧格式: `[u32 big-endian 长度][msgpack body]`，
+//! 请求 `{"op": "sign_batch", "requests": [...]}`，响应 `{"results": [...]}`；
+//! 会话注册 `{"op": "register_session", "cookies": {...}}`，响应 `{"session_id": "..."}`。
+
+use anyhow::{Result, anyhow};
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::time::Duration;
+
+use super::{BatchSignRequest, BatchSignResponse, SignRequest, SignResponse};
+
+/// 单次签名调用超时
+const SIGN_TIMEOUT: Duration = Duration::from_secs(5);
+
+/// 默认 UDS 路径
+pub const DEFAULT_SOCKET_PATH: &str = "/tmp/xhs-agent.sock";
+
+/// Agent 传输方式
+pub enum AgentTransport {
+    /// HTTP + JSON
+    Http {
+        client: reqwest::Client,
+        base_url: String,
+    },
+    /// Unix Domain Socket + msgpack
+    #[cfg(unix)]
+    Uds(uds::UdsTransport),
+}
+
+impl AgentTransport {
+    /// 按端点写法选择传输方式：`unix:/path` 为 UDS，其余视为 HTTP 基础地址
+    pub fn from_endpoint(client: reqwest::Client, endpoint: &str) -> Self {
+        if let Some(path) = endpoint.strip_prefix("unix:") {
+            #[cfg(unix)]
+            return AgentTransport::Uds(uds::UdsTransport::new(path));
+            #[cfg(not(unix))]
+            tracing::warn!("[AgentTransport] UDS endpoint '{}' is not supported on this platform", path);
+        }
+        AgentTransport::Http {
+            client,
+            base_url: endpoint.trim_end_matches('/').to_string(),
+        }
+    }
+
+    /// 发送一批签名请求，结果与请求顺序一致
+    pub async fn sign_batch(&self, requests: &[SignRequest]) -> Result<Vec<SignResponse>> {
+        let results = match self {
+            AgentTransport::Http { client, base_url } => http_sign_batch(client, base_url, requests).await?,
+            #[cfg(unix)]
+            AgentTransport::Uds(uds) => uds.sign_batch(requests).await?,
+        };
+
+        if results.len() != requests.len() {
+            return Err(anyhow!(
+                "Agent batch response size mismatch: sent {}, got {}",
+                requests.len(),
+                results.len()
+            ));
+        }
+        Ok(results)
+    }
+
+    /// 注册一组 Cookie，返回 Agent 分配的会话句柄
+    pub async fn register_session(&self, cookies: &HashMap<String, String>) -> Result<String> {
+        match self {
+            AgentTransport::Http { client, base_url } => http_register_session(client, base_url, cookies).await,
+            #[cfg(unix)]
+            AgentTransport::Uds(uds) => uds.register_session(cookies).await,
+        }
+    }
+}
+
+/// 会话注册请求结构 (`POST /session`)
+#[derive(Debug, Serialize)]
+struct SessionRequest<'a> {
+    cookies: &'a HashMap<String, String>,
+}
+
+/// 会话注册响应结构
+#[derive(Debug, Deserialize)]
+struct SessionResponse {
+    success: bool,
+    session_id: Option<String>,
+    error: Option<String>,
+}
+
+/// HTTP 传输：单个请求走 `/sign`，多个请求走 `/sign/batch`
+async fn http_sign_batch(
+    client: &reqwest::Client,
+    base_url: &str,
+    requests: &[SignRequest],
+) -> Result<Vec<SignResponse>> {
+    if let [request] = requests {
+        let response = client
+            .post(format!("{}/sign", base_url))
+            .json(request)
+            .timeout(SIGN_TIMEOUT)
+            .send()
+            .await
+            .map_err(|e| anyhow!("Agent connection failed: {}. Is agent_server.py running?", e))?;
+
+        let sign_resp: SignResponse = response
+            .json()
+            .await
+            .map_err(|e| anyhow!("Failed to parse Agent response: {}", e))?;
+
+        return Ok(vec![sign_resp]);
+    }
+
+    let response = client
+        .post(format!("{}/sign/batch", base_url))
+        .json(&BatchSignRequest { requests })
+        .timeout(SIGN_TIMEOUT)
+        .send()
+        .await
+        .map_err(|e| anyhow!("Agent connection failed: {}. Is agent_server.py running?", e))?;
+
+    let batch_resp: BatchSignResponse = response
+        .json()
+        .await
+        .map_err(|e| anyhow!("Failed to parse Agent batch response: {}", e))?;
+
+    Ok(batch_resp.results)
+}
+
+/// HTTP 传输：`POST /session`
+async fn http_register_session(
+    client: &reqwest::Client,
+    base_url: &str,
+    cookies: &HashMap<String, String>,
+) -> Result<String> {
+    let response = client
+        .post(format!("{}/session", base_url))
+        .json(&SessionRequest { cookies })
+        .timeout(SIGN_TIMEOUT)
+        .send()
+        .await
+        .map_err(|e| anyhow!("Agent connection failed: {}. Is agent_server.py running?", e))?;
+
+    let session_resp: SessionResponse = response
+        .json()
+        .await
+        .map_err(|e| anyhow!("Failed to parse Agent session response: {}", e))?;
+
+    match session_resp.session_id {
+        Some(session_id) if session_resp.success => Ok(session_id),
+        _ => Err(anyhow!(
+            "Agent session registration failed: {}",
+            session_resp.error.unwrap_or_else(|| "Unknown error".to_string())
+        )),
+    }
+}
+
+#[cfg(unix)]
+mod uds {
+    use super::*;
+    use std::path::PathBuf;
+    use std::sync::Mutex;
+    use tokio::io::{AsyncReadExt, AsyncWriteExt};
+    use tokio::net::UnixStream;
+
+    /// UDS 请求帧
+    #[derive(Debug, Serialize)]
+    #[serde(tag = "op", rename_all = "snake_case")]
+    enum UdsFrame<'a> {
+        SignBatch { requests: &'a [SignRequest] },
+        RegisterSession { cookies: &'a HashMap<String, String> },
+    }
+
+    /// UDS 响应帧
+    #[derive(Debug, Deserialize)]
+    struct UdsReply {
+        #[serde(default)]
+        results: Option<Vec<SignResponse>>,
+        #[serde(default)]
+        session_id: Option<String>,
+        #[serde(default)]
+        error: Option<String>,
+    }
+
+    /// 最大帧大小（与 Agent 端一致）
+    const MAX_FRAME_SIZE: usize = 16 * 1024 * 1024;
+
+    /// 空闲连接池上限
+    const MAX_IDLE_CONNECTIONS: usize = 16;
+
+    /// UDS 传输：维护少量空闲连接复用，每个连接同一时间只处理一帧
+    pub struct UdsTransport {
+        path: PathBuf,
+        idle: Mutex<Vec<UnixStream>>,
+    }
+
+    impl UdsTransport {
+        pub fn new(path: impl Into<PathBuf>) -> Self {
+            Self {
+                path: path.into(),
+                idle: Mutex::new(Vec::new()),
+            }
+        }
+
+        pub async fn sign_batch(&self, requests: &[SignRequest]) -> Result<Vec<SignResponse>> {
+            let reply = self.call(&UdsFrame::SignBatch { requests }).await?;
+            reply.results.ok_or_else(|| anyhow!("Agent UDS response missing results"))
+        }
+
+        pub async fn register_session(&self, cookies: &HashMap<String, String>) -> Result<String> {
+            let reply = self.call(&UdsFrame::RegisterSession { cookies }).await?;
+            reply.session_id.ok_or_else(|| anyhow!("Agent UDS response missing session_id"))
+        }
+
+        /// 编码请求帧、完成一次往返并解析响应
+        async fn call(&self, frame: &UdsFrame<'_>) -> Result<UdsReply> {
+            let frame = rmp_serde::to_vec_named(frame)
+                .map_err(|e| anyhow!("Failed to encode UDS frame: {}", e))?;
+
+            let body = tokio::time::timeout(SIGN_TIMEOUT, self.round_trip(&frame))
+                .await
+                .map_err(|_| anyhow!("Agent UDS call timed out"))??;
+
+            let reply: UdsReply = rmp_serde::from_slice(&body)
+                .map_err(|e| anyhow!("Failed to parse Agent UDS response: {}", e))?;
+
+            if let Some(error) = reply.error {
+                return Err(anyhow!("Agent UDS error: {}", error));
+            }
+            Ok(reply)
+        }
+
+        /// 发送一帧并读取响应；复用的连接可能已被 Agent 关闭，失败时用新连接重试一次
+        async fn round_trip(&self, frame: &[u8]) -> Result<Vec<u8>> {
+            if let Some(mut stream) = self.take_idle() {
+                if let Ok(body) = exchange(&mut stream, frame).await {
+                    self.put_idle(stream);
+                    return Ok(body);
+                }
+            }
+
+            let mut stream = UnixStream::connect(&self.path).await.map_err(|e| {
+                anyhow!("Agent connection failed: {} ({:?}). Is agent_server.py running with XHS_AGENT_TRANSPORT=uds?", e, self.path)
+            })?;
+            let body = exchange(&mut stream, frame).await?;
+            self.put_idle(stream);
+            Ok(body)
+        }
+
+        fn take_idle(&self) -> Option<UnixStream> {
+            self.idle.lock().unwrap().pop()
+        }
+
+        fn put_idle(&self, stream: UnixStream) {
+            let mut idle = self.idle.lock().unwrap();
+            if idle.len() < MAX_IDLE_CONNECTIONS {
+                idle.push(stream);
+            }
+        }
+    }
+
+    async fn exchange(stream: &mut UnixStream, frame: &[u8]) -> Result<Vec<u8>> {
+        let mut out = Vec::with_capacity(4 + frame.len());
+        out.extend_from_slice(&(frame.len() as u32).to_be_bytes());
+        out.extend_from_slice(frame);
+        stream.write_all(&out).await?;
+
+        let len = stream.read_u32().await? as usize;
+        if len > MAX_FRAME_SIZE {
+            return Err(anyhow!("Agent UDS frame too large: {} bytes", len));
+        }
+        let mut body = vec![0u8; len];
+        stream.read_exact(&mut body).await?;
+        Ok(body)
+    }
+}
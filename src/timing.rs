@@ -0,0 +1,128 @@
+//! 请求耗时分解 (Server-Timing)
+//!
+//! 每个 HTTP 请求在中间件 [`track_request`] 中获得一个请求 ID（沿用客户端的
+//! `x-request-id`，否则生成），并建立 `request` tracing span 与一份任务本地的
+//! 阶段记录。`XhsApiClient` 在同一任务内记录各阶段耗时：
+//!
+//! - `credentials`: 读取登录凭证
+//! - `sign`: 签名（含 Agent 排队 / 批处理等待）
+//! - `stored_signature`: 回退到存储签名时的读取
+//! - `upstream`: XHS 请求往返（含响应体下载）
+//! - `parse`: JSON 反序列化
+//!
+//! 响应带上 `Server-Timing`（同名阶段累加）与 `x-request-id` 头；请求 ID 同时随
+//! 签名请求发送给 Agent，Agent 日志中的 ID 与 Rust 侧 span 对应。
+
+use serde::de::DeserializeOwned;
+use std::future::Future;
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+use tracing::Instrument;
+
+/// 请求 ID 头
+pub const REQUEST_ID_HEADER: &str = "x-request-id";
+
+/// 客户端传入的请求 ID 最大长度（超出或含非法字符时重新生成）
+const MAX_REQUEST_ID_LEN: usize = 64;
+
+tokio::task_local! {
+    static CURRENT: Arc<RequestTiming>;
+}
+
+/// 单个请求的阶段耗时记录
+pub struct RequestTiming {
+    id: String,
+    started: Instant,
+    phases: Mutex<Vec<(&'static str, Duration)>>,
+}
+
+impl RequestTiming {
+    fn new(id: String) -> Self {
+        Self {
+            id,
+            started: Instant::now(),
+            phases: Mutex::new(Vec::new()),
+        }
+    }
+
+    fn record(&self, phase: &'static str, elapsed: Duration) {
+        let mut phases = self.phases.lock().unwrap();
+        match phases.iter_mut().find(|(name, _)| *name == phase) {
+            Some((_, total)) => *total += elapsed,
+            None => phases.push((phase, elapsed)),
+        }
+    }
+
+    /// `Server-Timing` 头的值，如 `sign;dur=3.1, upstream;dur=212.4, total;dur=218.0`
+    fn header_value(&self) -> String {
+        let mut parts: Vec<String> = self
+            .phases
+            .lock()
+            .unwrap()
+            .iter()
+            .map(|(name, elapsed)| format!("{};dur={:.1}", name, elapsed.as_secs_f64() * 1000.0))
+            .collect();
+        parts.push(format!("total;dur={:.1}", self.started.elapsed().as_secs_f64() * 1000.0));
+        parts.join(", ")
+    }
+}
+
+/// 当前请求的 ID（不在 HTTP 请求内时为 `None`）
+pub fn request_id() -> Option<String> {
+    CURRENT.try_with(|timing| timing.id.clone()).ok()
+}
+
+/// 记录一个阶段的耗时（不在 HTTP 请求内时忽略）
+pub fn record(phase: &'static str, elapsed: Duration) {
+    let _ = CURRENT.try_with(|timing| timing.record(phase, elapsed));
+}
+
+/// 计时执行一个异步阶段，并在 `phase` span 内运行
+pub async fn phase<F: Future>(name: &'static str, fut: F) -> F::Output {
+    let started = Instant::now();
+    let output = fut.instrument(tracing::debug_span!("phase", phase = name)).await;
+    record(name, started.elapsed());
+    output
+}
+
+/// 计时的 JSON 反序列化（`parse` 阶段）
+pub fn parse_json<T: DeserializeOwned>(text: &str) -> serde_json::Result<T> {
+    let started = Instant::now();
+    let result = serde_json::from_str(text);
+    record("parse", started.elapsed());
+    result
+}
+
+/// 沿用合法的客户端请求 ID，否则生成新的
+fn request_id_from(headers: &axum::http::HeaderMap) -> String {
+    headers
+        .get(REQUEST_ID_HEADER)
+        .and_then(|v| v.to_str().ok())
+        .filter(|id| {
+            !id.is_empty()
+                && id.len() <= MAX_REQUEST_ID_LEN
+                && id.bytes().all(|b| b.is_ascii_alphanumeric() || b == b'-' || b == b'_')
+        })
+        .map(str::to_owned)
+        .unwrap_or_else(|| uuid::Uuid::new_v4().simple().to_string())
+}
+
+/// axum 中间件：分配请求 ID，建立 span，响应附加 `Server-Timing` 与 `x-request-id`
+pub async fn track_request(request: axum::extract::Request, next: axum::middleware::Next) -> axum::response::Response {
+    let id = request_id_from(request.headers());
+    let span = tracing::info_span!("request", id = %id, method = %request.method(), path = %request.uri().path());
+    let timing = Arc::new(RequestTiming::new(id));
+
+    let mut response = CURRENT
+        .scope(timing.clone(), next.run(request).instrument(span))
+        .await;
+
+    let headers = response.headers_mut();
+    if let Ok(value) = timing.header_value().parse() {
+        headers.insert("server-timing", value);
+    }
+    if let Ok(value) = timing.id.parse() {
+        headers.insert(REQUEST_ID_HEADER, value);
+    }
+    response
+}
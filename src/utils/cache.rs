@@ -0,0 +1,145 @@
+//! 带 TTL 的有界内存缓存 (TTL Cache)
+//!
+//! - 条目在 `ttl` 后过期；条目数达到 `capacity` 时先清理过期条目，
+//!   仍然满则淘汰最早写入的条目
+//! - [`TtlCache::get_or_try_insert_with`]：同一个 key 的并发未命中只执行一次加载
+//!   （single-flight），其余调用者等待并共享结果（包括错误）
+//! - `capacity = 0` 时不缓存，但仍合并并发加载
+
+use anyhow::{Result, anyhow};
+use std::collections::HashMap;
+use std::future::Future;
+use std::hash::Hash;
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+use tokio::sync::OnceCell;
+
+struct Entry<V> {
+    value: V,
+    inserted_at: Instant,
+}
+
+/// 单次加载的共享结果（错误以字符串共享，`anyhow::Error` 不可 Clone）
+type Flight<V> = Arc<OnceCell<std::result::Result<V, String>>>;
+
+/// 带 TTL 与容量上限的缓存，值在命中时被 Clone（大对象请用 `Arc<T>`）
+pub struct TtlCache<K, V> {
+    entries: Mutex<HashMap<K, Entry<V>>>,
+    in_flight: Mutex<HashMap<K, Flight<V>>>,
+    capacity: usize,
+    ttl: Duration,
+}
+
+impl<K: Eq + Hash + Clone, V: Clone> TtlCache<K, V> {
+    pub fn new(capacity: usize, ttl: Duration) -> Self {
+        Self {
+            entries: Mutex::new(HashMap::new()),
+            in_flight: Mutex::new(HashMap::new()),
+            capacity,
+            ttl,
+        }
+    }
+
+    /// 是否会保存条目
+    pub fn enabled(&self) -> bool {
+        self.capacity > 0 && !self.ttl.is_zero()
+    }
+
+    /// 未过期的缓存值
+    pub fn get(&self, key: &K) -> Option<V> {
+        let mut entries = self.entries.lock().unwrap();
+        match entries.get(key) {
+            Some(entry) if entry.inserted_at.elapsed() < self.ttl => Some(entry.value.clone()),
+            Some(_) => {
+                entries.remove(key);
+                None
+            }
+            None => None,
+        }
+    }
+
+    /// 写入（必要时淘汰）
+    pub fn insert(&self, key: K, value: V) {
+        if !self.enabled() {
+            return;
+        }
+        let mut entries = self.entries.lock().unwrap();
+        if entries.len() >= self.capacity && !entries.contains_key(&key) {
+            let ttl = self.ttl;
+            entries.retain(|_, entry| entry.inserted_at.elapsed() < ttl);
+            if entries.len() >= self.capacity {
+                let oldest = entries
+                    .iter()
+                    .min_by_key(|(_, entry)| entry.inserted_at)
+                    .map(|(key, _)| key.clone());
+                if let Some(oldest) = oldest {
+                    entries.remove(&oldest);
+                }
+            }
+        }
+        entries.insert(key, Entry { value, inserted_at: Instant::now() });
+    }
+
+    /// 删除条目
+    pub fn invalidate(&self, key: &K) {
+        self.entries.lock().unwrap().remove(key);
+    }
+
+    /// 当前条目数（含尚未清理的过期条目）
+    pub fn len(&self) -> usize {
+        self.entries.lock().unwrap().len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+
+    /// 命中则返回缓存值；否则执行 `load`（同 key 并发只执行一次）并缓存成功结果
+    ///
+    /// 返回值的第二项表示是否命中缓存（含等待他人加载的结果）。
+    pub async fn get_or_try_insert_with<F, Fut>(&self, key: K, load: F) -> Result<(V, bool)>
+    where
+        F: FnOnce() -> Fut,
+        Fut: Future<Output = Result<V>>,
+    {
+        if let Some(value) = self.get(&key) {
+            return Ok((value, true));
+        }
+
+        let flight = self
+            .in_flight
+            .lock()
+            .unwrap()
+            .entry(key.clone())
+            .or_insert_with(|| Arc::new(OnceCell::new()))
+            .clone();
+
+        let mut loaded = false;
+        let loaded_here = &mut loaded;
+        let load_key = key.clone();
+        let result = flight
+            .get_or_init(move || async move {
+                *loaded_here = true;
+                // 上一轮加载可能刚刚写入
+                if let Some(value) = self.get(&load_key) {
+                    return Ok(value);
+                }
+                let result = load().await.map_err(|e| e.to_string());
+                if let Ok(value) = &result {
+                    self.insert(load_key, value.clone());
+                }
+                result
+            })
+            .await
+            .clone();
+
+        {
+            let mut in_flight = self.in_flight.lock().unwrap();
+            if in_flight.get(&key).is_some_and(|f| Arc::ptr_eq(f, &flight)) {
+                in_flight.remove(&key);
+            }
+        }
+
+        result.map(|value| (value, !loaded)).map_err(|e| anyhow!(e))
+    }
+}
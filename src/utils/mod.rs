@@ -1,5 +1,9 @@
 pub mod sign;
 pub mod qrcode;
+pub mod cache;
+pub mod throttle;
 
 pub use qrcode::{QrCodeResult, generate_qr_ascii, print_qr_to_terminal};
+pub use cache::TtlCache;
+pub use throttle::RateLimiter;
 
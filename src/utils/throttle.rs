@@ -0,0 +1,53 @@
+//! 字节速率限制 (Rate Limiter)
+//!
+//! 令牌桶：每秒补充 `rate` 个令牌，最多积攒一秒的量。`acquire` 先扣除令牌，
+//! 透支时按欠额睡眠，多个调用者共享同一个限额。`rate = 0` 表示不限速。
+
+use std::sync::Mutex;
+use std::time::{Duration, Instant};
+
+#[derive(Debug)]
+struct Bucket {
+    available: f64,
+    updated: Instant,
+}
+
+/// 共享的字节速率上限
+#[derive(Debug)]
+pub struct RateLimiter {
+    rate: u64,
+    bucket: Mutex<Bucket>,
+}
+
+impl RateLimiter {
+    /// `rate`: 每秒字节数（0 不限速）
+    pub fn new(rate: u64) -> Self {
+        Self {
+            rate,
+            bucket: Mutex::new(Bucket { available: rate as f64, updated: Instant::now() }),
+        }
+    }
+
+    pub fn rate(&self) -> u64 {
+        self.rate
+    }
+
+    /// 消耗 `amount` 个令牌，超出限额时等待
+    pub async fn acquire(&self, amount: u64) {
+        if self.rate == 0 {
+            return;
+        }
+        let rate = self.rate as f64;
+        let wait = {
+            let mut bucket = self.bucket.lock().unwrap();
+            let now = Instant::now();
+            let refill = now.duration_since(bucket.updated).as_secs_f64() * rate;
+            bucket.available = (bucket.available + refill).min(rate) - amount as f64;
+            bucket.updated = now;
+            (bucket.available < 0.0).then(|| Duration::from_secs_f64(-bucket.available / rate))
+        };
+        if let Some(wait) = wait {
+            tokio::time::sleep(wait).await;
+        }
+    }
+}